@@ -1,5 +1,4 @@
 import os
-from PIL import Image
 import json
 import numpy as np
 from pathlib import Path
@@ -14,33 +13,61 @@ class DoomDataProcessor:
         self.training_dir.mkdir(parents=True, exist_ok=True)
         self.processed_dir.mkdir(parents=True, exist_ok=True)
     
-    def analyze_sprite_pair(self, mask_path, texture_path):
-        """Analyze a mask-texture pair to understand DOOM characteristics"""
-        mask = Image.open(mask_path).convert('L')
-        texture = Image.open(texture_path).convert('RGB')
+    def analyze_sprite_pair(self, mask_path, texture_path, band_height=256):
+        """Analyze a mask-texture pair to understand DOOM characteristics
         
-        # Basic analysis
-        mask_array = np.array(mask)
-        texture_array = np.array(texture)
+        Both images are read in bands of rows, so even full sheets never sit in memory whole.
+        Raises ValueError if the mask and texture sizes differ.
+        """
+        from src.png_stream import iter_image_bands
+        from src.sheet_cache import to_gray
         
-        # Get sprite dimensions
-        width, height = mask.size
+        mask_size, texture_size = self.image_size(mask_path), self.image_size(texture_path)
+        if mask_size != texture_size:
+            raise ValueError(f"mask is {mask_size[0]}x{mask_size[1]} but texture is {texture_size[0]}x{texture_size[1]}")
         
-        # Count non-transparent pixels (assuming black is background)
-        sprite_pixels = np.sum(mask_array > 0)
-        fill_ratio = sprite_pixels / (width * height)
+        width = height = 0
+        sprite_pixels = 0
+        colors = np.zeros(0, dtype=np.uint32)
         
-        # Analyze colors in texture
-        texture_flat = texture_array.reshape(-1, 3)
-        unique_colors = len(np.unique(texture_flat.view(np.dtype((np.void, texture_flat.dtype.itemsize * 3)))))
+        for (_, mask_band), (_, texture_band) in zip(iter_image_bands(mask_path, band_height), iter_image_bands(texture_path, band_height)):
+            mask_array = to_gray(mask_band)
+            
+            # Texture as RGB (gray images repeat their one channel, alpha is dropped)
+            texture_array = texture_band if texture_band.ndim == 3 else texture_band[..., None]
+            texture_array = texture_array[..., :3] if texture_array.shape[-1] >= 3 else np.repeat(texture_array[..., :1], 3, axis=-1)
+            
+            height += mask_array.shape[0]
+            width = mask_array.shape[1]
+            
+            # Count non-transparent pixels (assuming black is background)
+            sprite_pixels += int(np.sum(mask_array > 0))
+            
+            # Analyze colors in texture, merging each band's palette
+            packed = (texture_array[..., 0].astype(np.uint32) << 16) | (texture_array[..., 1].astype(np.uint32) << 8) | texture_array[..., 2]
+            colors = np.union1d(colors, np.unique(packed))
+        
+        fill_ratio = sprite_pixels / (width * height)
         
         return {
             'dimensions': (width, height),
             'fill_ratio': fill_ratio,
-            'unique_colors': unique_colors,
+            'unique_colors': len(colors),
             'sprite_pixels': sprite_pixels
         }
     
+    def image_size(self, path):
+        """(width, height) of a PNG from its header, or of any other exported sprite"""
+        from src.check_sprites import PNG_SIGNATURE, read_png_header
+        from src.sprite_encoder import open_sprite_file
+        
+        with open(path, "rb") as f:
+            is_png = f.read(8) == PNG_SIGNATURE
+        if is_png:
+            header = read_png_header(path)
+            return header['width'], header['height']
+        return open_sprite_file(path).size
+    
     def create_text_descriptions(self, sprite_name, analysis):
         """Generate text descriptions for sprites based on analysis"""
         # This is where you'll manually create descriptions
@@ -60,11 +87,52 @@ class DoomDataProcessor:
             
         return base_descriptions
     
+    def process_manifest(self, export_dir="data/individual_sprites"):
+        """Process exported sprites listed in the export manifest (no directory walk)"""
+        from src.export_manifest import read_manifest
+        
+        export_dir = Path(export_dir)
+        sprite_data = []
+        
+        for record in read_manifest(export_dir):
+            if not record.get('mask'):
+                continue
+            
+            mask_file = export_dir / record['mask']
+            texture_file = export_dir / record['texture']
+            
+            # Mirror references point at their source files; a flip doesn't change the analysis
+            try:
+                analysis = self.analyze_sprite_pair(mask_file, texture_file)
+            except ValueError as e:
+                print(f"⚠️  Skipping {record['filename_base']}: {e}")
+                continue
+            sprite_name = record['sprite_name'] or record['filename_base']
+            descriptions = self.create_text_descriptions(sprite_name, analysis)
+            
+            sprite_data.append({
+                'mask_path': str(mask_file),
+                'texture_path': str(texture_file),
+                'sprite_name': sprite_name,
+                'labels': {key: record[key] for key in ('sheet', 'row', 'col', 'category', 'action', 'angle', 'frame', 'important')},
+                'flip': record.get('flip', False),
+                'checksum': record['checksum'],
+                'analysis': analysis,
+                'descriptions': descriptions
+            })
+        
+        return sprite_data
+    
     def process_sprite_folder(self, folder_path):
         """Process a folder containing mask and texture files"""
         folder = Path(folder_path)
         sprite_data = []
         
+        # Exporter output comes with a manifest - read that instead of globbing
+        from src.export_manifest import MANIFEST_FILENAME
+        if (folder / MANIFEST_FILENAME).exists():
+            return self.process_manifest(folder)
+        
         # Find all mask-texture pairs
         mask_files = list(folder.glob("*mask*.png")) + list(folder.glob("*_m.png"))
         
@@ -76,7 +144,11 @@ class DoomDataProcessor:
                 print(f"Processing: {mask_file.name} + {texture_file.name}")
                 
                 # Analyze the sprite
-                analysis = self.analyze_sprite_pair(mask_file, texture_file)
+                try:
+                    analysis = self.analyze_sprite_pair(mask_file, texture_file)
+                except ValueError as e:
+                    print(f"⚠️  Skipping {mask_file.name}: {e}")
+                    continue
                 
                 # Create descriptions (you'll improve this later)
                 sprite_name = mask_file.stem.replace('_mask', '').replace('_m', '')
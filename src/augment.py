@@ -0,0 +1,214 @@
+# Batched augmentation for exported sprites
+# Mirrors, hue/palette shifts, small translations and crops are applied to whole
+# (N, H, W, C) batches with numpy. Geometry for texture and mask comes from one shared
+# gather, so masks always line up with their textures. Augmented variants can be
+# materialized once into .augment_cache/ (keyed by seed, parameters and the source
+# sprite checksums) and memory-mapped by later training epochs.
+#
+# Usage (from the project root):
+#   python -m src.augment --variants 8 --seed 0 --size 64
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+CACHE_DIR = ".augment_cache"
+
+DEFAULT_PARAMS = {
+    'flip_prob': 0.5,           # Chance of a horizontal mirror
+    'hue_shift': 0.08,          # Max hue rotation, as a fraction of the colour wheel
+    'palette_gain': 0.15,       # Max per-channel gain change (palette shift)
+    'translate': 2,             # Max shift in pixels
+    'crop_scale': (0.85, 1.0),  # Crop size range as a fraction of the sprite, resized back
+}
+
+def load_record_arrays(record, export_dir="data/individual_sprites"):
+    """Load one manifest entry as (H, W, 3) texture and (H, W) mask arrays, resolving mirror flips"""
+    from src.sprite_encoder import open_sprite_file
+
+    export_dir = Path(export_dir)
+    texture = np.asarray(open_sprite_file(export_dir / record['texture']).convert('RGB'))
+    mask = np.asarray(open_sprite_file(export_dir / record['mask']).convert('L'))
+    if record.get('flip'):
+        texture, mask = texture[:, ::-1], mask[:, ::-1]
+    return texture, mask
+
+def load_sprite_arrays(records, export_dir="data/individual_sprites", size=64):
+    """Load manifest entries into (N, size, size, 3) texture and (N, size, size) mask arrays.
+
+    Sprites are centred on a size x size canvas (cropped if larger); flipped mirror
+    references are resolved. Entries without a mask are skipped.
+    """
+    records = [record for record in records if record.get('mask')]
+    textures = np.zeros((len(records), size, size, 3), dtype=np.uint8)
+    masks = np.zeros((len(records), size, size), dtype=np.uint8)
+
+    for i, record in enumerate(records):
+        texture, mask = load_record_arrays(record, export_dir)
+        height, width = mask.shape
+        src_top, src_left = max(0, (height - size) // 2), max(0, (width - size) // 2)
+        dst_top, dst_left = max(0, (size - height) // 2), max(0, (size - width) // 2)
+        h, w = min(height, size), min(width, size)
+        textures[i, dst_top:dst_top + h, dst_left:dst_left + w] = texture[src_top:src_top + h, src_left:src_left + w]
+        masks[i, dst_top:dst_top + h, dst_left:dst_left + w] = mask[src_top:src_top + h, src_left:src_left + w]
+
+    return textures, masks, records
+
+def rgb_to_hsv(rgb):
+    """Vectorized RGB (0-1 floats) to HSV, any leading shape"""
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    delta = maxc - minc
+    safe = np.where(delta == 0, 1, delta)
+
+    hue = np.where(maxc == r, (g - b) / safe, np.where(maxc == g, 2.0 + (b - r) / safe, 4.0 + (r - g) / safe))
+    hue = np.where(delta == 0, 0.0, (hue / 6.0) % 1.0)
+    saturation = np.where(maxc == 0, 0.0, delta / np.where(maxc == 0, 1, maxc))
+    return np.stack([hue, saturation, maxc], axis=-1)
+
+def hsv_to_rgb(hsv):
+    """Vectorized HSV to RGB (0-1 floats), any leading shape"""
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p, q, t = v * (1 - s), v * (1 - s * f), v * (1 - s * (1 - f))
+    i = i.astype(np.int32) % 6
+
+    choices = [
+        np.stack([v, t, p], axis=-1), np.stack([q, v, p], axis=-1), np.stack([p, v, t], axis=-1),
+        np.stack([p, q, v], axis=-1), np.stack([t, p, v], axis=-1), np.stack([v, p, q], axis=-1),
+    ]
+    return np.choose(i[..., None], choices)
+
+def sample_transforms(count, rng, params):
+    """Draw per-sample transform parameters for a batch"""
+    low, high = params['crop_scale']
+    return {
+        'flip': rng.random(count) < params['flip_prob'],
+        'hue': rng.uniform(-params['hue_shift'], params['hue_shift'], count),
+        'gain': rng.uniform(1 - params['palette_gain'], 1 + params['palette_gain'], (count, 3)),
+        'shift': rng.integers(-params['translate'], params['translate'] + 1, (count, 2)),
+        'scale': rng.uniform(low, high, count),
+        'offset': rng.random((count, 2)),  # Where the crop sits inside the slack, 0-1
+    }
+
+def augment_batch(textures, masks, rng, params=None):
+    """Augment a whole batch at once.
+
+    textures: (N, H, W, 3) uint8, masks: (N, H, W) uint8. Returns new arrays of the same shape.
+    """
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    count, height, width = masks.shape
+    transforms = sample_transforms(count, rng, params)
+
+    # One source coordinate per output pixel: crop -> resize back -> translate -> mirror
+    crop_h = np.maximum(1, np.round(height * transforms['scale'])).astype(np.intp)
+    crop_w = np.maximum(1, np.round(width * transforms['scale'])).astype(np.intp)
+    top = (transforms['offset'][:, 0] * (height - crop_h)).astype(np.intp)
+    left = (transforms['offset'][:, 1] * (width - crop_w)).astype(np.intp)
+
+    ys = top[:, None] + (np.arange(height)[None, :] * crop_h[:, None]) // height - transforms['shift'][:, :1]
+    xs = left[:, None] + (np.arange(width)[None, :] * crop_w[:, None]) // width - transforms['shift'][:, 1:]
+    xs = np.where(transforms['flip'][:, None], xs[:, ::-1], xs)
+
+    valid = ((ys >= 0) & (ys < height))[:, :, None] & ((xs >= 0) & (xs < width))[:, None, :]
+    batch = np.arange(count)[:, None, None]
+    rows = np.clip(ys, 0, height - 1)[:, :, None]
+    cols = np.clip(xs, 0, width - 1)[:, None, :]
+
+    out_masks = np.where(valid, masks[batch, rows, cols], 0).astype(np.uint8)
+    out_textures = np.where(valid[..., None], textures[batch, rows, cols], 0)
+
+    # Colour: hue rotation plus per-channel gain, only where the sprite is
+    hsv = rgb_to_hsv(out_textures.astype(np.float32) / 255.0)
+    hsv[..., 0] = (hsv[..., 0] + transforms['hue'][:, None, None]) % 1.0
+    rgb = hsv_to_rgb(hsv) * transforms['gain'][:, None, None, :]
+    shifted = np.clip(np.round(rgb * 255.0), 0, 255).astype(np.uint8)
+    out_textures = np.where(out_masks[..., None] > 0, shifted, out_textures.astype(np.uint8))
+
+    return out_textures, out_masks
+
+def cache_key(records, seed, params, variants, size):
+    """Identify a materialized augmentation by its inputs"""
+    digest = hashlib.sha1(json.dumps({
+        'seed': seed,
+        'params': {key: list(value) if isinstance(value, tuple) else value for key, value in params.items()},
+        'variants': variants,
+        'size': size,
+        'sprites': [record['checksum'] for record in records],
+    }, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def materialize(records, export_dir="data/individual_sprites", variants=8, seed=0, params=None,
+                size=64, batch_size=256, cache_dir=CACHE_DIR):
+    """Write `variants` augmented copies of every sprite to the cache (skipped if already there).
+
+    Returns the cache directory holding textures.npy (V*N, size, size, 3) and masks.npy.
+    """
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    records = [record for record in records if record.get('mask')]
+    key = cache_key(records, seed, params, variants, size)
+    target = Path(cache_dir) / key
+    if (target / "meta.json").exists():
+        return target
+
+    textures, masks, records = load_sprite_arrays(records, export_dir, size)
+    target.mkdir(parents=True, exist_ok=True)
+    total = variants * len(records)
+
+    # Written straight into memory-mapped .npy files so the whole set never sits in RAM
+    out_textures = np.lib.format.open_memmap(target / "textures.npy.part", mode="w+", dtype=np.uint8, shape=(total, size, size, 3))
+    out_masks = np.lib.format.open_memmap(target / "masks.npy.part", mode="w+", dtype=np.uint8, shape=(total, size, size))
+
+    rng = np.random.default_rng(seed)
+    for variant in range(variants):
+        for start in range(0, len(records), batch_size):
+            end = min(start + batch_size, len(records))
+            offset = variant * len(records)
+            out_textures[offset + start:offset + end], out_masks[offset + start:offset + end] = \
+                augment_batch(textures[start:end], masks[start:end], rng, params)
+
+    out_textures.flush()
+    out_masks.flush()
+    del out_textures, out_masks
+    os.replace(target / "textures.npy.part", target / "textures.npy")
+    os.replace(target / "masks.npy.part", target / "masks.npy")
+
+    with open(target / "meta.json", "w") as f:
+        json.dump({
+            'seed': seed, 'variants': variants, 'size': size,
+            'params': {key: list(value) if isinstance(value, tuple) else value for key, value in params.items()},
+            'sprites': [{'sheet': r['sheet'], 'row': r['row'], 'col': r['col'], 'checksum': r['checksum']} for r in records],
+        }, f, indent=2)
+    return target
+
+def load_materialized(target):
+    """Memory-map a materialized set: (textures, masks, meta)"""
+    target = Path(target)
+    with open(target / "meta.json", "r") as f:
+        meta = json.load(f)
+    return np.load(target / "textures.npy", mmap_mode="r"), np.load(target / "masks.npy", mmap_mode="r"), meta
+
+if __name__ == "__main__":
+    from src.export_manifest import read_manifest
+
+    parser = argparse.ArgumentParser(description="Precompute augmented sprite variants")
+    parser.add_argument("--export-dir", default="data/individual_sprites", help="exporter output with manifest.jsonl")
+    parser.add_argument("--variants", type=int, default=8, help="augmented copies per sprite")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--size", type=int, default=64, help="square canvas size")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="where materialized sets are stored")
+    args = parser.parse_args()
+
+    records = read_manifest(args.export_dir)
+    if not records:
+        print(f"❌ No manifest in {args.export_dir} - run the exporter first")
+    else:
+        target = materialize(records, args.export_dir, args.variants, args.seed, size=args.size, cache_dir=args.cache_dir)
+        textures, masks, meta = load_materialized(target)
+        print(f"✅ {len(textures)} augmented sprites ({args.variants} x {len(meta['sprites'])}) in {target}")
@@ -0,0 +1,126 @@
+# Debounced background autosave for the sprite labeler
+# Edits mark sheets dirty in the LabelStore; after a quiet period the dirty sheets are
+# snapshotted on the Tk thread and written to disk by a background thread.
+
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+
+class AutoSaver:
+    """Writes sprite_labels.json atomically from a background thread"""
+
+    def __init__(self, store, root, path="sprite_labels.json", delay_ms=2000, on_status=None):
+        self.store = store
+        self.root = root
+        self.path = Path(path)
+        self.delay_ms = delay_ms
+        self.on_status = on_status  # Called on the Tk thread with (message, ok)
+
+        self.after_id = None
+        self.poll_id = None
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+
+        # Serialized JSON for each sheet - only touched by the writer thread
+        self.fragments = {}
+
+        self.writer = threading.Thread(target=self.writer_loop, daemon=True)
+        self.writer.start()
+
+        store.listeners.append(self.schedule)
+
+    def schedule(self, sheet_name=None, cell_keys=None):
+        """Restart the debounce timer after an edit"""
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+        self.after_id = self.root.after(self.delay_ms, self.flush)
+
+    def reset(self, data):
+        """Seed the writer with freshly loaded data (must not be shared with the UI)"""
+        self.jobs.put(('reset', data))
+
+    def flush(self):
+        """Snapshot dirty sheets and hand them to the writer (Tk thread only)"""
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+        snapshot = self.store.take_dirty_snapshot()
+        if not snapshot:
+            return False
+
+        self.jobs.put(('save', list(self.store.data.keys()), snapshot))
+        if self.poll_id is None:
+            self.poll_id = self.root.after(100, self.poll_results)
+        return True
+
+    def close(self):
+        """Flush pending edits and wait for the writer to finish"""
+        self.flush()
+        self.jobs.put(None)
+        self.writer.join()
+        self.report_results()
+
+    def poll_results(self):
+        """Report finished writes on the Tk thread"""
+        self.poll_id = None
+        self.report_results()
+        if self.jobs.unfinished_tasks:
+            self.poll_id = self.root.after(100, self.poll_results)
+
+    def report_results(self):
+        while True:
+            try:
+                ok, message, sheet_names = self.results.get_nowait()
+            except queue.Empty:
+                return
+
+            if not ok:
+                # Keep the sheets dirty so the next autosave retries them
+                self.store.dirty_sheets.update(sheet_names)
+            if self.on_status:
+                self.on_status(message, ok)
+
+    def writer_loop(self):
+        """Background thread: serialize changed sheets and rewrite the file"""
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+
+                if job[0] == 'reset':
+                    self.fragments = {
+                        sheet_name: json.dumps(sheet_data, indent=2)
+                        for sheet_name, sheet_data in job[1].items()
+                    }
+                    continue
+
+                _, order, snapshot = job
+                try:
+                    for sheet_name, sheet_data in snapshot.items():
+                        self.fragments[sheet_name] = json.dumps(sheet_data, indent=2)
+                    self.write_file(order)
+                    self.results.put((True, f"Saved {len(snapshot)} changed sheet(s)", list(snapshot)))
+                except Exception as e:
+                    self.results.put((False, f"Autosave failed: {e}", list(snapshot)))
+            finally:
+                self.jobs.task_done()
+
+    def write_file(self, order):
+        """Assemble cached sheet fragments into the label file (same layout as json.dump indent=2)"""
+        entries = [
+            f"  {json.dumps(sheet_name)}: " + self.fragments[sheet_name].replace("\n", "\n  ")
+            for sheet_name in order
+            if sheet_name in self.fragments
+        ]
+        text = "{\n" + ",\n".join(entries) + "\n}" if entries else "{}"
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,260 @@
+# Headless batch exporter
+# Exports every labeled sheet in sprite_labels.json without launching the labeler.
+#
+# Usage (from the project root):
+#   python -m src.batch_export --workers 4
+#   python -m src.batch_export --resume        # pick up after an interrupted run
+#   python -m src.batch_export --stream        # decode sheets one grid row at a time, no cache
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from src.export_manifest import MANIFEST_FILENAME, report_collisions, update_manifest
+from src.label_index import LabelIndex, group_by_sheet, parse_query
+from src.png_stream import BandedSheet
+from src.sheet_cache import open_cached_sheet
+from src.sprite_encoder import FORMATS, SpriteEncoder
+from src.sprite_exporter import export_sprite_sheet, sheet_grid
+
+STATE_FILENAME = ".export_state.json"
+
+def sheet_paths(sheet_name, sprites_dir="sprites"):
+    """Get the texture and mask paths for a sheet"""
+    sprites_dir = Path(sprites_dir)
+    texture_path = sprites_dir / f"{sheet_name}_6xGigaPixel.png"
+    mask_path = sprites_dir / f"{sheet_name}A_6xGigaPixel.png"
+    return texture_path, mask_path
+
+def sheet_fingerprint(sheet_data, texture_path, mask_path, cell_keys=None, output_options=None):
+    """Fingerprint a sheet's labels, source files and output settings so resume can spot changes"""
+    digest = hashlib.sha1(json.dumps(sheet_data, sort_keys=True).encode("utf-8"))
+    if cell_keys is not None:
+        digest.update(json.dumps(cell_keys).encode("utf-8"))
+    if output_options is not None:
+        digest.update(json.dumps(output_options, sort_keys=True).encode("utf-8"))
+
+    for path in (texture_path, mask_path):
+        if path.exists():
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+
+    return digest.hexdigest()
+
+def load_export_state(output_dir):
+    """Load the fingerprints of sheets finished by a previous run"""
+    state_path = Path(output_dir) / STATE_FILENAME
+    if not state_path.exists():
+        return {}
+
+    try:
+        with open(state_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_export_state(output_dir, state):
+    """Write the resume state atomically so an interrupt never corrupts it"""
+    state_path = Path(output_dir) / STATE_FILENAME
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+def export_sheet_job(sheet_name, sheet_data, sprites_dir, output_dir, mirror_refs=False, cell_keys=None, encoder_options=None, stream=False):
+    """Export one sheet in a worker process.
+
+    With stream, sheets are decoded in bands as the exporter walks down the grid, so
+    memory stays at about one row of cells and nothing is written to .sheet_cache.
+    """
+    texture_path, mask_path = sheet_paths(sheet_name, sprites_dir)
+
+    open_sheet = BandedSheet if stream else open_cached_sheet
+    texture_img = open_sheet(texture_path)
+    mask_img = open_sheet(mask_path) if mask_path.exists() else None
+
+    grid_cols, grid_rows = sheet_grid(sheet_data, texture_img.size)
+
+    manifest = []
+    with SpriteEncoder(**(encoder_options or {})) as encoder:
+        count = export_sprite_sheet(
+            sheet_name,
+            texture_img,
+            mask_img,
+            sheet_data,
+            grid_cols,
+            grid_rows,
+            output_dir=output_dir,
+            verbose=False,
+            mirror_refs=mirror_refs,
+            cell_keys=cell_keys,
+            manifest=manifest,
+            encoder=encoder
+        )
+    return count, (grid_cols, grid_rows), manifest
+
+def run_batch_export(labels_path="sprite_labels.json", sprites_dir="sprites",
+                     output_dir="data/individual_sprites", workers=None, resume=False, sheets=None, mirror_refs=False, query=None,
+                     encoder_options=None, stream=False):
+    """Export all labeled sheets in parallel, reporting progress as sheets finish.
+
+    query (e.g. "action:walk angle:angle315 category:creature") exports only the matching cells.
+    encoder_options are SpriteEncoder arguments (format, compress_level, mask_mode, threads).
+    """
+    labels_path = Path(labels_path)
+    if not labels_path.exists():
+        print(f"❌ {labels_path} not found!")
+        return 0
+
+    with open(labels_path, "r") as f:
+        sprites_data = json.load(f)
+
+    state = load_export_state(output_dir) if resume else {}
+
+    # A sheet exported with another format, mask mode or mirror setting isn't up to date
+    encoder_settings = SpriteEncoder(**{key: value for key, value in (encoder_options or {}).items() if key != 'threads'}).settings
+    output_options = dict(encoder_settings, mirror_refs=mirror_refs)
+
+    # Look up matching cells in the label index instead of scanning every sheet
+    selected = None
+    if query:
+        index = LabelIndex()
+        index.rebuild(sprites_data)
+        selected = group_by_sheet(index.query(**parse_query(query)))
+        print(f"🔎 {sum(len(keys) for keys in selected.values())} cells on {len(selected)} sheets match '{query}'")
+
+    # Work out which sheets still need exporting
+    jobs = []
+    skipped = 0
+    for sheet_name, sheet_data in sorted(sprites_data.items()):
+        if sheets and sheet_name not in sheets:
+            continue
+        if not sheet_data.get('sprites'):
+            continue
+        cell_keys = selected.get(sheet_name) if selected is not None else None
+        if selected is not None and not cell_keys:
+            continue
+
+        texture_path, mask_path = sheet_paths(sheet_name, sprites_dir)
+        if not texture_path.exists():
+            print(f"⚠️  {sheet_name}: {texture_path} not found, skipping")
+            continue
+
+        fingerprint = sheet_fingerprint(sheet_data, texture_path, mask_path, cell_keys, output_options)
+        if resume and state.get(sheet_name) == fingerprint:
+            skipped += 1
+            continue
+
+        jobs.append((sheet_name, sheet_data, fingerprint, cell_keys))
+
+    if resume and skipped:
+        print(f"⏭️  Resuming: {skipped} sheets already exported")
+
+    if not jobs:
+        print("✅ Nothing to export")
+        return 0
+
+    print(f"🔄 Exporting {len(jobs)} sheets with {workers or os.cpu_count()} workers...")
+
+    total_exported = 0
+    failed = []
+    manifest = []
+    full_sheets = []
+    start_time = time.time()
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(
+                export_sheet_job, sheet_name, sheet_data, str(sprites_dir), str(output_dir), mirror_refs, cell_keys,
+                encoder_options, stream
+            ): (sheet_name, fingerprint)
+            for sheet_name, sheet_data, fingerprint, cell_keys in jobs
+        }
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            sheet_name, fingerprint = futures[future]
+            try:
+                count, (grid_cols, grid_rows), records = future.result()
+            except Exception as e:
+                failed.append(sheet_name)
+                print(f"[{done}/{len(jobs)}] ❌ {sheet_name}: {e}")
+                continue
+
+            total_exported += count
+            manifest.extend(records)
+            if selected is None:
+                full_sheets.append(sheet_name)
+            state[sheet_name] = fingerprint
+            save_export_state(output_dir, state)
+
+            elapsed = time.time() - start_time
+            print(f"[{done}/{len(jobs)}] ✅ {sheet_name}: {count} sprites ({grid_cols}x{grid_rows}) - {elapsed:.1f}s elapsed")
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        print("\n⚠️  Interrupted - rerun with --resume to continue")
+        raise
+    finally:
+        # Record whatever finished, even after an interrupt
+        if manifest:
+            merged = update_manifest(output_dir, manifest, replace_sheets=full_sheets)
+    executor.shutdown()
+
+    if manifest:
+        print(f"📋 Manifest: {len(merged)} sprites in {Path(output_dir) / MANIFEST_FILENAME}")
+        report_collisions(merged)
+
+    print(f"✅ Exported {total_exported} sprites from {len(jobs) - len(failed)} sheets")
+    if failed:
+        print(f"❌ Failed sheets: {', '.join(failed)}")
+
+    return total_exported
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export labeled sprite sheets without the labeler UI")
+    parser.add_argument("--labels", default="sprite_labels.json", help="label file written by the labeler")
+    parser.add_argument("--sprites-dir", default="sprites", help="folder with the 6xGigaPixel sheets")
+    parser.add_argument("--output-dir", default="data/individual_sprites", help="export destination")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--resume", action="store_true", help="skip sheets finished by a previous run")
+    parser.add_argument("--sheet", action="append", dest="sheets", help="only export this sheet (repeatable)")
+    parser.add_argument("--format", choices=list(FORMATS), default="png", help="file format for exported sprites")
+    parser.add_argument("--compress-level", type=int, default=6, choices=range(10), metavar="0-9", help="PNG zlib level (lower is faster)")
+    parser.add_argument("--mask-mode", choices=["L", "1", "source"], default="L", help="store masks as 8-bit (L) or 1-bit (1) grayscale, or in the sheet's own mode (source)")
+    parser.add_argument("--encode-threads", type=int, default=2, help="encoder threads per worker process")
+    parser.add_argument("--filter", dest="query", help="only export matching cells, e.g. 'action:walk angle:angle315'")
+    parser.add_argument("--mirror-refs", action="store_true", help="store mirrored angles as references in mirrors.json")
+    parser.add_argument("--stream", action="store_true", help="decode sheets in bands instead of through .sheet_cache (lowest memory)")
+    args = parser.parse_args(argv)
+
+    try:
+        run_batch_export(
+            labels_path=args.labels,
+            sprites_dir=args.sprites_dir,
+            output_dir=args.output_dir,
+            workers=args.workers,
+            resume=args.resume,
+            sheets=args.sheets,
+            mirror_refs=args.mirror_refs,
+            query=args.query,
+            stream=args.stream,
+            encoder_options={
+                'format': args.format,
+                'compress_level': args.compress_level,
+                'mask_mode': args.mask_mode,
+                'threads': args.encode_threads
+            }
+        )
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
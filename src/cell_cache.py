@@ -0,0 +1,69 @@
+# Cell crop cache for the labeler's preview pane
+# Cells are cut from the source sheet at an exact integer zoom (every k-th pixel
+# when shrinking, k x k pixel blocks when enlarging), so sprite pixels stay crisp.
+
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+def integer_zoom(cell_width, cell_height, max_width, max_height):
+    """Pick the largest integer zoom (or smallest integer step) that fits the box.
+
+    Returns (step, repeat): take every step-th sheet pixel, then repeat each one repeat times.
+    """
+    fit = min(max_width / cell_width, max_height / cell_height)
+    if fit >= 1:
+        return 1, max(1, int(fit))
+    return int(np.ceil(1 / fit)), 1
+
+def crop_cell(image, box, step, repeat):
+    """Cut a region from a sheet at an integer zoom"""
+    left, top, right, bottom = box
+
+    if hasattr(image, 'array'):
+        # Memory-mapped sheet: strided slicing only reads the sampled rows
+        pixels = np.asarray(image.pixels((slice(top, bottom, step), slice(left, right, step))))
+    else:
+        pixels = np.asarray(image.crop(box))[::step, ::step]
+
+    if repeat > 1:
+        pixels = pixels.repeat(repeat, axis=0).repeat(repeat, axis=1)
+
+    return Image.fromarray(np.ascontiguousarray(pixels), image.mode)
+
+class CellCropCache:
+    """Bounded LRU of cell crops keyed by sheet, cell box and zoom"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image, box, max_size):
+        """Get a cell crop that fits in max_size, extracting it on a miss"""
+        left, top, right, bottom = box
+        step, repeat = integer_zoom(right - left, bottom - top, *max_size)
+        key = (str(getattr(image, 'source_path', id(image))), box, step, repeat)
+
+        crop = self.entries.get(key)
+        if crop is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return crop
+
+        self.misses += 1
+        crop = crop_cell(image, box, step, repeat)
+        self.entries[key] = crop
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return crop
+
+    def clear(self):
+        self.entries.clear()
+
+    def nbytes(self):
+        """Approximate memory held by cached crops"""
+        return sum(crop.width * crop.height * len(crop.getbands()) for crop in self.entries.values())
@@ -1,7 +1,16 @@
 import os
+import argparse
+import json
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from collections import defaultdict
 
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
 def check_sprites_directory():
     """Check the sprites directory for 6xGigaPixel textures and masks"""
     
@@ -105,6 +114,167 @@ def categorize_sprites(creatures):
     
     return categories
 
+def read_png_header(path):
+    """Read width, height, bit depth and colour type from a PNG's IHDR chunk without decoding it"""
+    with open(path, "rb") as f:
+        header = f.read(26)
+    
+    if len(header) < 26 or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        raise ValueError(f"{Path(path).name} is not a valid PNG")
+    
+    width, height, bit_depth, color_type = struct.unpack(">IIBB", header[16:26])
+    return {'width': width, 'height': height, 'bit_depth': bit_depth, 'color_type': color_type}
+
+def find_sprite_pairs(sprites_dir="sprites"):
+    """Map each sheet name to its 6xGigaPixel texture and mask paths"""
+    pairs = defaultdict(dict)
+    
+    for file_path in Path(sprites_dir).glob("*6xGigaPixel*.png"):
+        filename = file_path.name
+        if filename.endswith("A_6xGigaPixel.png"):
+            pairs[filename.replace("A_6xGigaPixel.png", "")]['mask'] = file_path
+        elif filename.endswith("_6xGigaPixel.png"):
+            pairs[filename.replace("_6xGigaPixel.png", "")]['texture'] = file_path
+    
+    return dict(pairs)
+
+def verify_sprite_pair(sheet_name, texture_path, mask_path, band_height=256):
+    """Compare a texture and its mask band by band (runs in a worker process)"""
+    result = {
+        'sheet': sheet_name,
+        'texture': str(texture_path),
+        'mask': str(mask_path),
+        'errors': [],
+        'warnings': []
+    }
+    
+    # Sizes come from the PNG headers, so mismatches are caught without decoding
+    texture_header = read_png_header(texture_path)
+    mask_header = read_png_header(mask_path)
+    result['texture_size'] = [texture_header['width'], texture_header['height']]
+    result['mask_size'] = [mask_header['width'], mask_header['height']]
+    
+    if result['texture_size'] != result['mask_size']:
+        result['errors'].append("texture and mask sizes differ")
+        result['status'] = "error"
+        return result
+    
+    # Decoded sheets come memory-mapped from the shared cache
+    from src.mask_synthesis import estimate_backgrounds, key_foreground
+    from src.sheet_cache import open_cached_sheet, to_gray
+    texture = open_cached_sheet(texture_path).array
+    mask = open_cached_sheet(mask_path).array
+    height, width = texture.shape[:2]
+    
+    has_alpha = texture.ndim == 3 and texture.shape[-1] in (2, 4)
+    # Background colours come from border-strip and gutter statistics, not a few corner pixels
+    backgrounds = None if has_alpha else estimate_backgrounds(texture, band_height=band_height)[0]
+    
+    mask_values = np.zeros(256, dtype=np.int64)
+    both = mask_only = texture_only = 0
+    
+    # Compare one horizontal band at a time to keep temporaries small
+    for top in range(0, height, band_height):
+        bottom = min(top + band_height, height)
+        mask_band = to_gray(np.asarray(mask[top:bottom]))
+        texture_band = np.asarray(texture[top:bottom])
+        
+        mask_values += np.bincount(mask_band.ravel(), minlength=256)
+        
+        if has_alpha:
+            texture_fg = texture_band[..., -1] > 0
+        else:
+            texture_fg = key_foreground(texture_band, backgrounds)
+        mask_fg = mask_band > 127
+        
+        both += int(np.count_nonzero(mask_fg & texture_fg))
+        mask_only += int(np.count_nonzero(mask_fg & ~texture_fg))
+        texture_only += int(np.count_nonzero(texture_fg & ~mask_fg))
+    
+    total_pixels = width * height
+    non_binary = int(mask_values[1:255].sum())
+    union = both + mask_only + texture_only
+    
+    result.update({
+        'texture_has_alpha': has_alpha,
+        'backgrounds': None if backgrounds is None else backgrounds.tolist(),
+        'mask_distinct_values': int(np.count_nonzero(mask_values)),
+        'mask_non_binary_ratio': non_binary / total_pixels,
+        'mask_coverage': (both + mask_only) / total_pixels,
+        'texture_coverage': (both + texture_only) / total_pixels,
+        'iou': both / union if union else 1.0,
+        'mask_only_ratio': mask_only / total_pixels,
+        'texture_only_ratio': texture_only / total_pixels
+    })
+    
+    if result['mask_non_binary_ratio'] > 0.01:
+        result['warnings'].append("mask is not binary")
+    if result['iou'] < 0.9:
+        result['warnings'].append("mask coverage does not match texture foreground")
+    
+    result['status'] = "warning" if result['warnings'] else "ok"
+    return result
+
+def verify_sprites_directory(sprites_dir="sprites", report_path="sprite_verification.json", workers=None):
+    """Check every texture/mask pair in parallel and write a JSON report"""
+    pairs = find_sprite_pairs(sprites_dir)
+    if not pairs:
+        print(f"❌ No 6xGigaPixel files found in {sprites_dir}/")
+        return None
+    
+    print(f"🔍 Verifying {len(pairs)} sheets...")
+    print("=" * 60)
+    
+    results = []
+    jobs = {}
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for sheet_name, files in sorted(pairs.items()):
+            if 'texture' not in files or 'mask' not in files:
+                missing = 'mask' if 'texture' in files else 'texture'
+                results.append({
+                    'sheet': sheet_name,
+                    'status': "error",
+                    'errors': [f"{missing} file missing"],
+                    'warnings': []
+                })
+                continue
+            
+            future = executor.submit(verify_sprite_pair, sheet_name, files['texture'], files['mask'])
+            jobs[future] = sheet_name
+        
+        for future in as_completed(jobs):
+            sheet_name = jobs[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'sheet': sheet_name, 'status': "error", 'errors': [str(e)], 'warnings': []}
+            results.append(result)
+            
+            icon = {"ok": "✅", "warning": "⚠️ ", "error": "❌"}[result['status']]
+            problems = ", ".join(result['errors'] + result['warnings'])
+            print(f"  {icon} {sheet_name:<25} {problems}")
+    
+    results.sort(key=lambda r: r['sheet'])
+    summary = {
+        status: sum(1 for r in results if r['status'] == status)
+        for status in ("ok", "warning", "error")
+    }
+    
+    report = {
+        'generated': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'sprites_dir': str(sprites_dir),
+        'summary': summary,
+        'sheets': results
+    }
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    
+    print()
+    print(f"SUMMARY: ✅ {summary['ok']} ok | ⚠️  {summary['warning']} warnings | ❌ {summary['error']} errors")
+    print(f"📄 Report written to {report_path}")
+    return report
+
 def show_labeling_recommendations():
     """Show which creatures to start labeling first"""
     print("\n🎯 LABELING RECOMMENDATIONS:")
@@ -132,5 +302,15 @@ def show_labeling_recommendations():
     print("  • Save complex multi-form creatures for last")
 
 if __name__ == "__main__":
-    creatures = check_sprites_directory()
-    show_labeling_recommendations()
+    parser = argparse.ArgumentParser(description="Check the sprites/ directory")
+    parser.add_argument("--verify", action="store_true", help="compare every mask against its texture")
+    parser.add_argument("--report", default="sprite_verification.json", help="where to write the verification report")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for --verify")
+    args = parser.parse_args()
+    
+    if args.verify:
+        verify_sprites_directory(report_path=args.report, workers=args.workers)
+    else:
+        creatures = check_sprites_directory()
+        show_labeling_recommendations()
+
@@ -0,0 +1,137 @@
+# Export manifest
+# One JSON line per exported sprite (sheet, cell, labels, files, size, checksum), kept in
+# <output_dir>/manifest.jsonl. Loaders read this single file instead of globbing the
+# export tree and parsing filenames back into labels.
+#
+# Usage (from the project root):
+#   python -m src.export_manifest                 # summary + filename collisions
+#   python -m src.export_manifest --csv manifest.csv
+
+import argparse
+import csv
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+
+MANIFEST_FILENAME = "manifest.jsonl"
+
+# Column order for CSV output (and the key order of each JSON line)
+MANIFEST_FIELDS = (
+    'sheet', 'row', 'col', 'category', 'sprite_name', 'action', 'angle', 'frame', 'important',
+    'filename_base', 'texture', 'mask', 'width', 'height', 'checksum', 'mirror_of', 'flip', 'collides_with'
+)
+
+def manifest_record(sheet_name, category, sprite_data, filename_base, texture_path, mask_path,
+                    size, checksum, mirror_of=None, collides_with=None):
+    """Build one manifest entry (paths are relative to the export directory)"""
+    return {
+        'sheet': sheet_name,
+        'row': sprite_data['row'],
+        'col': sprite_data['col'],
+        'category': category,
+        'sprite_name': sprite_data.get('sprite_name', ''),
+        'action': sprite_data.get('action', ''),
+        'angle': sprite_data.get('angle', ''),
+        'frame': sprite_data.get('frame', 1),
+        'important': sprite_data.get('important', False),
+        'filename_base': filename_base,
+        'texture': texture_path,
+        'mask': mask_path,
+        'width': size[0],
+        'height': size[1],
+        'checksum': checksum,
+        'mirror_of': mirror_of,        # Source filename_base when stored as a flipped reference
+        'flip': mirror_of is not None,
+        'collides_with': collides_with  # "row,col" of an earlier cell with the same filename
+    }
+
+def read_manifest(output_dir="data/individual_sprites"):
+    """Read all manifest entries, or an empty list if there is no manifest yet"""
+    manifest_path = Path(output_dir) / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return []
+
+    with open(manifest_path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def write_manifest(output_dir, records):
+    """Rewrite the manifest atomically"""
+    manifest_path = Path(output_dir) / MANIFEST_FILENAME
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    os.replace(tmp_path, manifest_path)
+
+def update_manifest(output_dir, records, replace_sheets=()):
+    """Merge freshly exported entries into the manifest.
+
+    Entries for the same cells are replaced; sheets in replace_sheets (full re-exports)
+    lose all their old entries first. Returns the merged list.
+    """
+    replace_sheets = set(replace_sheets)
+    new_cells = {(record['sheet'], record['row'], record['col']) for record in records}
+
+    merged = [
+        record for record in read_manifest(output_dir)
+        if record['sheet'] not in replace_sheets and (record['sheet'], record['row'], record['col']) not in new_cells
+    ]
+    merged.extend(records)
+    merged.sort(key=lambda record: (record['sheet'], record['row'], record['col']))
+
+    write_manifest(output_dir, merged)
+    return merged
+
+def manifest_index(records):
+    """Index entries by (sheet, row, col) for constant-time lookups"""
+    return {(record['sheet'], record['row'], record['col']): record for record in records}
+
+def find_collisions(records):
+    """Find exported files written by more than one cell.
+
+    Returns {texture path: [(sheet, row, col), ...]} for paths shared by several entries
+    (e.g. two sheets whose names differ only in case). Mirror references are skipped.
+    """
+    by_path = defaultdict(list)
+    for record in records:
+        if not record.get('flip'):
+            by_path[record['texture']].append((record['sheet'], record['row'], record['col']))
+    return {path: cells for path, cells in by_path.items() if len(cells) > 1}
+
+def write_csv(records, csv_path):
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
+
+def report_collisions(records):
+    """Print cells that were renamed or that share an output file; returns the number of problems"""
+    renamed = [record for record in records if record.get('collides_with')]
+    for record in renamed:
+        print(f"⚠️  {record['sheet']} {record['row']},{record['col']}: same filename as cell "
+              f"{record['collides_with']} - written as {record['filename_base']}")
+
+    shared = find_collisions(records)
+    for path, cells in shared.items():
+        print(f"❌ {path} is written by {len(cells)} cells: {', '.join(f'{s} {r},{c}' for s, r, c in cells)}")
+
+    return len(renamed) + len(shared)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the export manifest")
+    parser.add_argument("--output-dir", default="data/individual_sprites", help="export destination")
+    parser.add_argument("--csv", help="also write the manifest as CSV to this path")
+    args = parser.parse_args()
+
+    records = read_manifest(args.output_dir)
+    sheets = {record['sheet'] for record in records}
+    print(f"📋 {len(records)} sprites from {len(sheets)} sheets in {Path(args.output_dir) / MANIFEST_FILENAME}")
+
+    if report_collisions(records) == 0:
+        print("✅ No filename collisions")
+    if args.csv:
+        write_csv(records, args.csv)
+        print(f"✅ Wrote {args.csv}")
@@ -0,0 +1,280 @@
+# Optional SQLite label store
+# Keeps the same labels as sprite_labels.json, but with one row per sheet and per cell,
+# so an edit is a single-row upsert and several people can label different sheets at
+# once (WAL mode lets readers and one writer work concurrently).
+#
+# The labeler uses sprite_labels.db instead of sprite_labels.json when the file exists.
+#
+# Usage (from the project root):
+#   python -m src.label_db import                    # sprite_labels.json -> sprite_labels.db
+#   python -m src.label_db export                    # sprite_labels.db -> sprite_labels.json
+#   python -m src.label_db query --action walk --angle angle315
+
+import argparse
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+DB_PATH = "sprite_labels.db"
+
+# Cell fields stored in their own columns; anything else (e.g. mirror_of) goes in `extra`
+CELL_COLUMNS = ('sprite_name', 'action', 'angle', 'frame', 'empty', 'important')
+QUERY_COLUMNS = ('sprite_name', 'action', 'angle')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheets (
+    name TEXT PRIMARY KEY,
+    grid_cols INTEGER,
+    grid_rows INTEGER,
+    sheet_info TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS cells (
+    sheet TEXT NOT NULL REFERENCES sheets(name) ON DELETE CASCADE,
+    row INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    sprite_name TEXT NOT NULL DEFAULT '',
+    action TEXT NOT NULL DEFAULT '',
+    angle TEXT NOT NULL DEFAULT '',
+    frame INTEGER NOT NULL DEFAULT 1,
+    empty INTEGER NOT NULL DEFAULT 0,
+    important INTEGER NOT NULL DEFAULT 0,
+    extra TEXT,
+    PRIMARY KEY (sheet, row, col)
+);
+CREATE INDEX IF NOT EXISTS cells_sprite_name ON cells (sprite_name);
+CREATE INDEX IF NOT EXISTS cells_action ON cells (action);
+CREATE INDEX IF NOT EXISTS cells_angle ON cells (angle);
+"""
+
+class LabelDatabase:
+    """sprite_labels.json as two SQLite tables (sheets and cells)"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def upsert_sheet(self, sheet_name, sheet_data):
+        """Write a sheet's grid and sheet_info (cells are written separately)"""
+        grid = sheet_data.get('grid') or {}
+        self.conn.execute(
+            "INSERT INTO sheets (name, grid_cols, grid_rows, sheet_info) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET grid_cols=excluded.grid_cols, grid_rows=excluded.grid_rows, "
+            "sheet_info=excluded.sheet_info",
+            (sheet_name, grid.get('cols'), grid.get('rows'), json.dumps(sheet_data.get('sheet_info', {})))
+        )
+
+    def upsert_cell(self, sheet_name, cell_data):
+        """Write one cell's labels"""
+        extra = {key: value for key, value in cell_data.items() if key not in CELL_COLUMNS + ('row', 'col')}
+        self.conn.execute(
+            "INSERT INTO cells (sheet, row, col, sprite_name, action, angle, frame, empty, important, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (sheet, row, col) DO UPDATE SET sprite_name=excluded.sprite_name, action=excluded.action, "
+            "angle=excluded.angle, frame=excluded.frame, empty=excluded.empty, important=excluded.important, "
+            "extra=excluded.extra",
+            (
+                sheet_name, cell_data['row'], cell_data['col'],
+                cell_data.get('sprite_name', ''), cell_data.get('action', ''), cell_data.get('angle', ''),
+                cell_data.get('frame', 1), int(bool(cell_data.get('empty', False))),
+                int(bool(cell_data.get('important', False))),
+                json.dumps(extra) if extra else None
+            )
+        )
+
+    def save_changes(self, changes):
+        """Write edits in one transaction.
+
+        changes: iterable of (sheet_name, sheet_data, cell_keys). cell_keys None means only
+        the sheet row changed (grid or sheet_info); otherwise just those cells are upserted.
+        """
+        with self.conn:
+            for sheet_name, sheet_data, cell_keys in changes:
+                self.upsert_sheet(sheet_name, sheet_data)
+                sprites = sheet_data.get('sprites', {})
+                for cell_key in cell_keys or ():
+                    if cell_key in sprites:
+                        self.upsert_cell(sheet_name, sprites[cell_key])
+
+    def import_data(self, data):
+        """Replace the database contents with label data in the JSON layout"""
+        with self.conn:
+            self.conn.execute("DELETE FROM cells")
+            self.conn.execute("DELETE FROM sheets")
+            for sheet_name, sheet_data in data.items():
+                self.upsert_sheet(sheet_name, sheet_data)
+                for cell_data in sheet_data.get('sprites', {}).values():
+                    self.upsert_cell(sheet_name, cell_data)
+
+    def replace_sheets(self, sheets):
+        """Add sheets, or replace them with all their cells, leaving every other sheet alone"""
+        with self.conn:
+            for sheet_name, sheet_data in sheets.items():
+                self.conn.execute("DELETE FROM cells WHERE sheet = ?", (sheet_name,))
+                self.upsert_sheet(sheet_name, sheet_data)
+                for cell_data in sheet_data.get('sprites', {}).values():
+                    self.upsert_cell(sheet_name, cell_data)
+
+    def cell_from_row(self, row):
+        """Rebuild a cell dict with the same key order the labeler writes"""
+        _, row_index, col, sprite_name, action, angle, frame, empty, important, extra = row
+        cell_data = {
+            'sprite_name': sprite_name,
+            'action': action,
+            'angle': angle,
+            'frame': frame,
+            'empty': bool(empty),
+            'important': bool(important),
+            'row': row_index,
+            'col': col
+        }
+        if extra:
+            cell_data.update(json.loads(extra))
+        return cell_data
+
+    def load(self):
+        """Read everything back in the sprite_labels.json layout (rows come back in insertion order)"""
+        data = {}
+        for name, grid_cols, grid_rows, sheet_info in self.conn.execute(
+            "SELECT name, grid_cols, grid_rows, sheet_info FROM sheets ORDER BY rowid"
+        ):
+            data[name] = {'sheet_info': json.loads(sheet_info), 'sprites': {}}
+            if grid_cols is not None and grid_rows is not None:
+                data[name]['grid'] = {'cols': grid_cols, 'rows': grid_rows}
+
+        for row in self.conn.execute(
+            "SELECT sheet, row, col, sprite_name, action, angle, frame, empty, important, extra FROM cells ORDER BY rowid"
+        ):
+            data[row[0]]['sprites'][f"{row[1]},{row[2]}"] = self.cell_from_row(row)
+        return data
+
+    def find_cells(self, **filters):
+        """Find cells by sprite_name, action and/or angle (uses the column indexes).
+
+        Returns a list of (sheet_name, cell_data).
+        """
+        unknown = set(filters) - set(QUERY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Can't filter on {', '.join(sorted(unknown))}")
+
+        where = " AND ".join(f"{column} = ?" for column in filters) or "1"
+        rows = self.conn.execute(
+            f"SELECT sheet, row, col, sprite_name, action, angle, frame, empty, important, extra FROM cells "
+            f"WHERE {where} ORDER BY sheet, row, col",
+            tuple(filters.values())
+        )
+        return [(row[0], self.cell_from_row(row)) for row in rows]
+
+    def import_json(self, json_path="sprite_labels.json"):
+        with open(json_path, "r") as f:
+            data = json.load(f)
+        self.import_data(data)
+        return data
+
+    def export_json(self, json_path="sprite_labels.json"):
+        """Write the labels back out as sprite_labels.json (atomically)"""
+        data = self.load()
+        json_path = Path(json_path)
+        tmp_path = json_path.with_name(json_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, json_path)
+        return data
+
+class DatabaseSaver:
+    """Drop-in replacement for AutoSaver that upserts only the edited cells"""
+
+    def __init__(self, store, root, db, delay_ms=500, on_status=None):
+        self.store = store
+        self.root = root
+        self.db = db
+        self.delay_ms = delay_ms
+        self.on_status = on_status
+
+        self.after_id = None
+        self.pending = {}  # sheet_name -> set of changed cell keys
+
+        store.listeners.append(self.schedule)
+
+    def schedule(self, sheet_name=None, cell_keys=None):
+        """Remember what changed and restart the debounce timer"""
+        if sheet_name is not None:
+            self.pending.setdefault(sheet_name, set()).update(cell_keys or ())
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+        self.after_id = self.root.after(self.delay_ms, self.flush)
+
+    def reset(self, data):
+        """Nothing to seed - the database is the source of the loaded data"""
+        self.pending.clear()
+
+    def flush(self):
+        """Upsert pending edits (fast enough to run on the Tk thread)"""
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+        if not self.pending:
+            return False
+
+        pending, self.pending = self.pending, {}
+        changes = [
+            (sheet_name, self.store.data.get(sheet_name, {}), cell_keys)
+            for sheet_name, cell_keys in pending.items()
+        ]
+        try:
+            self.db.save_changes(changes)
+        except sqlite3.Error as e:
+            # Keep the edits so the next flush retries them
+            for sheet_name, cell_keys in pending.items():
+                self.pending.setdefault(sheet_name, set()).update(cell_keys)
+            message, ok = f"Database save failed: {e}", False
+        else:
+            self.store.dirty_sheets.difference_update(pending)
+            cell_count = sum(len(cell_keys) for cell_keys in pending.values())
+            message, ok = f"Saved {cell_count} cell(s) to {self.db.path.name}", True
+
+        if self.on_status:
+            self.on_status(message, ok)
+        return True
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move labels between sprite_labels.json and SQLite")
+    parser.add_argument("command", choices=["import", "export", "query"])
+    parser.add_argument("--json", default="sprite_labels.json", help="JSON label file")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite label database")
+    for column in QUERY_COLUMNS:
+        parser.add_argument(f"--{column.replace('_', '-')}", dest=column, help=f"query: match {column}")
+    args = parser.parse_args(argv)
+
+    db = LabelDatabase(args.db)
+    try:
+        if args.command == "import":
+            data = db.import_json(args.json)
+            print(f"✅ Imported {len(data)} sheets from {args.json} into {args.db}")
+        elif args.command == "export":
+            data = db.export_json(args.json)
+            print(f"✅ Exported {len(data)} sheets from {args.db} to {args.json}")
+        else:
+            filters = {column: getattr(args, column) for column in QUERY_COLUMNS if getattr(args, column)}
+            matches = db.find_cells(**filters)
+            for sheet_name, cell_data in matches:
+                print(f"{sheet_name} {cell_data['row']},{cell_data['col']}: "
+                      f"{cell_data['sprite_name']} {cell_data['action']} {cell_data['angle']} F{cell_data['frame']}")
+            print(f"{len(matches)} matching cells")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Inverted index over the label data
+# Maps each label value (sprite_name, action, angle, sheet category, important, empty)
+# to the set of cells that have it, so queries like "every walk frame at angle315 on
+# creature sheets" intersect a few small sets instead of scanning every sheet.
+# Attached to a LabelStore, it is kept up to date as cells are edited.
+
+from collections import defaultdict
+
+INDEXED_FIELDS = ('sprite_name', 'action', 'angle', 'category', 'important', 'empty')
+FLAG_FIELDS = ('important', 'empty')
+
+def normalize(field, value):
+    """Index values case-insensitively; flags as booleans"""
+    if field in FLAG_FIELDS:
+        return str(value).lower() in ('1', 'true', 'yes') if isinstance(value, str) else bool(value)
+    return str(value).strip().lower()
+
+def parse_query(text):
+    """Turn a search string into filters.
+
+    "action:walk angle:angle315 category:creature important" -> {'action': 'walk', ...}
+    Bare words match sprite_name; bare flag names (important, empty) mean True.
+    """
+    filters = {}
+    for token in text.split():
+        field, _, value = token.partition(':')
+        if value and field in INDEXED_FIELDS:
+            filters[field] = value
+        elif token in FLAG_FIELDS:
+            filters[token] = True
+        else:
+            filters['sprite_name'] = token
+    return filters
+
+class LabelIndex:
+    """value -> cells postings for the indexed label fields"""
+
+    def __init__(self, store=None):
+        self.postings = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        self.cell_terms = {}  # (sheet_name, cell_key) -> {field: value} currently indexed
+        self.sheet_cells = defaultdict(set)  # sheet_name -> indexed cell keys
+        self.store = store
+
+        if store is not None:
+            self.rebuild(store.data)
+            store.listeners.append(self.on_store_change)
+
+    def rebuild(self, data):
+        """Index everything from scratch (after loading labels)"""
+        for values in self.postings.values():
+            values.clear()
+        self.cell_terms.clear()
+        self.sheet_cells.clear()
+
+        for sheet_name, sheet_data in data.items():
+            self.index_sheet(sheet_name, sheet_data)
+
+    def on_store_change(self, sheet_name, cell_keys=None):
+        """Store listener: reindex the edited cells, or the whole sheet for sheet-level edits"""
+        sheet_data = self.store.data.get(sheet_name, {})
+        if cell_keys is None:
+            self.index_sheet(sheet_name, sheet_data)
+            return
+
+        category = sheet_data.get('sheet_info', {}).get('category', 'other')
+        sprites = sheet_data.get('sprites', {})
+        for cell_key in cell_keys:
+            self.index_cell(sheet_name, cell_key, sprites.get(cell_key), category)
+
+    def index_sheet(self, sheet_name, sheet_data):
+        category = sheet_data.get('sheet_info', {}).get('category', 'other')
+        sprites = sheet_data.get('sprites', {})
+
+        stale = [key for key in self.sheet_cells[sheet_name] if key not in sprites]
+        for cell_key in stale:
+            self.index_cell(sheet_name, cell_key, None, category)
+        for cell_key, cell_data in sprites.items():
+            self.index_cell(sheet_name, cell_key, cell_data, category)
+
+    def index_cell(self, sheet_name, cell_key, cell_data, category):
+        """Replace one cell's postings (cell_data None removes it)"""
+        cell = (sheet_name, cell_key)
+        old_terms = self.cell_terms.pop(cell, {})
+
+        new_terms = {}
+        if cell_data is not None:
+            values = dict(cell_data, category=category)
+            new_terms = {field: normalize(field, values.get(field, '')) for field in INDEXED_FIELDS}
+
+        for field, value in old_terms.items():
+            if new_terms.get(field) != value:
+                postings = self.postings[field][value]
+                postings.discard(cell)
+                if not postings:
+                    del self.postings[field][value]
+        for field, value in new_terms.items():
+            if old_terms.get(field) != value:
+                self.postings[field][value].add(cell)
+
+        if new_terms:
+            self.cell_terms[cell] = new_terms
+            self.sheet_cells[sheet_name].add(cell_key)
+        else:
+            self.sheet_cells[sheet_name].discard(cell_key)
+
+    def query(self, **filters):
+        """Get the set of (sheet_name, cell_key) matching every filter"""
+        if not filters:
+            return set(self.cell_terms)
+
+        unknown = set(filters) - set(INDEXED_FIELDS)
+        if unknown:
+            raise ValueError(f"Can't filter on {', '.join(sorted(unknown))}")
+
+        # Intersect starting from the smallest posting list
+        sets = sorted(
+            (self.postings[field].get(normalize(field, value), set()) for field, value in filters.items()),
+            key=len
+        )
+        result = set(sets[0])
+        for postings in sets[1:]:
+            result &= postings
+            if not result:
+                break
+        return result
+
+    def values(self, field):
+        """Distinct indexed values of a field with their cell counts"""
+        return {value: len(cells) for value, cells in self.postings[field].items()}
+
+def group_by_sheet(cells):
+    """Group (sheet_name, cell_key) pairs into {sheet_name: [cell_key, ...]}, in grid order"""
+    groups = defaultdict(list)
+    for sheet_name, cell_key in cells:
+        groups[sheet_name].append(cell_key)
+    for cell_keys in groups.values():
+        cell_keys.sort(key=lambda key: tuple(int(part) for part in key.split(',')))
+    return dict(sorted(groups.items()))
@@ -0,0 +1,109 @@
+# Label prediction for fast keyboard labeling
+# DOOM sheets are regular: the eight angles rotate across columns, an action covers a
+# block of rows and frames count up down the rows. The predictor learns those patterns
+# from the cells already labeled on a sheet and fills in the rest.
+
+from collections import Counter, defaultdict
+
+ROTATION_COUNT = 8  # front ... angle45, the first eight entries of the labeler's angle list
+
+def majority(values):
+    """Most common value, or None for an empty list"""
+    counts = Counter(value for value in values if value not in ('', None))
+    return counts.most_common(1)[0][0] if counts else None
+
+def is_labeled(sprite_data):
+    return not sprite_data.get('empty', False) and bool(
+        sprite_data.get('sprite_name') or sprite_data.get('action') or sprite_data.get('angle')
+    )
+
+class LabelPredictor:
+    """Predicts sprite_name/action/angle/frame for a cell from a sheet's labeled cells"""
+
+    def __init__(self, sprites, angles):
+        self.angles = angles
+        self.rotations = angles[:ROTATION_COUNT]
+        self.labeled = [cell for cell in sprites.values() if is_labeled(cell)]
+        self.fit()
+
+    def fit(self):
+        """Learn the per-row, per-column and rotation patterns (linear in labeled cells)"""
+        by_row = defaultdict(list)
+        by_col = defaultdict(list)
+        for cell in self.labeled:
+            by_row[cell['row']].append(cell)
+            by_col[cell['col']].append(cell)
+
+        self.sheet_name = majority(cell.get('sprite_name') for cell in self.labeled)
+        self.row_names = {row: majority(c.get('sprite_name') for c in cells) for row, cells in by_row.items()}
+        self.row_actions = {row: majority(c.get('action') for c in cells) for row, cells in by_row.items()}
+        self.col_angles = {col: majority(c.get('angle') for c in cells) for col, cells in by_col.items()}
+        self.sheet_angle = majority(cell.get('angle') for cell in self.labeled)
+
+        # Columns that haven't been labeled yet follow the rotation order: angle index = col + offset
+        self.rotation_offset = majority(
+            (self.rotations.index(cell['angle']) - cell['col']) % ROTATION_COUNT
+            for cell in self.labeled
+            if cell.get('angle') in self.rotations
+        )
+
+        # Frames count along rows or columns; pick whichever axis keeps (frame - position) constant
+        row_offsets = Counter()
+        col_offsets = Counter()
+        for cell in self.labeled:
+            frame = cell.get('frame', 1)
+            action = cell.get('action', '')
+            row_offsets[(action, frame - cell['row'])] += 1
+            col_offsets[(action, cell['row'], frame - cell['col'])] += 1
+
+        self.frame_axis = 'row' if max(row_offsets.values(), default=0) >= max(col_offsets.values(), default=0) else 'col'
+        self.frame_offsets = {}
+        for (action, offset), count in row_offsets.items():
+            if count > self.frame_offsets.get(action, (None, 0))[1]:
+                self.frame_offsets[action] = (offset, count)
+        self.row_frame_offsets = {}
+        for (action, row, offset), count in col_offsets.items():
+            if count > self.row_frame_offsets.get((action, row), (None, 0))[1]:
+                self.row_frame_offsets[(action, row)] = (offset, count)
+
+    def nearest_row_value(self, values, row):
+        """Take a row's value, or the closest labeled row above it (actions span row blocks)"""
+        if values.get(row):
+            return values[row]
+        above = [r for r in values if r < row and values[r]]
+        if above:
+            return values[max(above)]
+        below = [r for r in values if r > row and values[r]]
+        return values[min(below)] if below else None
+
+    def predict(self, row, col):
+        """Predict labels for a cell, or None if nothing is labeled yet"""
+        if not self.labeled:
+            return None
+
+        sprite_name = self.nearest_row_value(self.row_names, row) or self.sheet_name or ''
+        action = self.nearest_row_value(self.row_actions, row) or ''
+
+        angle = self.col_angles.get(col)
+        if not angle and self.rotation_offset is not None:
+            angle = self.rotations[(col + self.rotation_offset) % ROTATION_COUNT]
+        if not angle and self.sheet_angle not in self.rotations:
+            # Items and effects use one non-rotating angle for the whole sheet
+            angle = self.sheet_angle
+
+        if self.frame_axis == 'row' and action in self.frame_offsets:
+            frame = row + self.frame_offsets[action][0]
+        elif (action, row) in self.row_frame_offsets:
+            frame = col + self.row_frame_offsets[(action, row)][0]
+        elif self.frame_axis == 'col' and any(key[0] == action for key in self.row_frame_offsets):
+            # New row of an action that counts across columns: start from the same offset
+            frame = col + min(offset for (a, _), (offset, _) in self.row_frame_offsets.items() if a == action)
+        else:
+            frame = 1
+
+        return {
+            'sprite_name': sprite_name,
+            'action': action,
+            'angle': angle or '',
+            'frame': max(1, frame)
+        }
@@ -0,0 +1,153 @@
+# Label data for all sprite sheets
+# Same nested layout as sprite_labels.json: {sheet_name: {'sheet_info', 'grid', 'sprites': {"row,col": {...}}}}
+
+import copy
+
+def blank_cell(row, col, empty=False):
+    """Default labels for a grid cell"""
+    return {
+        'sprite_name': '',
+        'action': '',
+        'angle': '',
+        'frame': 1,
+        'empty': empty,
+        'important': False,
+        'row': row,
+        'col': col
+    }
+
+class LabelTransaction:
+    """Collects many cell edits on one sheet and applies them in a single commit"""
+
+    def __init__(self, store, sheet_name):
+        self.store = store
+        self.sheet_name = sheet_name
+        self.changes = {}  # "row,col" -> new cell data
+
+    def get_cell(self, row, col):
+        """Get a cell's labels, including edits pending in this transaction"""
+        cell_key = f"{row},{col}"
+        if cell_key in self.changes:
+            return self.changes[cell_key]
+        return self.store.get_cell(self.sheet_name, row, col)
+
+    def set_cell(self, row, col, cell_data):
+        """Replace a cell's labels"""
+        self.changes[f"{row},{col}"] = dict(cell_data, row=row, col=col)
+
+    def update_cell(self, row, col, **fields):
+        """Change some fields of a cell, creating it if it has no labels yet"""
+        cell_data = dict(self.get_cell(row, col) or blank_cell(row, col))
+        cell_data.update(fields)
+        self.set_cell(row, col, cell_data)
+
+    def fill_rect(self, top, left, bottom, right, **fields):
+        """Apply the same fields to every cell in a rectangle (inclusive)"""
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                self.update_cell(row, col, **fields)
+
+    def copy_row(self, src_row, dst_row, grid_cols):
+        """Copy every cell's labels from one row to another"""
+        for col in range(grid_cols):
+            cell_data = self.get_cell(src_row, col)
+            if cell_data is not None:
+                self.set_cell(dst_row, col, cell_data)
+
+    def set_column(self, col, grid_rows, skip_empty=True, **fields):
+        """Apply the same fields down a column (e.g. one angle per column)"""
+        for row in range(grid_rows):
+            cell_data = self.get_cell(row, col)
+            if skip_empty and cell_data is not None and cell_data.get('empty', False):
+                continue
+            self.update_cell(row, col, **fields)
+
+    def commit(self):
+        """Apply all pending edits with one dirty mark and one change notification"""
+        if not self.changes:
+            return
+        self.store.ensure_sheet(self.sheet_name)['sprites'].update(self.changes)
+        self.store.mark_dirty(self.sheet_name, list(self.changes))
+        self.changes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Edits are discarded if the block raised
+        if exc_type is None:
+            self.commit()
+        return False
+
+class LabelStore:
+    """Holds the label data and tracks which sheets changed since the last save"""
+
+    def __init__(self, data=None):
+        self.data = data if data is not None else {}
+        self.dirty_sheets = set()
+        self.revisions = {}  # Bumped on every change so derived data can be cached per sheet
+        self.listeners = []  # Called with (sheet_name, cell_keys) after every change; cell_keys is None for sheet-level edits
+
+    def ensure_sheet(self, sheet_name):
+        """Get a sheet's data, creating an empty entry if needed"""
+        if sheet_name not in self.data:
+            self.data[sheet_name] = {'sheet_info': {}, 'sprites': {}}
+
+        sheet_data = self.data[sheet_name]
+        if 'sprites' not in sheet_data:
+            sheet_data['sprites'] = {}
+        return sheet_data
+
+    def get_cell(self, sheet_name, row, col):
+        """Get the labels for a cell, or None if it has none"""
+        return self.data.get(sheet_name, {}).get('sprites', {}).get(f"{row},{col}")
+
+    def set_cell(self, sheet_name, row, col, cell_data):
+        """Replace the labels for one cell"""
+        cell_key = f"{row},{col}"
+        self.ensure_sheet(sheet_name)['sprites'][cell_key] = cell_data
+        self.mark_dirty(sheet_name, [cell_key])
+
+    def set_sheet_info(self, sheet_name, sheet_info):
+        """Replace a sheet's display name, category and description"""
+        self.ensure_sheet(sheet_name)['sheet_info'] = sheet_info
+        self.mark_dirty(sheet_name)
+
+    def set_grid(self, sheet_name, cols, rows):
+        """Store a sheet's grid size"""
+        sheet_data = self.ensure_sheet(sheet_name)
+        if sheet_data.get('grid') == {'cols': cols, 'rows': rows}:
+            return
+        sheet_data['grid'] = {'cols': cols, 'rows': rows}
+        self.mark_dirty(sheet_name)
+
+    def transaction(self, sheet_name):
+        """Start a batch of cell edits: `with store.transaction(sheet) as tx: ...`"""
+        return LabelTransaction(self, sheet_name)
+
+    def mark_dirty(self, sheet_name, cell_keys=None):
+        """Flag a sheet as changed and notify listeners"""
+        self.dirty_sheets.add(sheet_name)
+        self.revisions[sheet_name] = self.revisions.get(sheet_name, 0) + 1
+        for listener in self.listeners:
+            listener(sheet_name, cell_keys)
+
+    def replace(self, data):
+        """Swap in freshly loaded data (nothing is dirty afterwards)"""
+        self.data = data
+        self.dirty_sheets.clear()
+        for sheet_name in list(self.revisions):
+            self.revisions[sheet_name] += 1
+
+    def take_dirty_snapshot(self):
+        """Deep-copy the changed sheets and clear their dirty flags.
+
+        Only the changed sheets are copied, so this stays cheap however large the label file is.
+        """
+        snapshot = {
+            sheet_name: copy.deepcopy(self.data[sheet_name])
+            for sheet_name in self.dirty_sheets
+            if sheet_name in self.data
+        }
+        self.dirty_sheets.clear()
+        return snapshot
@@ -0,0 +1,168 @@
+# Label consistency checks
+# One pass over every labeled cell builds grouped indexes - frames per
+# (sprite_name, action, angle), angles per (sprite_name, action) and export filenames
+# per sheet folder - and the checks then read only those groups, so a full check is
+# linear in the number of labels. Used headless below and by the labeler's
+# "Check Labels" window.
+#
+# Usage (from the project root):
+#   python -m src.label_validator
+#   python -m src.label_validator --sheet Imp --json label_issues.json
+
+import argparse
+import json
+from collections import defaultdict
+
+# Allowed label values (the labeler's dropdowns use these lists)
+CATEGORIES = ["creature", "weapon", "item", "effect", "interface", "environment", "projectile", "menu", "other"]
+ACTIONS = ["idle", "walk", "attack", "pain", "death", "special", "fire", "reload", "pickup", "explode", "activate", "static", "unused"]
+ANGLES = ["front", "angle315", "right", "angle225", "back", "angle135", "left", "angle45", "omnidirectional", "static"]
+DIRECTIONAL_ANGLES = ANGLES[:8]
+
+# Issue kinds, most serious first
+ISSUE_KINDS = {
+    'filename_collision': "❌",
+    'duplicate_frame': "❌",
+    'invalid_action': "❌",
+    'invalid_angle': "❌",
+    'frame_gap': "⚠️ ",
+    'missing_angles': "⚠️ ",
+    'inconsistent_name': "⚠️ ",
+    'missing_name': "⚠️ ",
+}
+
+def normalize_name(name):
+    """Sprite names as the exporter writes them ("Spider Mastermind" -> "spider_mastermind")"""
+    return name.strip().lower().replace(' ', '_')
+
+def make_issue(kind, message, cells):
+    """An issue with the cells it concerns, as (sheet, row, col) tuples in grid order"""
+    return {'kind': kind, 'message': message, 'cells': sorted(cells)}
+
+def validate_labels(sprites_data, actions=ACTIONS, angles=ANGLES):
+    """Check all labeled cells; returns a list of issues (see ISSUE_KINDS)"""
+    from src.sprite_exporter import sprite_filename_base
+
+    actions, angles = set(actions), set(angles)
+    issues = []
+
+    # Grouped indexes, filled in one pass
+    frames = defaultdict(lambda: defaultdict(list))  # (name, action, angle) -> frame -> cells
+    sequence_angles = defaultdict(set)               # (name, action) -> angles
+    sequence_cells = defaultdict(list)               # (name, action) -> cells
+    filenames = defaultdict(list)                    # (category, sheet folder, filename) -> cells
+    spellings = defaultdict(lambda: defaultdict(list))  # normalized name -> spelling -> cells
+
+    for sheet_name, sheet_data in sprites_data.items():
+        category = sheet_data.get('sheet_info', {}).get('category', 'other')
+        for sprite_data in sheet_data.get('sprites', {}).values():
+            if sprite_data.get('empty', False):
+                continue
+            cell = (sheet_name, sprite_data['row'], sprite_data['col'])
+            name = sprite_data.get('sprite_name', '').strip()
+            action = sprite_data.get('action', '').strip()
+            angle = sprite_data.get('angle', '').strip()
+            frame = sprite_data.get('frame', 1)
+
+            if action and action not in actions:
+                issues.append(make_issue('invalid_action', f"unknown action '{action}'", [cell]))
+            if angle and angle not in angles:
+                issues.append(make_issue('invalid_angle', f"unknown angle '{angle}'", [cell]))
+            if not name:
+                issues.append(make_issue('missing_name', "no sprite name", [cell]))
+                continue
+
+            key = normalize_name(name)
+            spellings[key][name].append(cell)
+            frames[(key, action, angle)][frame].append(cell)
+            sequence_angles[(key, action)].add(angle)
+            sequence_cells[(key, action)].append(cell)
+            filenames[(category, sheet_name.lower(), sprite_filename_base(sprite_data))].append(cell)
+
+    # Cell groups that would overwrite each other's files when exported
+    collisions = {frozenset(cells): (category, folder, filename)
+                  for (category, folder, filename), cells in filenames.items() if len(cells) > 1}
+
+    for (key, action, angle), by_frame in frames.items():
+        label = f"{key} {action or '(no action)'} {angle or '(no angle)'}"
+        for frame, cells in by_frame.items():
+            if len(cells) > 1:
+                overwrite = " - same export filename" if collisions.pop(frozenset(cells), None) else ""
+                issues.append(make_issue('duplicate_frame', f"{label}: frame {frame} labeled {len(cells)} times{overwrite}", cells))
+        missing = [frame for frame in range(1, max(by_frame) + 1) if frame not in by_frame]
+        if missing:
+            cells = [cell for cells in by_frame.values() for cell in cells]
+            shown = ", ".join(str(frame) for frame in missing[:10]) + (" ..." if len(missing) > 10 else "")
+            issues.append(make_issue('frame_gap', f"{label}: missing frame {shown}", cells))
+
+    for (key, action), present in sequence_angles.items():
+        directional = present & set(DIRECTIONAL_ANGLES)
+        if directional and len(directional) < len(DIRECTIONAL_ANGLES):
+            missing = [angle for angle in DIRECTIONAL_ANGLES if angle not in directional]
+            issues.append(make_issue(
+                'missing_angles', f"{key} {action or '(no action)'}: {len(directional)} of 8 angles, missing {', '.join(missing)}",
+                sequence_cells[(key, action)]
+            ))
+
+    for cells, (category, folder, filename) in collisions.items():
+        issues.append(make_issue('filename_collision', f"{len(cells)} cells export as {category}/{folder}/{filename}", cells))
+
+    for key, by_spelling in spellings.items():
+        if len(by_spelling) > 1:
+            names = ", ".join(f"'{spelling}'" for spelling in sorted(by_spelling))
+            cells = [cell for cells in by_spelling.values() for cell in cells]
+            issues.append(make_issue('inconsistent_name', f"{key} is spelled {names}", cells))
+
+    kinds = list(ISSUE_KINDS)
+    issues.sort(key=lambda issue: (kinds.index(issue['kind']), issue['cells'][0]))
+    return issues
+
+def issues_by_sheet(issues):
+    """{sheet: [issues touching that sheet]} - an issue spanning sheets is listed under each"""
+    sheets = defaultdict(list)
+    for issue in issues:
+        for sheet_name in dict.fromkeys(cell[0] for cell in issue['cells']):
+            sheets[sheet_name].append(issue)
+    return dict(sorted(sheets.items()))
+
+def format_issue(issue, sheet_name=None):
+    """One-line description, listing the cells on sheet_name (or the first few overall)"""
+    cells = [cell for cell in issue['cells'] if sheet_name is None or cell[0] == sheet_name]
+    where = ", ".join(f"{row},{col}" if sheet_name else f"{sheet} {row},{col}" for sheet, row, col in cells[:4])
+    if len(cells) > 4:
+        where += f" (+{len(cells) - 4})"
+    return f"{ISSUE_KINDS[issue['kind']]} {issue['message']} [{where}]"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check labels for gaps, duplicates and invalid values")
+    parser.add_argument("--labels", default="sprite_labels.json", help="label file written by the labeler")
+    parser.add_argument("--sheet", action="append", dest="sheets", help="only report this sheet (repeatable)")
+    parser.add_argument("--json", help="also write the issues to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.labels, "r") as f:
+        sprites_data = json.load(f)
+
+    issues = validate_labels(sprites_data)
+    by_sheet = issues_by_sheet(issues)
+    for sheet_name, sheet_issues in by_sheet.items():
+        if args.sheets and sheet_name not in args.sheets:
+            continue
+        print(f"{sheet_name}:")
+        for issue in sheet_issues:
+            print(f"  {format_issue(issue, sheet_name)}")
+
+    counts = defaultdict(int)
+    for issue in issues:
+        counts[issue['kind']] += 1
+    labeled = sum(1 for sheet in sprites_data.values() for cell in sheet.get('sprites', {}).values() if not cell.get('empty'))
+    if issues:
+        print(f"📋 {len(issues)} issues on {len(by_sheet)} sheets ({labeled} labeled cells): "
+              + ", ".join(f"{count} {kind.replace('_', ' ')}" for kind, count in counts.items()))
+    else:
+        print(f"✅ No issues in {labeled} labeled cells")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'issues': issues, 'counts': counts}, f, indent=2)
+        print(f"📄 Issues written to {args.json}")
@@ -0,0 +1,271 @@
+# Mask synthesis for texture-only sheets
+# Sheets without an A_6xGigaPixel mask can't be exported with masks or analyzed. This
+# estimates each sheet's background colour(s) from its border and from gutters (rows and
+# columns that are one solid colour), keys those colours out band by band, cleans the
+# result with a small morphological open/close, and streams the mask out as
+# <name>A_6xGigaPixel.png. Sheets are processed in parallel. With --evaluate the same
+# pipeline runs on sheets that do have masks and is scored against them, without writing.
+#
+# Usage (from the project root):
+#   python -m src.mask_synthesis                       # masks for every texture-only sheet
+#   python -m src.mask_synthesis --evaluate            # accuracy against the real masks
+#   python -m src.mask_synthesis --sheet Effects --tolerance 32
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
+
+import numpy as np
+
+BAND_HEIGHT = 256
+BORDER = 4           # Pixels sampled along each edge
+TOLERANCE = 24       # Max per-channel difference still counted as background (upscaled sheets are noisy)
+RADIUS = 2           # Open/close radius in pixels; removes specks and pinholes smaller than a sprite pixel
+MAX_BACKGROUNDS = 4
+MIN_SHARE = 0.02     # A colour must cover this much of the border/gutter samples to count as background
+
+def split_alpha(pixels):
+    """(colours as (..., C), alpha or None) for an L/LA/RGB/RGBA band"""
+    if pixels.ndim == 2:
+        return pixels[..., None], None
+    if pixels.shape[-1] in (2, 4):
+        return pixels[..., :-1], pixels[..., -1]
+    return pixels, None
+
+def estimate_backgrounds(pixels, tolerance=TOLERANCE, band_height=BAND_HEIGHT, border=BORDER,
+                         max_colors=MAX_BACKGROUNDS, min_share=MIN_SHARE):
+    """Guess a sheet's background colours; returns ((K, C) colours, stats).
+
+    Samples are the opaque pixels of a border strip plus every gutter - a full row or
+    column whose colour varies by no more than tolerance. Gutters are weighted by their
+    length, so a grid's separator lines outvote the odd sprite touching the sheet edge.
+    Samples are counted in coarse colour bins (upscaled sheets are noisy) and each winning
+    bin's mean colour is keyed.
+    """
+    height, width = pixels.shape[:2]
+    channels = split_alpha(np.asarray(pixels[:1]))[0].shape[-1]
+    samples, weights = [], []
+
+    def add_samples(region):
+        colors, alpha = split_alpha(np.asarray(region))
+        colors = colors.reshape(-1, channels)
+        if alpha is not None:
+            colors = colors[alpha.ravel() > 0]
+        samples.append(colors.astype(np.float64))
+        weights.append(np.ones(len(colors)))
+
+    add_samples(pixels[:border])
+    add_samples(pixels[max(height - border, 0):])
+    add_samples(pixels[:, :border])
+    add_samples(pixels[:, max(width - border, 0):])
+
+    # Gutters: rows flat within a band, and columns flat over every band
+    col_min = np.full((width, channels), 255, dtype=np.uint8)
+    col_max = np.zeros((width, channels), dtype=np.uint8)
+    gutter_rows = 0
+    for top in range(0, height, band_height):
+        colors, alpha = split_alpha(np.asarray(pixels[top:top + band_height]))
+        band_min, band_max = colors.min(axis=1), colors.max(axis=1)
+        flat = (band_max.astype(np.int16) - band_min).max(axis=-1) <= tolerance
+        if alpha is not None:
+            flat &= alpha.min(axis=1) > 0
+        gutter_rows += int(flat.sum())
+        samples.append(colors[flat, 0].astype(np.float64))
+        weights.append(np.full(int(flat.sum()), float(width)))
+
+        np.minimum(col_min, colors.min(axis=0), out=col_min)
+        np.maximum(col_max, colors.max(axis=0), out=col_max)
+
+    flat_cols = (col_max.astype(np.int16) - col_min).max(axis=-1) <= tolerance
+    samples.append(split_alpha(np.asarray(pixels[:1]))[0][0, flat_cols].astype(np.float64))
+    weights.append(np.full(int(flat_cols.sum()), float(height)))
+
+    samples, weights = np.concatenate(samples), np.concatenate(weights)
+    stats = {'gutter_rows': gutter_rows, 'gutter_cols': int(flat_cols.sum()), 'samples': int(len(samples))}
+    if len(samples) == 0:
+        return np.zeros((0, channels), dtype=np.uint8), stats
+
+    # Count samples per colour bin, then key each large bin's mean colour
+    bin_size = max(tolerance, 1)
+    bins = np.zeros(len(samples), dtype=np.int64)
+    for channel in range(channels):
+        bins = bins * (256 // bin_size + 1) + (samples[:, channel] // bin_size).astype(np.int64)
+    keys, inverse = np.unique(bins, return_inverse=True)
+    totals = np.bincount(inverse, weights=weights)
+    means = np.stack([np.bincount(inverse, weights=weights * samples[:, channel]) for channel in range(channels)], axis=-1) / totals[:, None]
+
+    chosen, shares = [], []
+    for index in np.argsort(totals)[::-1]:
+        if len(chosen) == max_colors or totals[index] < min_share * totals.sum():
+            break
+        # A colour split across neighbouring bins is keyed once
+        if any(np.abs(means[index] - color).max() <= tolerance / 2 for color in chosen):
+            continue
+        chosen.append(means[index])
+        shares.append(round(float(totals[index] / totals.sum()), 4))
+
+    stats['shares'] = shares
+    return np.round(np.array(chosen).reshape(-1, channels)).astype(np.uint8), stats
+
+def key_foreground(pixels, backgrounds, tolerance=TOLERANCE):
+    """Foreground where no background colour is within tolerance (and the pixel is opaque)"""
+    colors, alpha = split_alpha(pixels)
+    foreground = np.ones(colors.shape[:2], dtype=bool) if alpha is None else alpha > 0
+    colors = colors.astype(np.int16)
+    for background in backgrounds.astype(np.int16):
+        foreground &= np.abs(colors - background).max(axis=-1) > tolerance
+    return foreground
+
+def dilate(mask, radius):
+    """Binary dilation with a (2r+1)x(2r+1) square, as separable shifted ORs"""
+    grown = mask.copy()
+    for shift in range(1, radius + 1):
+        grown[shift:] |= mask[:-shift]
+        grown[:-shift] |= mask[shift:]
+    mask = grown.copy()
+    for shift in range(1, radius + 1):
+        grown[:, shift:] |= mask[:, :-shift]
+        grown[:, :-shift] |= mask[:, shift:]
+    return grown
+
+def erode(mask, radius):
+    return ~dilate(~mask, radius)
+
+def clean_mask(foreground, radius=RADIUS):
+    """Open (drop specks) then close (fill pinholes)"""
+    if radius <= 0:
+        return foreground
+    opened = dilate(erode(foreground, radius), radius)
+    return erode(dilate(opened, radius), radius)
+
+def iter_mask_bands(pixels, backgrounds, tolerance=TOLERANCE, radius=RADIUS, band_height=BAND_HEIGHT):
+    """Yield (top, boolean foreground band) with cleanup applied across band edges.
+
+    Each band is keyed with a halo of 4*radius rows (open and close each reach 2*radius),
+    so the result is the same as cleaning the whole sheet at once.
+    """
+    height = pixels.shape[0]
+    halo = 4 * radius
+    for top in range(0, height, band_height):
+        bottom = min(top + band_height, height)
+        start, stop = max(top - halo, 0), min(bottom + halo, height)
+        foreground = clean_mask(key_foreground(np.asarray(pixels[start:stop]), backgrounds, tolerance), radius)
+        yield top, foreground[top - start:bottom - start]
+
+def synthesize_mask(texture_path, output_path=None, reference_path=None, tolerance=TOLERANCE, radius=RADIUS,
+                    band_height=BAND_HEIGHT):
+    """Build one sheet's mask (runs in a worker process).
+
+    Writes output_path if given; with reference_path the mask is compared against that
+    real mask instead. Returns a result dict with the backgrounds found and, for a
+    reference, pixel accuracy, precision, recall and IoU.
+    """
+    from src.png_stream import PngBandWriter
+    from src.sheet_cache import open_cached_sheet, to_gray
+
+    pixels = open_cached_sheet(texture_path).array
+    height, width = pixels.shape[:2]
+    backgrounds, stats = estimate_backgrounds(pixels, tolerance, band_height)
+    result = {'texture': str(texture_path), 'size': [width, height], 'backgrounds': backgrounds.tolist(), **stats}
+
+    reference = open_cached_sheet(reference_path).array if reference_path else None
+    true_pos = false_pos = false_neg = 0
+    foreground_pixels = 0
+
+    with PngBandWriter(output_path, (width, height), "L") if output_path else nullcontext() as writer:
+        for top, foreground in iter_mask_bands(pixels, backgrounds, tolerance, radius, band_height):
+            foreground_pixels += int(np.count_nonzero(foreground))
+            if writer:
+                writer.write_rows(foreground.astype(np.uint8) * 255)
+            if reference is not None:
+                truth = to_gray(np.asarray(reference[top:top + len(foreground)])) > 127
+                true_pos += int(np.count_nonzero(foreground & truth))
+                false_pos += int(np.count_nonzero(foreground & ~truth))
+                false_neg += int(np.count_nonzero(~foreground & truth))
+
+    result['coverage'] = foreground_pixels / (width * height)
+    if reference is not None:
+        total = width * height
+        result.update({
+            'accuracy': (total - false_pos - false_neg) / total,
+            'precision': true_pos / (true_pos + false_pos) if true_pos + false_pos else 1.0,
+            'recall': true_pos / (true_pos + false_neg) if true_pos + false_neg else 1.0,
+            'iou': true_pos / (true_pos + false_pos + false_neg) if true_pos + false_pos + false_neg else 1.0,
+        })
+    return result
+
+def run_mask_synthesis(sprites_dir="sprites", evaluate=False, sheets=None, workers=None, tolerance=TOLERANCE,
+                       radius=RADIUS, report_path="mask_synthesis.json"):
+    """Synthesize masks for texture-only sheets (or score against real masks) and write a JSON report"""
+    from src.check_sprites import find_sprite_pairs
+
+    pairs = find_sprite_pairs(sprites_dir)
+    jobs = []
+    for sheet_name, files in sorted(pairs.items()):
+        if sheets and sheet_name not in sheets or 'texture' not in files:
+            continue
+        if evaluate and 'mask' in files:
+            jobs.append((sheet_name, files['texture'], None, files['mask']))
+        elif not evaluate and 'mask' not in files:
+            jobs.append((sheet_name, files['texture'], Path(sprites_dir) / f"{sheet_name}A_6xGigaPixel.png", None))
+
+    if not jobs:
+        print(f"✅ No {'sheets with masks to evaluate' if evaluate else 'texture-only sheets'} in {sprites_dir}/")
+        return None
+
+    print(f"🔄 {'Evaluating' if evaluate else 'Synthesizing masks for'} {len(jobs)} sheets...")
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(synthesize_mask, texture, output, reference, tolerance, radius): sheet_name
+            for sheet_name, texture, output, reference in jobs
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            sheet_name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'error': str(e)}
+                print(f"[{done}/{len(jobs)}] ❌ {sheet_name}: {e}")
+            else:
+                colors = ", ".join(str(tuple(color)) for color in result['backgrounds']) or "none (alpha only)"
+                score = f", IoU {result['iou']:.3f}" if evaluate else ""
+                print(f"[{done}/{len(jobs)}] ✅ {sheet_name}: background {colors}, {result['coverage']:.1%} foreground{score}")
+            results.append({'sheet': sheet_name, **result})
+
+    results.sort(key=lambda r: r['sheet'])
+    report = {
+        'generated': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'mode': "evaluate" if evaluate else "synthesize",
+        'tolerance': tolerance,
+        'radius': radius,
+        'sheets': results
+    }
+
+    scored = [r for r in results if 'iou' in r]
+    if scored:
+        report['mean'] = {key: sum(r[key] for r in scored) / len(scored) for key in ('accuracy', 'precision', 'recall', 'iou')}
+        mean = report['mean']
+        print(f"📋 Mean over {len(scored)} sheets: accuracy {mean['accuracy']:.3f}, precision {mean['precision']:.3f}, "
+              f"recall {mean['recall']:.3f}, IoU {mean['iou']:.3f}")
+
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Report written to {report_path}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate A_6xGigaPixel masks for sheets that have none")
+    parser.add_argument("--sprites-dir", default="sprites", help="folder with the 6xGigaPixel sheets")
+    parser.add_argument("--evaluate", action="store_true", help="score against sheets that have real masks instead of writing")
+    parser.add_argument("--sheet", action="append", dest="sheets", help="only this sheet (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--tolerance", type=int, default=TOLERANCE, help="per-channel distance still keyed as background")
+    parser.add_argument("--radius", type=int, default=RADIUS, help="morphological cleanup radius in pixels (0 = off)")
+    parser.add_argument("--report", default="mask_synthesis.json", help="where to write the report")
+    args = parser.parse_args()
+
+    run_mask_synthesis(args.sprites_dir, args.evaluate, args.sheets, args.workers, args.tolerance, args.radius, args.report)
@@ -0,0 +1,109 @@
+# Horizontal mirror detection
+# DOOM draws the left-facing angles by flipping the right-facing ones (angle45/angle315,
+# left/right, angle135/angle225). Each cell is reduced to a small bit hash, and every
+# cell's hash is compared against the flipped hashes of all other cells in one go.
+
+import numpy as np
+
+from src.sprite_index import cell_block_means, cell_coverage
+
+HASH_SIZE = 16          # 16x16 blocks -> 256 shape bits + 256 brightness bits per cell
+MAX_DISTANCE = 0.06     # Fraction of hash bits that may differ for a mirror match
+MIN_COVERAGE = 0.02     # Cells with less sprite than this are treated as empty
+
+MIRROR_ANGLES = {
+    'angle45': 'angle315', 'angle315': 'angle45',
+    'left': 'right', 'right': 'left',
+    'angle135': 'angle225', 'angle225': 'angle135',
+}
+
+def cell_hashes(texture, mask, grid_cols, grid_rows, size=HASH_SIZE):
+    """Hash every cell and its horizontal flip.
+
+    Returns (hashes, flipped, occupied): two (cells, bits) bool arrays in row-major
+    cell order, plus a bool array marking cells that contain a sprite.
+    """
+    gray = cell_block_means(texture, grid_cols, grid_rows, size, 3).mean(axis=-1)
+    coverage = cell_coverage(texture, mask, grid_cols, grid_rows, size)[..., 0]
+
+    gray = gray.reshape(-1, size, size)
+    coverage = coverage.reshape(-1, size, size)
+    shape_bits = coverage > 0.5
+
+    # Brightness bits compare each covered block to the sprite's mean, so lighting shifts don't matter
+    covered = shape_bits.sum(axis=(1, 2))
+    mean = (gray * shape_bits).sum(axis=(1, 2)) / np.maximum(covered, 1)
+    bright_bits = (gray > mean[:, None, None]) & shape_bits
+
+    bits = np.concatenate([shape_bits, bright_bits], axis=-1)          # (cells, size, 2 * size)
+    flipped = np.concatenate([shape_bits[:, :, ::-1], bright_bits[:, :, ::-1]], axis=-1)
+    occupied = coverage.mean(axis=(1, 2)) >= MIN_COVERAGE
+
+    return bits.reshape(len(bits), -1), flipped.reshape(len(flipped), -1), occupied
+
+def find_mirror_pairs(texture, mask, grid_cols, grid_rows, max_distance=MAX_DISTANCE):
+    """Find pairs of cells that are horizontal mirrors of each other.
+
+    Returns a list of ((row, col), (row, col), distance) with each cell in at most one
+    pair. Left-right symmetric sprites (front/back views) never pair with themselves.
+    """
+    hashes, flipped, occupied = cell_hashes(texture, mask, grid_cols, grid_rows)
+    bit_count = hashes.shape[1]
+
+    # Hamming distance from every cell to every other cell's mirror image
+    distances = np.count_nonzero(hashes[:, None, :] != flipped[None, :, :], axis=-1) / bit_count
+    np.fill_diagonal(distances, np.inf)
+    distances[~occupied, :] = np.inf
+    distances[:, ~occupied] = np.inf
+
+    # Keep mutual best matches only
+    best = distances.argmin(axis=1)
+    pairs = []
+    for i, j in enumerate(best):
+        if i < j and best[j] == i and distances[i, j] <= max_distance:
+            pairs.append((divmod(i, grid_cols), divmod(int(j), grid_cols), float(distances[i, j])))
+    return pairs
+
+def propose_mirror_labels(pairs, sprites):
+    """Propose labels for the unlabeled half of each mirror pair.
+
+    Returns {cell_key: labels}. A labeled cell with a mirrorable angle gives its
+    partner the same name/action/frame with the opposite angle and a mirror_of
+    reference. Pairs where both cells are already labeled as mirrors just get
+    the reference recorded on the second cell.
+    """
+    proposals = {}
+
+    for cell_a, cell_b, _ in pairs:
+        key_a, key_b = f"{cell_a[0]},{cell_a[1]}", f"{cell_b[0]},{cell_b[1]}"
+        data_a, data_b = sprites.get(key_a), sprites.get(key_b)
+
+        for source_key, source, target_key, target, (row, col) in (
+            (key_a, data_a, key_b, data_b, cell_b),
+            (key_b, data_b, key_a, data_a, cell_a),
+        ):
+            if not source or source.get('empty', False) or source.get('angle') not in MIRROR_ANGLES:
+                continue
+
+            mirrored_angle = MIRROR_ANGLES[source['angle']]
+            if target and target.get('angle'):
+                if target['angle'] == mirrored_angle and 'mirror_of' not in target and 'mirror_of' not in source:
+                    proposals[target_key] = dict(target, mirror_of=source_key)
+                    break
+                continue
+
+            proposals[target_key] = dict(
+                target or {},
+                sprite_name=source.get('sprite_name', ''),
+                action=source.get('action', ''),
+                angle=mirrored_angle,
+                frame=source.get('frame', 1),
+                empty=False,
+                important=source.get('important', False),
+                row=row,
+                col=col,
+                mirror_of=source_key
+            )
+            break
+
+    return proposals
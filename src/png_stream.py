@@ -0,0 +1,373 @@
+# Band-streamed PNG decoding
+# Gigapixel sheets don't fit in memory comfortably (and trip PIL's decompression-bomb
+# guard), so this decodes a PNG a horizontal band at a time: IDAT data is inflated
+# incrementally with zlib, and each band's filtered scanlines are unfiltered by PIL's C
+# decoder through a small "carrier" PNG (the previous raw row, then the band's rows).
+# Peak memory is one band, whatever the sheet size. Interlaced and 16-bit PNGs fall back
+# to a full decode. PngBandWriter is the reverse, for sheets generated a band at a time.
+#
+# Usage (from the project root):
+#   python -m src.png_stream sprites/Imp_6xGigaPixel.png     # decode in bands, report memory
+
+import argparse
+import io
+import os
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+READ_SIZE = 1 << 20
+CARRIER_BYTES = 16 << 20  # Filtered bytes per carrier PNG - keeps each one far below PIL's pixel limit
+SKIP_ROWS = 256           # Rows decoded at a time when skipping down a sheet
+
+# Channels per PNG colour type and the mode bands come back in (matching sheet_cache)
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+CARRIER_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}  # Bytes per pixel -> colour type with that width
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+class PngBandReader:
+    """Decode a PNG top to bottom in bands of rows.
+
+    mode is one of L, LA, RGB, RGBA (palette images become RGB, or RGBA with tRNS; low bit
+    depth grayscale is scaled to 0-255), like sheet_cache's decode.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = open(self.path, "rb")
+        if self.file.read(8) != PNG_SIGNATURE:
+            self.file.close()
+            raise ValueError(f"{self.path.name} is not a PNG")
+
+        self.palette = None
+        self.transparency = None
+        self.streamable = True
+
+        # Read header chunks up to the first IDAT
+        while True:
+            length, kind = struct.unpack(">I4s", self.file.read(8))
+            if kind == b"IDAT":
+                self.idat_remaining = length
+                break
+            data = self.file.read(length)
+            self.file.read(4)
+            if kind == b"IHDR":
+                self.width, self.height, self.bit_depth, self.color_type, _, _, interlace = struct.unpack(">IIBBBBB", data)
+                self.streamable = interlace == 0 and self.bit_depth <= 8
+            elif kind == b"PLTE":
+                self.palette = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+            elif kind == b"tRNS":
+                self.transparency = data
+            elif kind == b"IEND":
+                raise ValueError(f"{self.path.name} has no image data")
+
+        if self.color_type == 3:
+            self.mode = "RGBA" if self.transparency is not None else "RGB"
+        else:
+            self.mode = {0: "L", 2: "RGB", 4: "LA", 6: "RGBA"}[self.color_type]
+
+        bits_per_pixel = CHANNELS[self.color_type] * self.bit_depth
+        self.row_bytes = (self.width * bits_per_pixel + 7) // 8
+        self.pixel_bytes = max(1, bits_per_pixel // 8)  # Filter distance in bytes
+        self.inflater = zlib.decompressobj()
+        self.pending = b""
+        self.previous_row = bytes(self.row_bytes)  # Rows above the image count as zeros
+        self.next_row = 0
+        self.fallback = None
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def read_idat(self):
+        """Next piece of compressed image data, or b'' at the end"""
+        while self.idat_remaining == 0:
+            self.file.read(4)  # CRC
+            header = self.file.read(8)
+            if len(header) < 8:
+                return b""
+            length, kind = struct.unpack(">I4s", header)
+            if kind != b"IDAT":
+                return b""
+            self.idat_remaining = length
+
+        data = self.file.read(min(self.idat_remaining, READ_SIZE))
+        self.idat_remaining -= len(data)
+        return data
+
+    def read_filtered(self, rows):
+        """Inflate exactly `rows` filtered scanlines (filter byte + row data each)"""
+        needed = rows * (self.row_bytes + 1)
+        parts = [self.pending]
+        have = len(self.pending)
+
+        while have < needed:
+            if self.inflater.unconsumed_tail:
+                data = self.inflater.unconsumed_tail
+            else:
+                data = self.read_idat()
+                if not data:
+                    raise ValueError(f"{self.path.name} ended early at row {self.next_row}")
+            chunk = self.inflater.decompress(data, needed - have)
+            parts.append(chunk)
+            have += len(chunk)
+
+        raw = b"".join(parts)
+        self.pending = raw[needed:]
+        return raw[:needed]
+
+    def unfilter(self, filtered, rows):
+        """Reconstruct raw scanline bytes with PIL's decoder via a carrier PNG"""
+        carrier_width = self.row_bytes // self.pixel_bytes
+        header = struct.pack(">IIBBBBB", carrier_width, rows + 1, 8, CARRIER_COLOR_TYPES[self.pixel_bytes], 0, 0, 0)
+        data = b"\x00" + self.previous_row + filtered
+        carrier = PNG_SIGNATURE + png_chunk(b"IHDR", header) + png_chunk(b"IDAT", zlib.compress(data, 0)) + png_chunk(b"IEND", b"")
+
+        with Image.open(io.BytesIO(carrier)) as image:
+            raw = np.frombuffer(image.tobytes(), dtype=np.uint8).reshape(rows + 1, self.row_bytes)
+
+        self.previous_row = raw[-1].tobytes()
+        return raw[1:]
+
+    def to_pixels(self, raw):
+        """Interpret raw scanline bytes as an (rows, width[, channels]) array in self.mode"""
+        rows = raw.shape[0]
+        if self.bit_depth < 8:
+            per_byte = 8 // self.bit_depth
+            bits = np.unpackbits(raw, axis=1).reshape(rows, self.row_bytes * per_byte, self.bit_depth)
+            weights = (1 << np.arange(self.bit_depth - 1, -1, -1)).astype(np.uint8)
+            values = (bits * weights).sum(axis=2, dtype=np.uint8)[:, :self.width]
+        else:
+            values = raw.reshape(rows, self.width, CHANNELS[self.color_type])
+
+        if self.color_type == 3:
+            indices = values if values.ndim == 2 else values[..., 0]
+            colors = self.palette[np.minimum(indices, len(self.palette) - 1)]
+            if self.transparency is None:
+                return colors
+            alpha = np.full(256, 255, dtype=np.uint8)
+            alpha[:len(self.transparency)] = np.frombuffer(self.transparency, dtype=np.uint8)
+            return np.concatenate([colors, alpha[indices][..., None]], axis=-1)
+
+        if self.bit_depth < 8:
+            # Scale 1/2/4-bit grayscale to 0-255, as PIL does
+            return (values.astype(np.uint16) * 255 // ((1 << self.bit_depth) - 1)).astype(np.uint8)
+        return values[..., 0] if self.color_type == 0 else values
+
+    def read_rows(self, rows):
+        """Decode the next `rows` rows (fewer at the bottom of the image)"""
+        rows = min(rows, self.height - self.next_row)
+        if rows <= 0:
+            return None
+
+        if not self.streamable:
+            band = self.full_image()[self.next_row:self.next_row + rows]
+        else:
+            # Large requests go through several carriers of at most CARRIER_BYTES each
+            chunk_rows = max(1, CARRIER_BYTES // (self.row_bytes + 1))
+            raw = [self.unfilter(self.read_filtered(n), n) for n in
+                   (min(chunk_rows, rows - done) for done in range(0, rows, chunk_rows))]
+            band = self.to_pixels(raw[0] if len(raw) == 1 else np.concatenate(raw))
+        self.next_row += rows
+        return band
+
+    def full_image(self):
+        """Whole-image decode for PNGs that can't be streamed (interlaced or 16-bit)"""
+        if self.fallback is None:
+            # Local sheets are trusted; they are routinely past the decompression-bomb limit.
+            # The limit is lifted for this one open only, not for every other caller.
+            max_pixels = Image.MAX_IMAGE_PIXELS
+            Image.MAX_IMAGE_PIXELS = None
+            try:
+                with Image.open(self.path) as image:
+                    self.fallback = np.asarray(image.convert(self.mode))
+            finally:
+                Image.MAX_IMAGE_PIXELS = max_pixels
+        return self.fallback
+
+    def iter_bands(self, band_height):
+        """Yield (top, band) pairs covering the image"""
+        while self.next_row < self.height:
+            top = self.next_row
+            yield top, self.read_rows(band_height)
+
+    def close(self):
+        self.file.close()
+        self.fallback = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+class BandedSheet:
+    """A sheet read top to bottom, holding only the rows the latest crop needs.
+
+    Offers the parts of the PIL Image API the exporter uses (size, mode, crop), like
+    CachedSheet. Crops should come in row order (as the exporter makes them); asking for
+    rows above the current band restarts the decode.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.reader = PngBandReader(self.path)
+        self.mode = self.reader.mode
+        self.band = None
+        self.band_top = 0
+
+    @property
+    def size(self):
+        return self.reader.size
+
+    @property
+    def width(self):
+        return self.reader.width
+
+    @property
+    def height(self):
+        return self.reader.height
+
+    def getbands(self):
+        return tuple(self.mode)
+
+    def rows(self, top, bottom):
+        """Rows [top, bottom) of the sheet, decoding forward as needed"""
+        top, bottom = max(top, 0), min(bottom, self.height)
+        if self.band is None or top < self.band_top:
+            self.reader.close()
+            self.reader = PngBandReader(self.path)
+            self.band, self.band_top = None, 0
+
+        # The band holds rows [band_top, reader.next_row); drop what's above the request
+        decoded = self.reader.next_row
+        if top >= decoded:
+            # Skipped rows are decoded (a band at a time, so a long gap costs no memory) but not kept
+            while self.reader.next_row < top:
+                self.reader.read_rows(min(SKIP_ROWS, top - self.reader.next_row))
+            self.band, self.band_top = None, top
+        elif top > self.band_top:
+            self.band = self.band[top - self.band_top:]
+            self.band_top = top
+
+        if self.reader.next_row < bottom:
+            new_rows = self.reader.read_rows(bottom - self.reader.next_row)
+            self.band = new_rows if self.band is None else np.concatenate([self.band, new_rows])
+
+        return self.band[:bottom - self.band_top]
+
+    def crop(self, box):
+        left, top, right, bottom = (int(v) for v in box)
+        region = np.zeros((bottom - top, right - left) + (() if self.mode == "L" else (len(self.mode),)), dtype=np.uint8)
+
+        src_left, src_top = max(left, 0), max(top, 0)
+        src_right, src_bottom = min(right, self.width), min(bottom, self.height)
+        if src_right > src_left and src_bottom > src_top:
+            rows = self.rows(src_top, src_bottom)
+            region[src_top - top:src_bottom - top, src_left - left:src_right - left] = rows[:, src_left:src_right]
+
+        return Image.fromarray(region, self.mode)
+
+    def close(self):
+        self.reader.close()
+        self.band = None
+
+class PngBandWriter:
+    """Write an 8-bit L/RGB/RGBA PNG top to bottom, a band of rows at a time.
+
+    Each band is compressed into its own IDAT chunk as it arrives, so the image never has
+    to exist in memory as a whole. The file appears under its final name on close.
+    """
+
+    COLOR_TYPES = {"L": 0, "LA": 4, "RGB": 2, "RGBA": 6}
+
+    def __init__(self, path, size, mode="L", compress_level=6):
+        self.path = Path(path)
+        self.width, self.height = size
+        self.mode = mode
+        self.tmp_path = self.path.with_name(self.path.name + ".part")
+        self.file = open(self.tmp_path, "wb")
+        self.compressor = zlib.compressobj(compress_level)
+        self.rows_written = 0
+
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, self.COLOR_TYPES[mode], 0, 0, 0)
+        self.file.write(PNG_SIGNATURE + png_chunk(b"IHDR", header))
+
+    def write_rows(self, band):
+        """Append (rows, width[, channels]) uint8 pixels"""
+        band = np.ascontiguousarray(band, dtype=np.uint8).reshape(band.shape[0], -1)
+        filtered = np.zeros((band.shape[0], band.shape[1] + 1), dtype=np.uint8)  # Filter type 0 per row
+        filtered[:, 1:] = band
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            self.file.write(png_chunk(b"IDAT", data))
+        self.rows_written += band.shape[0]
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self.rows_written != self.height:
+            self.file.close()
+            os.remove(self.tmp_path)
+            raise ValueError(f"{self.path.name}: wrote {self.rows_written} of {self.height} rows")
+        self.file.write(png_chunk(b"IDAT", self.compressor.flush()) + png_chunk(b"IEND", b""))
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+            os.remove(self.tmp_path)
+        return False
+
+def iter_image_bands(path, band_height=256):
+    """Yield (top, band) for any image or raw .npy sprite: streamed for PNGs, a single full decode otherwise"""
+    path = Path(path)
+    with open(path, "rb") as f:
+        is_png = f.read(8) == PNG_SIGNATURE
+
+    if is_png:
+        with PngBandReader(path) as reader:
+            yield from reader.iter_bands(band_height)
+    else:
+        # Any exporter format, including raw .npy sprites
+        from src.sprite_encoder import open_sprite_file
+        image = open_sprite_file(path)
+        if image.mode == "1":
+            image = image.convert("L")
+        elif image.mode == "P":
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        pixels = np.asarray(image)
+        for top in range(0, pixels.shape[0], band_height):
+            yield top, pixels[top:top + band_height]
+
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+
+    parser = argparse.ArgumentParser(description="Decode a PNG in bands and report peak memory")
+    parser.add_argument("path", help="PNG to decode")
+    parser.add_argument("--band-height", type=int, default=256, help="rows per band")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with PngBandReader(args.path) as reader:
+        print(f"🔄 {reader.width}x{reader.height} {reader.mode}, {'streamed' if reader.streamable else 'full decode (interlaced or 16-bit)'}")
+        checksum = 0
+        for top, band in reader.iter_bands(args.band_height):
+            checksum = zlib.crc32(band.tobytes(), checksum)
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    print(f"✅ Decoded in {time.perf_counter() - start:.2f}s, peak memory {peak:.0f} MB (crc {checksum:08x})")
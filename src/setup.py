@@ -39,6 +39,7 @@ def check_gpu():
             print(f"   Memory: {torch.cuda.get_device_properties(0).total_memory / 1e9:.1f} GB")
         else:
             print("⚠️  No GPU detected. Training will be slower on CPU.")
+            print("   Use python -m src.train_cpu, which is tuned for CPU-only training.")
     except ImportError:
         print("PyTorch not installed yet.")
 
@@ -0,0 +1,228 @@
+# Sheet re-assembly
+# The reverse of the exporter: a batch of sprites plus their labels is laid out as a
+# sheet grid (one row per action/frame, one column per angle), optionally upscaled 6x,
+# and written as <name>_6xGigaPixel.png with a matching <name>A_6xGigaPixel.png mask and
+# label entries - so generated samples can be reviewed in the labeler as a few sheets.
+# Placement is a single array scatter per sheet, not a paste per sprite.
+#
+# The labels go to sprite_labels.db while it exists, else sprite_labels.json - close the
+# labeler before running this.
+#
+# Usage (from the project root):
+#   python -m src.sheet_assembler --npz samples.npz --name Generated           # GAN samples
+#   python -m src.sheet_assembler --manifest data/individual_sprites --sheet Imp  # round-trip an export
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from src.label_db import DB_PATH, LabelDatabase
+from src.label_store import blank_cell
+from src.label_validator import ACTIONS, ANGLES
+
+UPSCALE = 6
+MAX_ROWS = 64  # Rows per sheet before starting another one
+
+def grid_layout(labels):
+    """Assign each sprite a (row, col) from its labels.
+
+    Columns follow the labeler's angle order (only angles that occur); rows are
+    (action, frame) in action order. A second sprite for an occupied cell gets its own
+    row, so nothing is dropped. Returns (rows, cols, row keys, angles).
+    """
+    angles = [angle for angle in ANGLES if any(label.get('angle') == angle for label in labels)]
+    angles += sorted({label.get('angle', '') for label in labels} - set(angles))
+    col_of = {angle: col for col, angle in enumerate(angles)}
+
+    action_order = {action: index for index, action in enumerate(ACTIONS)}
+    occupied = set()
+    keys = []
+    for label in labels:
+        col = col_of[label.get('angle', '')]
+        action, frame = label.get('action', ''), label.get('frame', 1)
+        copy = 0
+        while (action, frame, copy, col) in occupied:
+            copy += 1
+        occupied.add((action, frame, copy, col))
+        keys.append(((action, frame, copy), col))
+
+    ordered = sorted({key for key, _ in keys}, key=lambda key: (action_order.get(key[0], len(ACTIONS)), key[0], key[1], key[2]))
+    row_of = {key: row for row, key in enumerate(ordered)}
+    rows = np.array([row_of[key] for key, _ in keys], dtype=np.intp)
+    cols = np.array([col for _, col in keys], dtype=np.intp)
+
+    return rows, cols, ordered, angles
+
+def assemble_grid(sprites, rows, cols, grid_rows, grid_cols, upscale=1):
+    """Scatter (N, H, W[, C]) sprites into one (grid_rows*H*upscale, grid_cols*W*upscale[, C]) sheet"""
+    height, width = sprites.shape[1:3]
+    channels = sprites.shape[3:]
+    grid = np.zeros((grid_rows, grid_cols, height, width) + channels, dtype=sprites.dtype)
+    grid[rows, cols] = sprites
+
+    # (rows, cols, H, W, C) -> (rows, H, cols, W, C) -> sheet
+    sheet = grid.swapaxes(1, 2).reshape((grid_rows * height, grid_cols * width) + channels)
+    if upscale > 1:
+        sheet = np.repeat(np.repeat(sheet, upscale, axis=0), upscale, axis=1)
+    return sheet
+
+def pad_sprites(textures, masks, height, width):
+    """Centre variable-size sprites on a common (height, width) canvas"""
+    padded_textures = np.zeros((len(textures), height, width, 3), dtype=np.uint8)
+    padded_masks = np.zeros((len(textures), height, width), dtype=np.uint8)
+    for i, (texture, mask) in enumerate(zip(textures, masks)):
+        h, w = mask.shape
+        top, left = (height - h) // 2, (width - w) // 2
+        padded_textures[i, top:top + h, left:left + w] = texture
+        padded_masks[i, top:top + h, left:left + w] = mask
+    return padded_textures, padded_masks
+
+def save_png_atomic(array, path, mode):
+    tmp_path = path.with_name(path.name + ".part")
+    Image.fromarray(array, mode).save(tmp_path, format="PNG", compress_level=1)
+    os.replace(tmp_path, path)
+
+def assemble_sheets(textures, masks, labels, name, sprites_dir="sprites", upscale=UPSCALE,
+                    max_rows=MAX_ROWS, category="other", description=""):
+    """Write sheets (and masks) for a batch of sprites; returns {sheet_name: sheet label data}.
+
+    textures is (N, H, W, 3) uint8, masks (N, H, W) uint8 or None (then non-black pixels),
+    labels a list of N dicts with sprite_name/action/angle/frame. Batches with more than
+    max_rows grid rows are split into <name>_01, <name>_02, ...
+    """
+    textures = np.asarray(textures, dtype=np.uint8)
+    masks = (textures.max(axis=-1) > 0).astype(np.uint8) * 255 if masks is None else np.asarray(masks, dtype=np.uint8)
+    sprites_dir = Path(sprites_dir)
+    sprites_dir.mkdir(parents=True, exist_ok=True)
+
+    rows, cols, row_keys, angles = grid_layout(labels)
+    grid_cols = len(angles)
+    chunks = range(0, len(row_keys), max_rows)
+
+    sheets = {}
+    for part, first_row in enumerate(chunks, start=1):
+        sheet_name = name if len(chunks) == 1 else f"{name}_{part:02d}"
+        grid_rows = min(max_rows, len(row_keys) - first_row)
+        members = np.flatnonzero((rows >= first_row) & (rows < first_row + grid_rows))
+        local_rows = rows[members] - first_row
+
+        save_png_atomic(assemble_grid(textures[members], local_rows, cols[members], grid_rows, grid_cols, upscale),
+                        sprites_dir / f"{sheet_name}_6xGigaPixel.png", "RGB")
+        save_png_atomic(assemble_grid(masks[members], local_rows, cols[members], grid_rows, grid_cols, upscale),
+                        sprites_dir / f"{sheet_name}A_6xGigaPixel.png", "L")
+
+        # Every cell gets labels: the sprite's, or empty where the grid has a hole
+        cells = {f"{row},{col}": blank_cell(row, col, empty=True) for row in range(grid_rows) for col in range(grid_cols)}
+        for index, row in zip(members, local_rows):
+            col = int(cols[index])
+            cell = blank_cell(int(row), col)
+            cell.update({key: labels[index][key] for key in ('sprite_name', 'action', 'angle', 'frame', 'important') if key in labels[index]})
+            cells[f"{row},{col}"] = cell
+
+        sheets[sheet_name] = {
+            'sheet_info': {'display_name': sheet_name, 'category': category, 'description': description},
+            'grid': {'cols': grid_cols, 'rows': grid_rows},
+            'sprites': cells,
+        }
+
+    return sheets
+
+def merge_labels(labels_path, sheets, db_path=DB_PATH):
+    """Add or replace the assembled sheets in the label store; returns the path written.
+
+    Like the labeler, this uses the label database while it exists and the JSON file
+    (rewritten atomically) otherwise. The labeler must be closed - it would not see the
+    new sheets, and its autosave would write the JSON file without them.
+    """
+    if Path(db_path).exists():
+        db = LabelDatabase(db_path)
+        try:
+            db.replace_sheets(sheets)
+        finally:
+            db.close()
+        return Path(db_path)
+
+    labels_path = Path(labels_path)
+    data = {}
+    if labels_path.exists():
+        with open(labels_path, "r") as f:
+            data = json.load(f)
+    data.update(sheets)
+
+    tmp_path = labels_path.with_name(labels_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, labels_path)
+    return labels_path
+
+def to_uint8(array):
+    """Generator output in [-1, 1] -> uint8 (uint8 arrays pass through)"""
+    if array.dtype == np.uint8:
+        return array
+    return np.clip((array + 1) * 127.5, 0, 255).astype(np.uint8)
+
+def load_npz_batch(npz_path):
+    """Generated samples: 'textures' (N, H, W, 3), optional 'masks' (N, H, W) and 'labels' (JSON list)"""
+    with np.load(npz_path) as data:
+        textures = data['textures']
+        masks = data['masks'] if 'masks' in data else None
+        labels = json.loads(str(data['labels'])) if 'labels' in data else None
+
+    textures = to_uint8(textures)
+    masks = None if masks is None else to_uint8(masks)
+    if textures.ndim == 4 and textures.shape[-1] == 4 and masks is None:
+        textures, masks = textures[..., :3], textures[..., 3]
+    if labels is None:
+        # Unlabeled samples: 8 per row, numbered as frames
+        labels = [{'sprite_name': 'sample', 'action': 'unused', 'angle': ANGLES[i % 8], 'frame': i // 8 + 1} for i in range(len(textures))]
+    return textures, masks, labels
+
+def load_manifest_batch(export_dir, sheet=None):
+    """Exported sprites (optionally one sheet) with their manifest labels"""
+    from src.augment import load_record_arrays
+    from src.export_manifest import read_manifest
+
+    records = [record for record in read_manifest(export_dir) if record.get('mask') and (sheet is None or record['sheet'] == sheet)]
+    pairs = [load_record_arrays(record, export_dir) for record in records]
+    height = max((mask.shape[0] for _, mask in pairs), default=0)
+    width = max((mask.shape[1] for _, mask in pairs), default=0)
+    textures, masks = pad_sprites([texture for texture, _ in pairs], [mask for _, mask in pairs], height, width)
+    return textures, masks, records
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lay out sprites as labeled sheets for review in the labeler")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--npz", help="generated samples (.npz with textures, optional masks and labels)")
+    source.add_argument("--manifest", metavar="EXPORT_DIR", help="exporter output with manifest.jsonl")
+    parser.add_argument("--sheet", help="with --manifest, only this sheet")
+    parser.add_argument("--name", help="sheet name (default: 'Generated' or the source sheet + '_Reassembled')")
+    parser.add_argument("--sprites-dir", default="sprites", help="where the sheets are written")
+    parser.add_argument("--labels", default="sprite_labels.json", help="label file the new sheets are added to")
+    parser.add_argument("--db", default=DB_PATH, help="label database used instead of --labels while it exists")
+    parser.add_argument("--no-upscale", action="store_true", help="keep sprites at their native size")
+    parser.add_argument("--max-rows", type=int, default=MAX_ROWS, help="grid rows per sheet")
+    args = parser.parse_args()
+
+    if args.npz:
+        textures, masks, labels = load_npz_batch(args.npz)
+        name, category = args.name or "Generated", "other"
+    else:
+        textures, masks, labels = load_manifest_batch(args.manifest, args.sheet)
+        name = args.name or f"{args.sheet or 'Export'}_Reassembled"
+        category = labels[0]['category'] if labels else "other"
+
+    if len(textures) == 0:
+        print("❌ No sprites to assemble")
+    else:
+        print(f"🔄 Assembling {len(textures)} sprites...")
+        sheets = assemble_sheets(textures, masks, labels, name, args.sprites_dir, 1 if args.no_upscale else UPSCALE,
+                                 args.max_rows, category)
+        labels_path = merge_labels(args.labels, sheets, args.db)
+        for sheet_name, sheet_data in sheets.items():
+            grid = sheet_data['grid']
+            print(f"✅ {sheet_name}: {grid['cols']}x{grid['rows']} grid in {args.sprites_dir}/")
+        print(f"📋 Labels added to {labels_path}")
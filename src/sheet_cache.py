@@ -0,0 +1,324 @@
+# Decoded sprite sheet cache
+# Each *_6xGigaPixel.png is decoded once into a raw .npy file under .sheet_cache/.
+# Later opens memory-map that file, so only the pixels a tool actually touches are read.
+# PNGs are decoded in bands straight into the .npy file, so building the cache never
+# holds a whole sheet in memory. The labeler reads a compact variant: masks as L and
+# textures as 1-byte palette indices when they have few enough colours.
+#
+# Usage (from the project root):
+#   python -m src.sheet_cache            # pre-build the cache for every sheet
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from src.png_stream import PNG_SIGNATURE, PngBandReader
+
+CACHE_DIR = ".sheet_cache"
+CACHE_VERSION = 1
+
+# Modes stored as-is; anything else is converted to one of these before caching
+CACHED_MODES = ("L", "LA", "RGB", "RGBA")
+
+BAND_HEIGHT = 512  # Rows decoded at a time while caching
+
+# Display layouts the labeler reads (see open_compact_sheet)
+COMPACT_VARIANT = "compact"
+MAX_PALETTE_COLORS = 256
+
+def to_gray(pixels):
+    """Convert an (H, W) or (H, W, C) uint8 array to luminance like PIL's convert('L')"""
+    if pixels.ndim == 2:
+        return pixels
+    if pixels.shape[-1] < 3:
+        return pixels[..., 0]
+    rgb = pixels[..., :3].astype(np.uint32)
+    return ((rgb[..., 0] * 299 + rgb[..., 1] * 587 + rgb[..., 2] * 114 + 500) // 1000).astype(np.uint8)
+
+class CachedSheet:
+    """A decoded sheet backed by a memory-mapped array.
+
+    Provides the parts of the PIL Image API the tools use (size, crop, resize),
+    so it can be passed to export_sprite_sheet and the labeler unchanged. A compact
+    sheet (see open_compact_sheet) may hold palette indices in array; pixels() expands
+    them, so callers always see colours in mode.
+    """
+
+    def __init__(self, array, mode, source_path=None, palette=None):
+        self.array = array
+        self.mode = mode
+        self.source_path = source_path
+        self.palette = palette  # (colors, channels) table that array indexes, or None
+
+    def pixels(self, index=Ellipsis):
+        """Pixels at a numpy index, in mode (only the indexed pixels are read)"""
+        values = self.array[index]
+        return values if self.palette is None else self.palette[values]
+
+    @property
+    def storage_mode(self):
+        """How the pixels are stored: P for palette indices, else mode"""
+        return "P" if self.palette is not None else self.mode
+
+    @property
+    def nbytes(self):
+        """Size of the decoded pixel data (mapped, not necessarily resident)"""
+        if self.array is None:
+            return 0
+        return self.array.nbytes + (0 if self.palette is None else self.palette.nbytes)
+
+    @property
+    def size(self):
+        return self.array.shape[1], self.array.shape[0]
+
+    @property
+    def width(self):
+        return self.array.shape[1]
+
+    @property
+    def height(self):
+        return self.array.shape[0]
+
+    def getbands(self):
+        return tuple(self.mode)
+
+    def crop(self, box):
+        """Crop a region into an in-memory PIL image (only that region is paged in)"""
+        left, top, right, bottom = (int(v) for v in box)
+        region = np.zeros((bottom - top, right - left) + (() if self.mode == "L" else (len(self.mode),)), dtype=np.uint8)
+
+        # Like PIL, parts of the box outside the sheet come back as zeros
+        src_left, src_top = max(left, 0), max(top, 0)
+        src_right, src_bottom = min(right, self.width), min(bottom, self.height)
+        if src_right > src_left and src_bottom > src_top:
+            region[src_top - top:src_bottom - top, src_left - left:src_right - left] = \
+                self.pixels((slice(src_top, src_bottom), slice(src_left, src_right)))
+
+        return Image.fromarray(region, self.mode)
+
+    def resize(self, size, resample=Image.NEAREST):
+        """Resize the whole sheet; nearest-neighbour only reads the sampled pixels"""
+        if resample != Image.NEAREST:
+            return self.to_image().resize(size, resample)
+
+        width, height = size
+        # Sample pixel centres, matching PIL's NEAREST
+        xs = np.minimum(((np.arange(width) + 0.5) * self.width / width).astype(np.intp), self.width - 1)
+        ys = np.minimum(((np.arange(height) + 0.5) * self.height / height).astype(np.intp), self.height - 1)
+        return Image.fromarray(np.ascontiguousarray(self.pixels(np.ix_(ys, xs))), self.mode)
+
+    def to_image(self):
+        """Load the full sheet into memory as a PIL image"""
+        return Image.fromarray(np.ascontiguousarray(self.pixels()), self.mode)
+
+    def close(self):
+        """Drop the memory map"""
+        self.array = None
+        self.palette = None
+
+def cache_paths(source_path, cache_dir=CACHE_DIR, variant=None):
+    """Get the .npy and metadata paths used to cache a source image (or a variant of it)"""
+    source_path = Path(source_path)
+    key = hashlib.sha1(str(source_path.resolve()).encode("utf-8")).hexdigest()[:10]
+    name = f"{source_path.stem}-{key}" + (f".{variant}" if variant else "")
+    return Path(cache_dir) / f"{name}.npy", Path(cache_dir) / f"{name}.json"
+
+def temp_path(path):
+    """Per-writer temp name next to path - parallel processes and threads never clobber each other"""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def source_signature(source_path):
+    """Identify a source file version by size and modification time"""
+    stat = Path(source_path).stat()
+    return {'version': CACHE_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def decode_for_cache(source_path):
+    """Decode a source image into one of the cached modes"""
+    image = Image.open(source_path)
+
+    if image.mode not in CACHED_MODES:
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        if image.mode in ("1", "I", "I;16", "F"):
+            image = image.convert("L")
+        else:
+            image = image.convert("RGBA" if has_alpha else "RGB")
+
+    return np.asarray(image), image.mode
+
+def write_cache(source_path, cache_dir=CACHE_DIR):
+    """Decode a source image and (re)write its cache files atomically"""
+    npy_path, meta_path = cache_paths(source_path, cache_dir)
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+
+    signature = source_signature(source_path)
+
+    tmp_npy = temp_path(npy_path)
+    with open(source_path, "rb") as f:
+        is_png = f.read(8) == PNG_SIGNATURE
+
+    if is_png:
+        with PngBandReader(source_path) as reader:
+            mode = reader.mode
+            shape = (reader.height, reader.width) + (() if mode == "L" else (len(mode),))
+            array = np.lib.format.open_memmap(tmp_npy, mode="w+", dtype=np.uint8, shape=shape)
+            for top, band in reader.iter_bands(BAND_HEIGHT):
+                array[top:top + len(band)] = band
+            array.flush()
+            del array
+    else:
+        array, mode = decode_for_cache(source_path)
+        shape = array.shape
+        with open(tmp_npy, "wb") as f:
+            np.save(f, array)
+    os.replace(tmp_npy, npy_path)
+
+    meta = dict(signature, mode=mode, shape=list(shape), source=str(source_path))
+    tmp_meta = temp_path(meta_path)
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, meta_path)
+
+    return meta
+
+def read_cache_meta(source_path, cache_dir=CACHE_DIR, variant=None):
+    """Get the cache metadata if the cache is still valid for the source, else None"""
+    npy_path, meta_path = cache_paths(source_path, cache_dir, variant)
+    if not meta_path.exists():
+        return None
+
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    signature = source_signature(source_path)
+    if any(meta.get(key) != value for key, value in signature.items()):
+        return None
+    if meta.get('storage') != "full" and not npy_path.exists():
+        return None
+    return meta
+
+def open_cached_sheet(source_path, cache_dir=CACHE_DIR):
+    """Open a sheet through the cache, decoding the PNG only if the cache is missing or stale"""
+    meta = read_cache_meta(source_path, cache_dir)
+    if meta is None:
+        meta = write_cache(source_path, cache_dir)
+
+    npy_path, _ = cache_paths(source_path, cache_dir)
+    array = np.load(npy_path, mmap_mode="r")
+    return CachedSheet(array, meta['mode'], source_path)
+
+def pack_colors(pixels):
+    """Pack (..., C) uint8 pixels into one integer per pixel"""
+    packed = np.zeros(pixels.shape[:-1], dtype=np.uint32)
+    for channel in range(pixels.shape[-1]):
+        packed = (packed << 8) | pixels[..., channel]
+    return packed
+
+def write_compact_cache(source_path, cache_dir=CACHE_DIR, mask=False):
+    """Store a sheet in the smallest lossless layout for display, next to its full cache.
+
+    Masks become L (they are gray, so nothing is lost). Textures drop an alpha channel
+    that is fully opaque, and sheets with at most 256 colours become 1-byte palette
+    indices. Sheets that are already compact are marked 'full' and use the full cache.
+    """
+    full = open_cached_sheet(source_path, cache_dir)
+    pixels, mode = full.array, full.mode
+    npy_path, meta_path = cache_paths(source_path, cache_dir, COMPACT_VARIANT)
+    meta = dict(source_signature(source_path), mask=mask, source=str(source_path), storage="full", mode=mode)
+    bands = range(0, full.height, BAND_HEIGHT)
+
+    if mask:
+        target_mode = "L"
+    else:
+        # Alpha that never drops below 255 carries nothing
+        opaque = 'A' in mode and all(pixels[top:top + BAND_HEIGHT, :, -1].min() == 255 for top in bands)
+        target_mode = mode.replace("A", "") if opaque else mode
+
+    palette = None
+    if not mask and target_mode != "L":
+        channels = len(target_mode)
+        colors = np.zeros(0, dtype=np.uint32)
+        for top in bands:
+            colors = np.union1d(colors, pack_colors(pixels[top:top + BAND_HEIGHT, :, :channels]))
+            if len(colors) > MAX_PALETTE_COLORS:
+                break
+        if len(colors) <= MAX_PALETTE_COLORS:
+            palette = colors
+            meta['palette'] = np.stack([(colors >> (8 * (channels - 1 - c))) & 0xFF for c in range(channels)], axis=-1).tolist()
+
+    if target_mode != mode or palette is not None:
+        shape = (full.height, full.width) + (() if target_mode == "L" or palette is not None else (len(target_mode),))
+        tmp_npy = temp_path(npy_path)
+        array = np.lib.format.open_memmap(tmp_npy, mode="w+", dtype=np.uint8, shape=shape)
+        for top in bands:
+            band = np.asarray(pixels[top:top + BAND_HEIGHT])
+            if mask:
+                band = to_gray(band)
+            elif palette is not None:
+                band = np.searchsorted(palette, pack_colors(band[..., :len(target_mode)])).astype(np.uint8)
+            else:
+                band = band[..., :len(target_mode)]
+            array[top:top + len(band)] = band
+        array.flush()
+        del array
+        os.replace(tmp_npy, npy_path)
+        meta.update(storage="compact", mode=target_mode)
+
+    full.close()
+    tmp_meta = temp_path(meta_path)
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, meta_path)
+    return meta
+
+def open_compact_sheet(source_path, mask=False, cache_dir=CACHE_DIR):
+    """Open a sheet in its compact display layout (see write_compact_cache), building it if needed"""
+    meta = read_cache_meta(source_path, cache_dir, COMPACT_VARIANT)
+    if meta is None or meta.get('mask') != mask:
+        meta = write_compact_cache(source_path, cache_dir, mask)
+    if meta['storage'] == "full":
+        return open_cached_sheet(source_path, cache_dir)
+
+    npy_path, _ = cache_paths(source_path, cache_dir, COMPACT_VARIANT)
+    array = np.load(npy_path, mmap_mode="r")
+    palette = np.array(meta['palette'], dtype=np.uint8) if 'palette' in meta else None
+    return CachedSheet(array, meta['mode'], source_path, palette)
+
+def build_cache(sprites_dir="sprites", cache_dir=CACHE_DIR, workers=None):
+    """Decode every stale or missing sheet in parallel"""
+    sources = sorted(Path(sprites_dir).glob("*_6xGigaPixel.png"))
+    stale = [path for path in sources if read_cache_meta(path, cache_dir) is None]
+
+    print(f"🔄 Caching {len(stale)} of {len(sources)} sheets ({len(sources) - len(stale)} up to date)")
+    if not stale:
+        return 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(write_cache, path, cache_dir): path for path in stale}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                meta = future.result()
+                print(f"[{done}/{len(stale)}] ✅ {path.name} ({meta['shape'][1]}x{meta['shape'][0]} {meta['mode']})")
+            except Exception as e:
+                print(f"[{done}/{len(stale)}] ❌ {path.name}: {e}")
+
+    return len(stale)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-build the decoded sheet cache")
+    parser.add_argument("--sprites-dir", default="sprites", help="folder with the 6xGigaPixel sheets")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="where decoded sheets are stored")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    args = parser.parse_args()
+
+    build_cache(args.sprites_dir, args.cache_dir, args.workers)
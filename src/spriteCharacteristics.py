@@ -94,6 +94,115 @@ class DoomSpriteAnalyzer:
         
         return min(score, 100)
     
+    # Batch scoring for generated sprites. Everything below works on whole
+    # (N, H, W, 3) uint8 batches at once, so thousands of samples can be filtered per second.
+    
+    def reference_palette(self, palette=None):
+        """Palette to compare colours against: a (K, 3) array (e.g. PLAYPAL via wad_reader) or the common colours"""
+        if palette is not None:
+            return np.asarray(palette, dtype=np.uint8).reshape(-1, 3)
+        return np.array([[int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in self.sprite_characteristics['common_colors']], dtype=np.uint8)
+    
+    def palette_distance_table(self, palette):
+        """Distance from every 5-bit-per-channel colour to its nearest palette entry (32768 lookups)"""
+        key = palette.tobytes()
+        if getattr(self, '_palette_table_key', None) != key:
+            levels = np.arange(32) * 8 + 4
+            green_blue = np.stack(np.meshgrid(levels, levels, indexing='ij'), axis=-1).reshape(-1, 1, 2)
+            palette = palette.astype(np.int32)
+            
+            # One red level (1024 grid colours) at a time: a few MB of temporaries instead of hundreds
+            nearest = np.empty((32, 32 * 32), dtype=np.float64)
+            for red_index, red in enumerate(levels):
+                squared = (red - palette[:, 0]) ** 2 + ((green_blue - palette[None, :, 1:]) ** 2).sum(axis=-1)
+                nearest[red_index] = np.sqrt(squared.min(axis=1))
+            self._palette_table = (nearest.ravel() / np.sqrt(3 * 255 ** 2)).astype(np.float32)
+            self._palette_table_key = key
+        return self._palette_table
+    
+    def batch_characteristics(self, images, masks=None, palette=None, dark_threshold=64):
+        """Per-image characteristics for an (N, H, W, 3) uint8 batch.
+        
+        masks (N, H, W) marks sprite pixels; without it, non-black pixels count as sprite.
+        Returns a dict of (N,) arrays: colors, palette_distance (0-1), outline_ratio,
+        compactness and pixelation.
+        """
+        images = np.asarray(images)[..., :3]
+        count, height, width, _ = images.shape
+        masks = images.max(axis=-1) > 0 if masks is None else np.asarray(masks) > 0
+        area = masks.reshape(count, -1).sum(axis=1)
+        safe_area = np.maximum(area, 1)
+        
+        # Colour count: unique packed RGB values inside the mask
+        packed = (images[..., 0].astype(np.uint32) << 16) | (images[..., 1].astype(np.uint32) << 8) | images[..., 2]
+        codes = np.sort(np.where(masks, packed, np.uint32(1 << 24)).reshape(count, -1), axis=1)
+        changes = (codes[:, 1:] != codes[:, :-1]) & (codes[:, 1:] < (1 << 24))
+        colors = changes.sum(axis=1) + (codes[:, 0] < (1 << 24))
+        
+        # Palette distance: table lookup on 5-bit colours, averaged over the mask
+        table = self.palette_distance_table(self.reference_palette(palette))
+        quantized = ((images[..., 0] >> 3).astype(np.int32) << 10) | ((images[..., 1] >> 3).astype(np.int32) << 5) | (images[..., 2] >> 3)
+        palette_distance = (table[quantized] * masks).reshape(count, -1).sum(axis=1) / safe_area
+        
+        # Boundary: mask pixels with a 4-neighbour outside the mask
+        padded = np.pad(masks, ((0, 0), (1, 1), (1, 1)))
+        interior = padded[:, :-2, 1:-1] & padded[:, 2:, 1:-1] & padded[:, 1:-1, :-2] & padded[:, 1:-1, 2:]
+        boundary = masks & ~interior
+        boundary_count = boundary.reshape(count, -1).sum(axis=1)
+        
+        # Outline ratio: how much of the boundary is dark
+        luminance = images @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        dark_boundary = (boundary & (luminance < dark_threshold)).reshape(count, -1).sum(axis=1)
+        outline_ratio = dark_boundary / np.maximum(boundary_count, 1)
+        
+        # Compactness: 4*pi*area / perimeter^2, perimeter = mask/background edges
+        edges = (padded[:, 1:, :] != padded[:, :-1, :]).reshape(count, -1).sum(axis=1) + \
+                (padded[:, :, 1:] != padded[:, :, :-1]).reshape(count, -1).sum(axis=1)
+        compactness = np.clip(4 * np.pi * area / np.maximum(edges, 1) ** 2, 0, 1)
+        
+        # Pixelation: share of k x k blocks that are one flat colour, best over block sizes
+        pixelation = np.zeros(count, dtype=np.float32)
+        for block in (2, 3, 4, 6):
+            rows, cols = height // block, width // block
+            if rows == 0 or cols == 0:
+                continue
+            blocks = packed[:, :rows * block, :cols * block].reshape(count, rows, block, cols, block)
+            flat = (blocks == blocks[:, :, :1, :, :1]).all(axis=(2, 4))
+            covered = masks[:, :rows * block, :cols * block].reshape(count, rows, block, cols, block).any(axis=(2, 4))
+            share = (flat & covered).reshape(count, -1).sum(axis=1) / np.maximum(covered.reshape(count, -1).sum(axis=1), 1)
+            pixelation = np.maximum(pixelation, share)
+        
+        return {
+            'colors': colors,
+            'palette_distance': palette_distance.astype(np.float32),
+            'outline_ratio': outline_ratio.astype(np.float32),
+            'compactness': compactness.astype(np.float32),
+            'pixelation': pixelation,
+            'area': area,
+        }
+    
+    def score_batch(self, images, masks=None, palette=None, chunk_size=256):
+        """DOOM-likeness (0-100) for every image in an (N, H, W, 3) uint8 batch, as an (N,) array.
+        
+        Filter generated samples with e.g. images[analyzer.score_batch(images) >= 60].
+        """
+        images = np.asarray(images)
+        scores = np.zeros(len(images), dtype=np.float32)
+        
+        for start in range(0, len(images), chunk_size):
+            end = start + chunk_size
+            features = self.batch_characteristics(images[start:end], None if masks is None else masks[start:end], palette)
+            
+            # Limited palette: full marks up to 64 colours, none past 256
+            color_score = np.clip((256 - features['colors']) / (256 - 64), 0, 1)
+            palette_score = np.clip(1 - features['palette_distance'] / 0.15, 0, 1)
+            
+            score = (25 * color_score + 20 * palette_score + 20 * features['outline_ratio'] +
+                     15 * features['compactness'] + 20 * features['pixelation'])
+            scores[start:end] = np.where(features['area'] > 0, score, 0)
+        
+        return scores
+    
     def create_sample_sprite_template(self):
         """Create a template showing DOOM sprite characteristics"""
         
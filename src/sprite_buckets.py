@@ -0,0 +1,155 @@
+# Size bucketing for variable-size sprites
+# Exported sprites range from small items to the Cyberdemon, so padding every batch to
+# the largest size wastes most of it. Sprites are grouped into a few bucket resolutions
+# (sizes rounded up to a step, then merged down to a maximum count where that costs the
+# least padding); each batch comes from one bucket and carries a padding mask.
+#
+# Usage (from the project root):
+#   python -m src.sprite_buckets                    # bucket table + padding waste
+#   python -m src.sprite_buckets --max-buckets 12 --step 16
+
+import argparse
+
+import numpy as np
+
+DEFAULT_STEP = 8
+DEFAULT_MAX_BUCKETS = 8
+
+def round_up(values, step):
+    return -(-np.asarray(values) // step) * step
+
+def choose_buckets(widths, heights, step=DEFAULT_STEP, max_buckets=DEFAULT_MAX_BUCKETS):
+    """Pick bucket resolutions as an (B, 2) array of (width, height).
+
+    Starts with one bucket per rounded-up size, then repeatedly merges the pair of buckets
+    whose sprites gain the least padding by moving into the size that holds both.
+    """
+    sizes = np.stack([round_up(widths, step), round_up(heights, step)], axis=1)
+    buckets, counts = np.unique(sizes, axis=0, return_counts=True)
+    buckets, counts = buckets.astype(np.int64), counts.astype(np.int64)
+
+    while len(buckets) > max_buckets:
+        # Cost of every pair at once: (count_i * grown area_i) + (count_j * grown area_j)
+        target_w = np.maximum(buckets[:, None, 0], buckets[None, :, 0])
+        target_h = np.maximum(buckets[:, None, 1], buckets[None, :, 1])
+        area = buckets[:, 0] * buckets[:, 1]
+        grown = target_w * target_h
+        cost = counts[:, None] * (grown - area[:, None]) + counts[None, :] * (grown - area[None, :])
+        np.fill_diagonal(cost, np.iinfo(np.int64).max)
+
+        i, j = np.unravel_index(cost.argmin(), cost.shape)
+        target = np.array([target_w[i, j], target_h[i, j]])
+        merged = counts[i] + counts[j]
+        keep = np.ones(len(buckets), dtype=bool)
+        keep[[i, j]] = False
+        buckets, counts = buckets[keep], counts[keep]
+
+        existing = np.flatnonzero((buckets == target).all(axis=1))
+        if len(existing):
+            counts[existing[0]] += merged
+        else:
+            buckets = np.vstack([buckets, target])
+            counts = np.append(counts, merged)
+
+    order = np.lexsort((buckets[:, 1], buckets[:, 0], buckets[:, 0] * buckets[:, 1]))
+    return buckets[order].reshape(-1, 2)
+
+def assign_buckets(widths, heights, buckets):
+    """Index of the smallest bucket that fits each sprite (-1 if none does)"""
+    widths, heights = np.asarray(widths)[:, None], np.asarray(heights)[:, None]
+    fits = (widths <= buckets[None, :, 0]) & (heights <= buckets[None, :, 1])
+    area = np.where(fits, buckets[None, :, 0] * buckets[None, :, 1], np.iinfo(np.int64).max)
+    return np.where(fits.any(axis=1), area.argmin(axis=1), -1)
+
+class BucketPlan:
+    """Bucket resolutions plus per-bucket index arrays into the record list"""
+
+    def __init__(self, records, step=DEFAULT_STEP, max_buckets=DEFAULT_MAX_BUCKETS, buckets=None):
+        self.records = [record for record in records if record.get('mask')]
+        self.widths = np.array([record['width'] for record in self.records], dtype=np.int64)
+        self.heights = np.array([record['height'] for record in self.records], dtype=np.int64)
+
+        if buckets is None:
+            buckets = choose_buckets(self.widths, self.heights, step, max_buckets) if self.records else np.zeros((0, 2), dtype=np.int64)
+        self.buckets = np.asarray(buckets, dtype=np.int64).reshape(-1, 2)
+        self.assignment = assign_buckets(self.widths, self.heights, self.buckets) if self.records else np.zeros(0, dtype=np.int64)
+        self.indices = [np.flatnonzero(self.assignment == b) for b in range(len(self.buckets))]
+        self.unassigned = np.flatnonzero(self.assignment < 0)
+
+    def padding_waste(self, bucket=None):
+        """Percentage of bucket pixels that are padding (for one bucket or overall)"""
+        indices = np.flatnonzero(self.assignment >= 0) if bucket is None else self.indices[bucket]
+        if len(indices) == 0:
+            return 0.0
+        used = (self.widths[indices] * self.heights[indices]).sum()
+        sizes = self.buckets[self.assignment[indices]]
+        total = (sizes[:, 0] * sizes[:, 1]).sum()
+        return 100.0 * (1 - used / total)
+
+    def single_size_waste(self):
+        """Padding percentage if everything were padded to the largest sprite, for comparison"""
+        if not self.records:
+            return 0.0
+        total = len(self.records) * self.widths.max() * self.heights.max()
+        return 100.0 * (1 - (self.widths * self.heights).sum() / total)
+
+    def iter_batches(self, batch_size, export_dir="data/individual_sprites", rng=None, drop_last=False):
+        """Yield (bucket size, textures, masks, valid, records) batches, one bucket per batch.
+
+        textures is (B, H, W, 3) uint8 and masks (B, H, W) uint8 with sprites centred in
+        the bucket; valid is a (B, H, W) bool array that is False on padding. Batches are
+        shuffled within and across buckets when rng is given.
+        """
+        from src.augment import load_record_arrays
+
+        batches = []
+        for bucket, indices in enumerate(self.indices):
+            if rng is not None:
+                indices = rng.permutation(indices)
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                if drop_last and len(chunk) < batch_size:
+                    continue
+                batches.append((bucket, chunk))
+        if rng is not None:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+
+        for bucket, chunk in batches:
+            width, height = (int(v) for v in self.buckets[bucket])
+            textures = np.zeros((len(chunk), height, width, 3), dtype=np.uint8)
+            masks = np.zeros((len(chunk), height, width), dtype=np.uint8)
+            valid = np.zeros((len(chunk), height, width), dtype=bool)
+
+            for i, index in enumerate(chunk):
+                texture, mask = load_record_arrays(self.records[index], export_dir)
+                h, w = mask.shape
+                top, left = (height - h) // 2, (width - w) // 2
+                textures[i, top:top + h, left:left + w] = texture
+                masks[i, top:top + h, left:left + w] = mask
+                valid[i, top:top + h, left:left + w] = True
+
+            yield (width, height), textures, masks, valid, [self.records[index] for index in chunk]
+
+    def report(self):
+        print(f"{'bucket':>12}{'sprites':>10}{'waste':>9}")
+        for bucket, (width, height) in enumerate(self.buckets):
+            print(f"{f'{width}x{height}':>12}{len(self.indices[bucket]):>10}{self.padding_waste(bucket):>8.1f}%")
+        print(f"📋 Padding waste: {self.padding_waste():.1f}% with {len(self.buckets)} buckets "
+              f"(vs. {self.single_size_waste():.1f}% padding everything to the largest sprite)")
+        if len(self.unassigned):
+            print(f"⚠️  {len(self.unassigned)} sprites do not fit any bucket")
+
+if __name__ == "__main__":
+    from src.export_manifest import read_manifest
+
+    parser = argparse.ArgumentParser(description="Group exported sprites into size buckets")
+    parser.add_argument("--export-dir", default="data/individual_sprites", help="exporter output with manifest.jsonl")
+    parser.add_argument("--max-buckets", type=int, default=DEFAULT_MAX_BUCKETS, help="maximum number of bucket sizes")
+    parser.add_argument("--step", type=int, default=DEFAULT_STEP, help="bucket sizes are multiples of this")
+    args = parser.parse_args()
+
+    records = read_manifest(args.export_dir)
+    if not records:
+        print(f"❌ No manifest in {args.export_dir} - run the exporter first")
+    else:
+        BucketPlan(records, args.step, args.max_buckets).report()
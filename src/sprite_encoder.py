@@ -0,0 +1,200 @@
+# Image encoding for exported sprites
+# The exporter hands every texture/mask to a SpriteEncoder, which picks the file format
+# (PNG with a chosen compress_level, lossless WebP, or raw uncompressed .npy), stores
+# masks as 8-bit (default) or 1-bit grayscale, and encodes on a thread pool - zlib and libwebp
+# release the GIL, so several sprites compress at once.
+#
+# Usage (from the project root):
+#   python -m src.sprite_encoder --benchmark      # size vs. time for each format
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+FORMATS = {
+    'png': '.png',
+    'webp': '.webp',
+    'raw': '.npy',
+}
+MASK_MODES = ('L', '1', 'source')  # 'source' keeps the mask's own mode
+
+class SpriteEncoder:
+    """Writes sprites in the chosen format, optionally on a thread pool"""
+
+    def __init__(self, format='png', compress_level=6, mask_mode='L', threads=0):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r} (choose from {', '.join(FORMATS)})")
+        if mask_mode not in MASK_MODES:
+            raise ValueError(f"Unknown mask mode {mask_mode!r}")
+
+        self.format = format
+        self.suffix = FORMATS[format]
+        self.compress_level = compress_level
+        self.mask_mode = mask_mode
+        self.executor = ThreadPoolExecutor(max_workers=threads) if threads else None
+        self.pending = []
+
+    @property
+    def settings(self):
+        """Everything that changes the files written (the thread count doesn't)"""
+        return {'format': self.format, 'compress_level': self.compress_level, 'mask_mode': self.mask_mode}
+
+    def prepare_mask(self, mask):
+        """Convert a mask to the configured storage mode"""
+        if self.mask_mode == 'source' or mask.mode == self.mask_mode:
+            return mask
+        gray = mask.convert('L')
+        if self.mask_mode == '1':
+            # Threshold rather than dither, so edges stay hard
+            return gray.point(lambda value: 255 if value >= 128 else 0).convert('1')
+        return gray
+
+    def write(self, image, path):
+        """Encode one image to path atomically"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".part")
+        try:
+            if self.format == 'raw':
+                with open(tmp_path, "wb") as f:
+                    np.save(f, np.asarray(image))
+            elif self.format == 'webp':
+                # WebP has no 1-bit mode
+                image = image.convert('L') if image.mode == '1' else image
+                image.save(tmp_path, format="WEBP", lossless=True, quality=100, method=4)
+            else:
+                image.save(tmp_path, format="PNG", compress_level=self.compress_level)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        # A copy of this sprite left by an export in another format would shadow the new one
+        remove_sprite_files(path.parent, path.stem, keep=path.suffix)
+
+    def save(self, image, path):
+        """Write an image now, or queue it on the thread pool"""
+        if self.executor is None:
+            self.write(image, path)
+        else:
+            self.pending.append(self.executor.submit(self.write, image, path))
+
+    def save_mask(self, mask, path):
+        self.save(self.prepare_mask(mask), path)
+
+    def wait(self):
+        """Block until queued writes finish, re-raising the first failure"""
+        pending, self.pending = self.pending, []
+        error = None
+        for future in pending:
+            try:
+                future.result()
+            except BaseException as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+def find_sprite_file(directory, stem):
+    """Find an exported file (e.g. 'imp_walk_front_01_texture') in any encoder format.
+
+    If older exports left the sprite in several formats, the newest file wins.
+    """
+    paths = [Path(directory) / f"{stem}{suffix}" for suffix in FORMATS.values()]
+    paths = [path for path in paths if path.exists()]
+    return max(paths, key=lambda path: path.stat().st_mtime_ns, default=None)
+
+def remove_sprite_files(directory, stem, keep=None):
+    """Delete an exported file in every encoder format (except the keep suffix)"""
+    for suffix in FORMATS.values():
+        if suffix != keep:
+            (Path(directory) / f"{stem}{suffix}").unlink(missing_ok=True)
+
+def open_sprite_file(path):
+    """Open an exported sprite written by any encoder format as a PIL image"""
+    path = Path(path)
+    if path.suffix == FORMATS['raw']:
+        return Image.fromarray(np.load(path))
+    return Image.open(path)
+
+BENCHMARK_CONFIGS = [
+    ('png level 0', dict(format='png', compress_level=0)),
+    ('png level 1', dict(format='png', compress_level=1)),
+    ('png level 6', dict(format='png', compress_level=6)),
+    ('png level 9', dict(format='png', compress_level=9)),
+    ('png level 1, 1-bit masks', dict(format='png', compress_level=1, mask_mode='1')),
+    ('webp lossless', dict(format='webp')),
+    ('raw', dict(format='raw')),
+]
+
+def benchmark(export_dir="data/individual_sprites", limit=500, threads=4):
+    """Re-encode exported sprites with each configuration and compare size and time"""
+    sources = sorted(Path(export_dir).rglob("*_texture.png"))[:limit]
+    if not sources:
+        print(f"❌ No exported sprites found in {export_dir} - export some first")
+        return []
+
+    pairs = []
+    for texture_path in sources:
+        mask_path = texture_path.with_name(texture_path.name.replace("_texture", "_mask"))
+        texture = Image.open(texture_path)
+        texture.load()
+        mask = Image.open(mask_path) if mask_path.exists() else None
+        if mask is not None:
+            mask.load()
+        pairs.append((texture_path.stem.replace("_texture", ""), texture, mask))
+
+    print(f"🔄 Encoding {len(pairs)} sprites per configuration ({threads} threads)")
+    print(f"{'configuration':<28}{'size':>12}{'time':>10}{'per sprite':>14}")
+
+    results = []
+    for name, options in BENCHMARK_CONFIGS:
+        scratch = Path(tempfile.mkdtemp(prefix="encode_bench_"))
+        try:
+            start = time.perf_counter()
+            with SpriteEncoder(threads=threads, **options) as encoder:
+                for base, texture, mask in pairs:
+                    encoder.save(texture, scratch / f"{base}_texture{encoder.suffix}")
+                    if mask is not None:
+                        encoder.save_mask(mask, scratch / f"{base}_mask{encoder.suffix}")
+            elapsed = time.perf_counter() - start
+            size = sum(path.stat().st_size for path in scratch.iterdir())
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        results.append({'configuration': name, 'bytes': size, 'seconds': elapsed})
+        print(f"{name:<28}{size / 1024:>10.0f}KB{elapsed:>9.2f}s{elapsed / len(pairs) * 1000:>12.2f}ms")
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sprite encoder settings")
+    parser.add_argument("--benchmark", action="store_true", help="run the size vs. time benchmark")
+    parser.add_argument("--export-dir", default="data/individual_sprites", help="exported sprites to re-encode")
+    parser.add_argument("--limit", type=int, default=500, help="maximum sprites to encode")
+    parser.add_argument("--threads", type=int, default=4, help="encoder threads")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.export_dir, args.limit, args.threads)
+    else:
+        parser.print_help()
@@ -1,8 +1,148 @@
-from PIL import Image
+import hashlib
+import json
+import os
+import numpy as np
+from PIL import Image, ImageOps
 from pathlib import Path
+from src.export_manifest import manifest_record
+from src.sprite_encoder import SpriteEncoder, find_sprite_file, open_sprite_file, remove_sprite_files
 
-def export_sprite_sheet(sheet_name, texture_image, mask_image, sheet_data, grid_cols, grid_rows, output_dir="data/individual_sprites"):
-    """Export individual sprites from a complete sprite sheet"""
+MIRRORS_FILENAME = "mirrors.json"
+MIRROR_TOLERANCE = 4.0  # Mean per-channel difference allowed for labeled mirror_of cells
+
+# Common DOOM layouts, in order of preference
+COMMON_GRIDS = [(8, 6), (8, 5), (4, 11), (8, 8), (10, 6)]
+
+def detect_grid(width, height):
+    """Pick a common grid layout that gives reasonable sprite sizes"""
+    for cols, rows in COMMON_GRIDS:
+        sprite_w = width // cols
+        sprite_h = height // rows
+        
+        if 60 <= sprite_w <= 400 and 60 <= sprite_h <= 400:
+            return cols, rows
+    
+    return 8, 6  # Default
+
+def sheet_grid(sheet_data, image_size):
+    """Get the grid size stored for a sheet, falling back to auto-detection"""
+    grid = sheet_data.get('grid')
+    if grid:
+        return grid['cols'], grid['rows']
+    
+    cols, rows = detect_grid(*image_size)
+    
+    # Older label files have no stored grid - make sure every labeled cell fits
+    for sprite_data in sheet_data.get('sprites', {}).values():
+        cols = max(cols, sprite_data['col'] + 1)
+        rows = max(rows, sprite_data['row'] + 1)
+    
+    return cols, rows
+
+def sprite_filename_base(sprite_data):
+    """Build the export filename (without suffix) for a labeled sprite"""
+    row, col = sprite_data['row'], sprite_data['col']
+    
+    sprite_name = sprite_data.get('sprite_name', '').strip()
+    action = sprite_data.get('action', '').strip()
+    angle = sprite_data.get('angle', '').strip()
+    frame = sprite_data.get('frame', 1)
+    
+    # Build filename parts
+    filename_parts = []
+    
+    if sprite_name:
+        filename_parts.append(sprite_name.lower().replace(' ', '_'))
+    elif action:
+        filename_parts.append(action.lower())
+    else:
+        filename_parts.append(f"sprite_{row}_{col}")
+    
+    if action and action != sprite_name:
+        filename_parts.append(action.lower())
+    
+    if angle and angle not in ['static', 'omnidirectional']:
+        filename_parts.append(angle.lower())
+    
+    filename_parts.append(f"{frame:02d}")
+    
+    return "_".join(filename_parts)
+
+def pixel_hash(*images):
+    """Hash the pixel data of one or more images"""
+    digest = hashlib.sha1()
+    for image in images:
+        if image is not None:
+            digest.update(image.mode.encode("utf-8"))
+            digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def is_near_mirror(texture, mask, source_texture, source_mask):
+    """Check whether a sprite is (almost) the horizontal flip of another"""
+    for image, source in ((texture, source_texture), (mask, source_mask)):
+        if image is None:
+            continue
+        if source is None or image.size != source.size or image.mode != source.mode:
+            return False
+        difference = np.abs(np.asarray(image, dtype=np.int16) - np.asarray(ImageOps.mirror(source), dtype=np.int16))
+        if difference.mean() > MIRROR_TOLERANCE:
+            return False
+    return True
+
+def write_mirrors(output_path, mirrors):
+    """Write the mirror references for a sheet ({filename_base: source filename_base})"""
+    mirrors_path = output_path / MIRRORS_FILENAME
+    tmp_path = mirrors_path.with_name(mirrors_path.name + ".part")
+    with open(tmp_path, "w") as f:
+        json.dump({'flip': 'horizontal', 'sprites': mirrors}, f, indent=2)
+    os.replace(tmp_path, mirrors_path)
+
+def read_mirrors(output_path):
+    """Read a sheet's mirror references, or {} if it has none"""
+    mirrors_path = Path(output_path) / MIRRORS_FILENAME
+    if not mirrors_path.exists():
+        return {}
+    with open(mirrors_path, "r") as f:
+        return json.load(f).get('sprites', {})
+
+def load_exported_sprite(sheet_dir, filename_base):
+    """Load an exported sprite's (texture, mask), flipping its source if it was stored as a mirror reference"""
+    sheet_dir = Path(sheet_dir)
+    flip = False
+    
+    if find_sprite_file(sheet_dir, f"{filename_base}_texture") is None:
+        source = read_mirrors(sheet_dir).get(filename_base)
+        if source:
+            filename_base, flip = source, True
+    
+    texture_path = find_sprite_file(sheet_dir, f"{filename_base}_texture")
+    if texture_path is None:
+        raise FileNotFoundError(f"No exported texture for {filename_base} in {sheet_dir}")
+    texture = open_sprite_file(texture_path)
+    mask_path = find_sprite_file(sheet_dir, f"{filename_base}_mask")
+    mask = open_sprite_file(mask_path) if mask_path else None
+    
+    if flip:
+        texture = ImageOps.mirror(texture)
+        mask = ImageOps.mirror(mask) if mask is not None else None
+    return texture, mask
+
+def iter_export_sprite_sheet(sheet_name, texture_image, mask_image, sheet_data, grid_cols, grid_rows, output_dir="data/individual_sprites", cancel_event=None, mirror_refs=False, cell_keys=None, manifest=None, encoder=None):
+    """Export sprites one at a time, yielding (exported, total, filename_base) after each.
+    
+    Setting cancel_event stops the export between sprites, so every file on disk is complete.
+    With mirror_refs, a sprite that is the horizontal flip of one already written is recorded
+    in mirrors.json instead of being saved again (see load_exported_sprite).
+    cell_keys ("row,col" strings, e.g. from a LabelIndex query) limits the export to those cells;
+    filenames are still worked out over the whole sheet, and mirrors.json keeps the other
+    cells' references (sprites exported earlier can be mirror sources).
+    If manifest is a list, one export_manifest entry per sprite is appended to it.
+    encoder (a SpriteEncoder) sets the file format, mask mode and encode threads; the
+    default writes PNGs on the calling thread.
+    
+    Cells that would produce the same filename as an earlier cell get a _r<row>c<col>
+    suffix instead of overwriting it; their manifest entries record the collision.
+    """
     
     # Get sheet info
     sheet_info = sheet_data.get('sheet_info', {})
@@ -24,76 +164,153 @@ def export_sprite_sheet(sheet_name, texture_image, mask_image, sheet_data, grid_
         'original_size': f"{texture_image.width}x{texture_image.height}"
     }
     
-    with open(output_path / "sheet_info.json", "w") as f:
-        import json
+    metadata_path = output_path / "sheet_info.json"
+    tmp_path = metadata_path.with_name(metadata_path.name + ".part")
+    with open(tmp_path, "w") as f:
         json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, metadata_path)
     
     sprite_width = texture_image.width // grid_cols
     sprite_height = texture_image.height // grid_rows
     
+    # Skip empty sprites and export in grid order
+    all_cells = sorted(
+        (sprite_data for sprite_data in sheet_data.get('sprites', {}).values() if not sprite_data.get('empty', False)),
+        key=lambda sprite_data: (sprite_data['row'], sprite_data['col'])
+    )
+    selected = None if cell_keys is None else set(cell_keys)
+    cells = [sprite_data for sprite_data in all_cells
+             if selected is None or f"{sprite_data['row']},{sprite_data['col']}" in selected]
+    total = len(cells)
     exported_count = 0
-    sprite_labels = sheet_data.get('sprites', {})
-    
-    print(f"🔄 Exporting {display_name} ({category})...")
-    print(f"   Grid: {grid_cols}x{grid_rows}, Sprite size: {sprite_width}x{sprite_height}")
     
-    for cell_key, sprite_data in sprite_labels.items():
-        if sprite_data.get('empty', False):
-            continue  # Skip empty sprites
-            
+    # Filenames for every cell, worked out over the whole sheet so a filtered export names
+    # cells like a full one. Cells that reuse an earlier filename get a _r<row>c<col> suffix
+    used_filenames = {}  # filename -> "row,col" of the cell that used it
+    filenames = {}       # "row,col" -> (filename_base, collides_with)
+    for sprite_data in all_cells:
         row, col = sprite_data['row'], sprite_data['col']
+        filename_base = sprite_filename_base(sprite_data)
+        collides_with = used_filenames.get(filename_base)
+        if collides_with is not None:
+            filename_base = f"{filename_base}_r{row}c{col}"
+        used_filenames.setdefault(filename_base, f"{row},{col}")
+        filenames[f"{row},{col}"] = (filename_base, collides_with)
+    
+    def cut_cell(row, col):
+        """Crop a cell and scale it from 6x back to its original size"""
+        box = (col * sprite_width, row * sprite_height, (col + 1) * sprite_width, (row + 1) * sprite_height)
+        original_size = (max(32, sprite_width // 6), max(32, sprite_height // 6))
+        texture_small = texture_image.crop(box).resize(original_size, Image.NEAREST)
+        mask_small = mask_image.crop(box).resize(original_size, Image.NEAREST) if mask_image else None
+        return texture_small, mask_small
+    
+    # Written sprites by pixel hash and by cell, for mirror references
+    written_hashes = {}
+    written_cells = {}
+    mirrors = {}
+    
+    if mirror_refs and selected is not None:
+        # A filtered export only replaces its own cells' references
+        mirrors = read_mirrors(output_path)
+        for sprite_data in cells:
+            mirrors.pop(filenames[f"{sprite_data['row']},{sprite_data['col']}"][0], None)
         
-        # Extract sprite region
-        left = col * sprite_width
-        top = row * sprite_height
-        right = left + sprite_width
-        bottom = top + sprite_height
-        
-        texture_sprite = texture_image.crop((left, top, right, bottom))
-        
-        # Downscale from 6x to original size
-        original_width = max(32, sprite_width // 6)
-        original_height = max(32, sprite_height // 6)
-        
-        texture_small = texture_sprite.resize((original_width, original_height), Image.NEAREST)
-        
-        # Create filename based on sprite data
-        sprite_name = sprite_data.get('sprite_name', '').strip()
-        action = sprite_data.get('action', '').strip()
-        angle = sprite_data.get('angle', '').strip()
-        frame = sprite_data.get('frame', 1)
-        
-        # Build filename parts
-        filename_parts = []
-        
-        if sprite_name:
-            filename_parts.append(sprite_name.lower().replace(' ', '_'))
-        elif action:
-            filename_parts.append(action.lower())
-        else:
-            filename_parts.append(f"sprite_{row}_{col}")
-        
-        if action and action != sprite_name:
-            filename_parts.append(action.lower())
-        
-        if angle and angle not in ['static', 'omnidirectional']:
-            filename_parts.append(angle.lower())
-        
-        filename_parts.append(f"{frame:02d}")
-        
-        filename_base = "_".join(filename_parts)
-        
-        # Save files
-        texture_path = output_path / f"{filename_base}_texture.png"
-        texture_small.save(texture_path)
-        
-        if mask_image:
-            mask_sprite = mask_image.crop((left, top, right, bottom))
-            mask_small = mask_sprite.resize((original_width, original_height), Image.NEAREST)
-            mask_path = output_path / f"{filename_base}_mask.png"
-            mask_small.save(mask_path)
-        
-        exported_count += 1
+        # Sprites saved by earlier exports can be mirror sources too
+        for sprite_data in all_cells:
+            cell_key = f"{sprite_data['row']},{sprite_data['col']}"
+            filename_base = filenames[cell_key][0]
+            if cell_key in selected or filename_base in mirrors or find_sprite_file(output_path, f"{filename_base}_texture") is None:
+                continue
+            texture_small, mask_small = cut_cell(sprite_data['row'], sprite_data['col'])
+            written_hashes[pixel_hash(texture_small, mask_small)] = filename_base
+            written_cells[cell_key] = (filename_base, texture_small, mask_small)
+    
+    encoder = encoder or SpriteEncoder()
+    suffix = encoder.suffix
+    relative_dir = f"{category}/{sheet_name.lower()}"
+    
+    try:
+        for sprite_data in cells:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            
+            row, col = sprite_data['row'], sprite_data['col']
+            filename_base, collides_with = filenames[f"{row},{col}"]
+            texture_small, mask_small = cut_cell(row, col)
+            
+            if mirror_refs:
+                flipped_hash = pixel_hash(ImageOps.mirror(texture_small), ImageOps.mirror(mask_small) if mask_small else None)
+                source = written_hashes.get(flipped_hash)
+                
+                # Labeled mirrors (see mirror_match) may differ by a few upscaling artefacts
+                labeled_source = written_cells.get(sprite_data.get('mirror_of'))
+                if source is None and labeled_source and is_near_mirror(texture_small, mask_small, *labeled_source[1:]):
+                    source = labeled_source[0]
+                
+                if source is not None and source != filename_base:
+                    mirrors[filename_base] = source
+                    # Files from an export without mirror references would be read instead of the flip
+                    for kind in ("texture", "mask"):
+                        remove_sprite_files(output_path, f"{filename_base}_{kind}")
+                    if manifest is not None:
+                        manifest.append(manifest_record(
+                            sheet_name, category, sprite_data, filename_base,
+                            f"{relative_dir}/{source}_texture{suffix}",
+                            f"{relative_dir}/{source}_mask{suffix}" if mask_small is not None else None,
+                            texture_small.size, pixel_hash(texture_small, mask_small),
+                            mirror_of=source, collides_with=collides_with
+                        ))
+                    exported_count += 1
+                    yield exported_count, total, filename_base
+                    continue
+                
+                written_hashes[pixel_hash(texture_small, mask_small)] = filename_base
+                written_cells[f"{row},{col}"] = (filename_base, texture_small, mask_small)
+            
+            # Save files (queued on the encoder's threads if it has any)
+            encoder.save(texture_small, output_path / f"{filename_base}_texture{suffix}")
+            
+            if mask_small is not None:
+                encoder.save_mask(mask_small, output_path / f"{filename_base}_mask{suffix}")
+            
+            if manifest is not None:
+                manifest.append(manifest_record(
+                    sheet_name, category, sprite_data, filename_base,
+                    f"{relative_dir}/{filename_base}_texture{suffix}",
+                    f"{relative_dir}/{filename_base}_mask{suffix}" if mask_small is not None else None,
+                    texture_small.size, pixel_hash(texture_small, mask_small),
+                    collides_with=collides_with
+                ))
+            
+            exported_count += 1
+            yield exported_count, total, filename_base
+    finally:
+        # Queued encodes must be on disk before the sheet counts as exported
+        encoder.wait()
+    
+    if mirror_refs:
+        write_mirrors(output_path, mirrors)
+
+def export_sprite_sheet(sheet_name, texture_image, mask_image, sheet_data, grid_cols, grid_rows, output_dir="data/individual_sprites", verbose=True, progress_callback=None, cancel_event=None, mirror_refs=False, cell_keys=None, manifest=None, encoder=None):
+    """Export individual sprites from a complete sprite sheet (or only cell_keys)"""
+    
+    sheet_info = sheet_data.get('sheet_info', {})
+    category = sheet_info.get('category', 'other')
+    display_name = sheet_info.get('display_name', sheet_name)
+    
+    if verbose:
+        print(f"🔄 Exporting {display_name} ({category})...")
+        print(f"   Grid: {grid_cols}x{grid_rows}, Sprite size: {texture_image.width // grid_cols}x{texture_image.height // grid_rows}")
+    
+    exported_count = 0
+    for exported_count, total, filename_base in iter_export_sprite_sheet(
+        sheet_name, texture_image, mask_image, sheet_data, grid_cols, grid_rows,
+        output_dir=output_dir, cancel_event=cancel_event, mirror_refs=mirror_refs, cell_keys=cell_keys, manifest=manifest, encoder=encoder
+    ):
+        if progress_callback:
+            progress_callback(exported_count, total, filename_base)
     
-    print(f"✅ Exported {exported_count} sprites to {output_path}")
-    return exported_count
\ No newline at end of file
+    if verbose:
+        print(f"✅ Exported {exported_count} sprites to {Path(output_dir) / category / sheet_name.lower()}")
+    return exported_count
@@ -0,0 +1,196 @@
+# Nearest-neighbour index of labeled sprites
+# Every labeled cell is encoded as a small mask+texture signature. The signatures are
+# stored in sprite_index.npz next to sprite_labels.json, so the labeler can suggest
+# labels for a new cell from visually similar cells on other sheets.
+#
+# Usage (from the project root):
+#   python -m src.sprite_index            # (re)build the index for all labeled sheets
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from src.viewport import sample_image
+
+INDEX_PATH = "sprite_index.npz"
+SIGNATURE_SIZE = 8      # Each cell becomes an 8x8 grid of averaged pixels
+SAMPLES_PER_BLOCK = 4   # Pixels sampled per block edge before averaging
+LABEL_FIELDS = ('sprite_name', 'action', 'angle', 'frame')
+
+def cell_block_means(image, grid_cols, grid_rows, size=SIGNATURE_SIZE, channels=3):
+    """Average every cell of a sheet down to a size x size block grid, all cells at once.
+
+    Returns a (grid_rows, grid_cols, size, size, channels) float32 array in 0-1.
+    Only a fixed number of pixels per cell is sampled, so the cost doesn't grow with the sheet's resolution.
+    """
+    sprite_width = image.width // grid_cols
+    sprite_height = image.height // grid_rows
+    steps = size * SAMPLES_PER_BLOCK
+
+    # Sample positions for every cell, laid out cell after cell along each axis (symmetric about each cell's centre)
+    offsets = (np.arange(steps) + 0.5) / steps
+    xs = (np.arange(grid_cols)[:, None] * sprite_width + offsets[None, :] * sprite_width).astype(np.intp).ravel()
+    ys = (np.arange(grid_rows)[:, None] * sprite_height + offsets[None, :] * sprite_height).astype(np.intp).ravel()
+
+    pixels = np.asarray(sample_image(image, xs, ys), dtype=np.float32) / 255.0
+    if pixels.ndim == 2:
+        pixels = pixels[..., None]
+    pixels = pixels[..., :channels] if pixels.shape[-1] >= channels else np.repeat(pixels[..., :1], channels, axis=-1)
+    blocks = pixels.reshape(grid_rows, size, SAMPLES_PER_BLOCK, grid_cols, size, SAMPLES_PER_BLOCK, channels)
+    return blocks.mean(axis=(2, 5)).transpose(0, 2, 1, 3, 4)
+
+def cell_coverage(texture, mask, grid_cols, grid_rows, size=SIGNATURE_SIZE):
+    """Block-averaged sprite coverage per cell, from the mask or the texture's alpha"""
+    if mask is not None:
+        return cell_block_means(mask, grid_cols, grid_rows, size, 1)
+    if 'A' in texture.getbands():
+        return cell_block_means(texture, grid_cols, grid_rows, size, 4)[..., 3:]
+    return np.ones((grid_rows, grid_cols, size, size, 1), dtype=np.float32)
+
+def sheet_signatures(texture, mask, grid_cols, grid_rows, size=SIGNATURE_SIZE):
+    """Compute a signature for every cell of a sheet at once.
+
+    Returns a (grid_rows, grid_cols, D) float32 array of L2-normalised vectors.
+    """
+    colour = cell_block_means(texture, grid_cols, grid_rows, size, 3)
+    coverage = cell_coverage(texture, mask, grid_cols, grid_rows, size)
+
+    # Colour only counts where the sprite is, so backgrounds don't dominate the match
+    vectors = np.concatenate([(colour * coverage).reshape(grid_rows, grid_cols, -1),
+                              coverage.reshape(grid_rows, grid_cols, -1)], axis=-1)
+    vectors -= vectors.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-6)).astype(np.float32)
+
+def labeled_entries(sheet_name, sheet_data, signatures):
+    """Pair each labeled, non-empty cell with its signature"""
+    entries = []
+    vectors = []
+    grid_rows, grid_cols = signatures.shape[:2]
+
+    for sprite_data in sheet_data.get('sprites', {}).values():
+        row, col = sprite_data['row'], sprite_data['col']
+        if sprite_data.get('empty', False) or row >= grid_rows or col >= grid_cols:
+            continue
+        if not (sprite_data.get('sprite_name') or sprite_data.get('action') or sprite_data.get('angle')):
+            continue
+
+        entry = {'sheet': sheet_name, 'row': row, 'col': col}
+        entry.update({field: sprite_data.get(field, '') for field in LABEL_FIELDS})
+        entries.append(entry)
+        vectors.append(signatures[row, col])
+
+    return entries, vectors
+
+class SpriteIndex:
+    """Labeled cell signatures with brute-force cosine search (fast for thousands of cells)"""
+
+    def __init__(self, dim=SIGNATURE_SIZE * SIGNATURE_SIZE * 4):
+        self.dim = dim
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.entries = []
+        self.positions = {}  # (sheet, row, col) -> row in vectors/entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update_sheet(self, sheet_name, sheet_data, signatures):
+        """Replace one sheet's entries with its current labels"""
+        keep = [i for i, entry in enumerate(self.entries) if entry['sheet'] != sheet_name]
+        entries, vectors = labeled_entries(sheet_name, sheet_data, signatures)
+
+        self.entries = [self.entries[i] for i in keep] + entries
+        new_vectors = np.array(vectors, dtype=np.float32).reshape(-1, self.dim)
+        self.vectors = np.concatenate([self.vectors[keep], new_vectors])
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild the cell -> position lookup after entries change"""
+        self.positions = {(entry['sheet'], entry['row'], entry['col']): i for i, entry in enumerate(self.entries)}
+
+    def query(self, vector, k=5, exclude=None):
+        """Get the k most similar labeled cells as (score, entry) pairs"""
+        if not self.entries:
+            return []
+
+        scores = self.vectors @ vector
+        excluded = self.positions.get(tuple(exclude)) if exclude is not None else None
+        if excluded is not None:
+            scores[excluded] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.entries[i]) for i in top if np.isfinite(scores[i])]
+
+    def save(self, path=INDEX_PATH):
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp_path, vectors=self.vectors, entries=np.array(json.dumps(self.entries)))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Load a saved index, or return an empty one"""
+        index = cls()
+        if Path(path).exists():
+            with np.load(path) as data:
+                if data['vectors'].shape[1] == index.dim:
+                    index.vectors = data['vectors'].astype(np.float32)
+                    index.entries = json.loads(str(data['entries']))
+                    index.reindex()
+        return index
+
+def sheet_signature_job(sheet_name, sheet_data, sprites_dir):
+    """Compute signatures for one sheet (runs in a worker process)"""
+    from src.sheet_cache import open_cached_sheet
+    from src.sprite_exporter import sheet_grid
+
+    texture_path = Path(sprites_dir) / f"{sheet_name}_6xGigaPixel.png"
+    mask_path = Path(sprites_dir) / f"{sheet_name}A_6xGigaPixel.png"
+
+    texture = open_cached_sheet(texture_path)
+    mask = open_cached_sheet(mask_path) if mask_path.exists() else None
+    grid_cols, grid_rows = sheet_grid(sheet_data, texture.size)
+    return sheet_signatures(texture, mask, grid_cols, grid_rows)
+
+def build_index(labels_path="sprite_labels.json", sprites_dir="sprites", index_path=INDEX_PATH, workers=None):
+    """Rebuild the index for every labeled sheet in parallel"""
+    with open(labels_path, "r") as f:
+        sprites_data = json.load(f)
+
+    index = SpriteIndex()
+    sheets = {
+        name: data for name, data in sprites_data.items()
+        if data.get('sprites') and (Path(sprites_dir) / f"{name}_6xGigaPixel.png").exists()
+    }
+    print(f"🔄 Indexing {len(sheets)} labeled sheets...")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(sheet_signature_job, name, data, sprites_dir): name
+            for name, data in sheets.items()
+        }
+        for future in as_completed(futures):
+            sheet_name = futures[future]
+            try:
+                index.update_sheet(sheet_name, sheets[sheet_name], future.result())
+            except Exception as e:
+                print(f"❌ {sheet_name}: {e}")
+
+    index.save(index_path)
+    print(f"✅ Indexed {len(index)} labeled cells to {index_path}")
+    return index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the labeled sprite similarity index")
+    parser.add_argument("--labels", default="sprite_labels.json", help="label file written by the labeler")
+    parser.add_argument("--sprites-dir", default="sprites", help="folder with the 6xGigaPixel sheets")
+    parser.add_argument("--index", default=INDEX_PATH, help="where to write the index")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    args = parser.parse_args()
+
+    build_index(args.labels, args.sprites_dir, args.index, args.workers)
@@ -1,11 +1,49 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk, ImageDraw
+from tkinter import ttk, filedialog, messagebox, simpledialog
+from PIL import ImageTk, ImageDraw
+import copy
 import json
+import os
+import queue
+import threading
+import time
 from pathlib import Path
 import numpy as np
+from src.autosave import AutoSaver
+from src.label_db import DB_PATH, DatabaseSaver, LabelDatabase
+from src.label_store import LabelStore, blank_cell
+from src.label_index import LabelIndex, group_by_sheet, parse_query
+from src.label_validator import ACTIONS, ANGLES, CATEGORIES, format_issue, issues_by_sheet, validate_labels
+from src.sheet_cache import open_cached_sheet, open_compact_sheet
+from src.viewport import Viewport
+from src.cell_cache import CellCropCache
+from src.label_prediction import LabelPredictor
+from src.sprite_index import SpriteIndex, sheet_signatures
+from src.mirror_match import MIRROR_ANGLES, find_mirror_pairs, propose_mirror_labels
+
+MB = 1024 * 1024
+
+def process_memory():
+    """Resident memory of this process in bytes (peak instead of current off Linux), or None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
 
 class SpriteLabelingApp:
+    PREVIEW_SIZE = 240
+    THUMB_SIZE = 44
+    NAVIGATION_KEYS = {"Return", "KP_Enter", "Escape", "Up", "Down", "Left", "Right", "Tab",
+                       "Shift_L", "Shift_R", "Control_L", "Control_R"}
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("DOOM Sprite Labeler - Universal")
@@ -16,21 +54,84 @@ class SpriteLabelingApp:
         self.texture_image = None
         self.mask_image = None
         self.sprite_grid = {}
-        self.sprites_data = {}
+        self.label_store = LabelStore()
+        self.label_index = LabelIndex(self.label_store)  # Kept up to date on every edit
+        self.search_results = []    # Matching (sheet_name, cell_key) in sheet/grid order
+        self.search_matches = set()
+        self.search_position = -1
+        self.search_refresh_pending = False
         
         # Grid settings
         self.grid_cols = 8
         self.grid_rows = 6
         self.selected_cell = None
+        self.selection_anchor = None  # Shift+click extends a rectangle from here
+        
+        # Zoom/pan state shared by the texture and mask canvases
+        self.viewport = Viewport()
+        self.redraw_pending = False
+        self.pan_last = None
+        
+        # Label prediction, refitted only when the sheet changes
+        self.predictor_key = None
+        self.predictor = None
+        
+        # Recently viewed cell crops for the preview pane
+        self.crop_cache = CellCropCache(max_entries=256)
+        
+        # Similar labeled cells across sheets (signatures are computed per sheet and grid)
+        self.sprite_index = SpriteIndex.load()
+        self.index_key = None
+        self.index_changed = False
+        self.signature_key = None
+        self.signatures = None
+        self.suggestions = []
+        self.progress_cache = {}
+        
+        # Background export state
+        self.export_thread = None
+        self.export_queue = queue.Queue()
+        self.export_cancel = threading.Event()
         
         # Extended categories for all sprite types
-        self.sprite_types = ["creature", "weapon", "item", "effect", "interface", "environment", "projectile", "menu", "other"]
-        self.actions = ["idle", "walk", "attack", "pain", "death", "special", "fire", "reload", "pickup", "explode", "activate", "static", "unused"]
-        self.angles = ["front", "angle315", "right", "angle225", "back", "angle135", "left", "angle45", "omnidirectional", "static"]
+        self.sprite_types = list(CATEGORIES)
+        self.actions = list(ACTIONS)
+        self.angles = list(ANGLES)
+        
+        # Label check window (built on first use)
+        self.issues_window = None
+        self.issue_rows = []
         
         self.setup_ui()
+        
+        # Search results follow label edits (registered after the index, which updates first)
+        self.label_store.listeners.append(self.on_labels_edited)
+        
+        # Labels are saved in the background shortly after each edit - to sprite_labels.db
+        # (per-cell upserts, safe for several labelers) if it exists, else sprite_labels.json
+        self.label_db = LabelDatabase(DB_PATH) if Path(DB_PATH).exists() else None
+        if self.label_db:
+            self.autosaver = DatabaseSaver(self.label_store, self.root, self.label_db, on_status=self.on_autosave_status)
+        else:
+            self.autosaver = AutoSaver(self.label_store, self.root, "sprite_labels.json", on_status=self.on_autosave_status)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.bind_shortcuts()
+        try:
+            self.load_labels()
+        except Exception as e:
+            # Start with no labels, and keep autosaves away from the unreadable file so it can be repaired
+            save_path = DB_PATH if self.label_db else "sprite_labels.recovered.json"
+            if not self.label_db:
+                self.autosaver.path = Path(save_path)
+            messagebox.showerror("Error", f"Could not load saved labels: {str(e)}\n\nStarting with empty labels; edits are saved to {save_path}")
+        
         self.load_sprite_sheet_list()
     
+    @property
+    def sprites_data(self):
+        """Label data for all sheets (owned by the label store)"""
+        return self.label_store.data
+    
     def setup_ui(self):
         """Create the user interface"""
         # Main frame
@@ -53,6 +154,10 @@ class SpriteLabelingApp:
         self.sheet_info = ttk.Label(left_panel, text="No sheet selected", foreground="gray")
         self.sheet_info.pack(anchor="w", pady=(0, 5))
         
+        # Memory held by the open sheet and its views
+        self.memory_label = ttk.Label(left_panel, text="", foreground="gray", font=("Arial", 8))
+        self.memory_label.pack(anchor="w", pady=(0, 5))
+        
         # Progress display
         progress_frame = ttk.Frame(left_panel)
         progress_frame.pack(fill=tk.X, pady=(0, 10))
@@ -141,6 +246,9 @@ class SpriteLabelingApp:
         self.selected_info = ttk.Label(sprite_frame, text="Click a sprite to select")
         self.selected_info.pack(anchor="w")
         
+        self.prediction_label = ttk.Label(sprite_frame, text="", foreground="gray", font=("Arial", 8))
+        self.prediction_label.pack(anchor="w")
+        
         # Sprite naming
         ttk.Label(sprite_frame, text="Sprite Name:").pack(anchor="w", pady=(10, 0))
         self.sprite_name_var = tk.StringVar()
@@ -186,20 +294,97 @@ class SpriteLabelingApp:
         ttk.Button(batch_frame, text="Mark Row as Empty", command=self.mark_row_empty).pack(fill=tk.X, pady=2)
         ttk.Button(batch_frame, text="Mark Column as Empty", command=self.mark_col_empty).pack(fill=tk.X, pady=2)
         ttk.Button(batch_frame, text="Auto-number Frames", command=self.auto_number_frames).pack(fill=tk.X, pady=2)
+        ttk.Button(batch_frame, text="Fill Selection (Shift+click)", command=self.fill_selection).pack(fill=tk.X, pady=2)
+        
+        batch_row = ttk.Frame(batch_frame)
+        batch_row.pack(fill=tk.X)
+        ttk.Button(batch_row, text="Copy Row To...", command=self.copy_row_to).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 2), pady=2)
+        ttk.Button(batch_row, text="Set Column Angle", command=self.set_column_angle).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(2, 0), pady=2)
+        ttk.Button(batch_frame, text="Find Mirrored Angles", command=self.find_mirrors).pack(fill=tk.X, pady=2)
+        ttk.Button(batch_frame, text="Check Labels", command=self.check_labels).pack(fill=tk.X, pady=2)
         
         # Export buttons
         export_frame = ttk.Frame(left_panel)
         export_frame.pack(fill=tk.X, pady=(20, 0))
         
-        ttk.Button(export_frame, text="Export Current Sheet", command=self.export_current_sheet).pack(fill=tk.X, pady=2)
-        ttk.Button(export_frame, text="Export All Sheets", command=self.export_all_sheets).pack(fill=tk.X, pady=2)
+        self.export_current_button = ttk.Button(export_frame, text="Export Current Sheet", command=self.export_current_sheet)
+        self.export_current_button.pack(fill=tk.X, pady=2)
+        self.export_all_button = ttk.Button(export_frame, text="Export All Sheets", command=self.export_all_sheets)
+        self.export_all_button.pack(fill=tk.X, pady=2)
+        
+        # Export progress (filled from the export worker thread)
+        self.export_progress_bar = ttk.Progressbar(export_frame, length=300, mode='determinate')
+        self.export_progress_bar.pack(fill=tk.X, pady=(2, 0))
+        self.export_status_label = ttk.Label(export_frame, text="", foreground="gray", font=("Arial", 8))
+        self.export_status_label.pack(anchor="w")
+        self.cancel_export_button = ttk.Button(export_frame, text="Cancel Export", command=self.cancel_export, state="disabled")
+        self.cancel_export_button.pack(fill=tk.X, pady=2)
+        
         ttk.Button(export_frame, text="Save Progress", command=self.save_progress).pack(fill=tk.X, pady=2)
         ttk.Button(export_frame, text="Load Progress", command=self.load_progress).pack(fill=tk.X, pady=2)
         
+        self.save_status_label = ttk.Label(export_frame, text="Autosave on", foreground="gray", font=("Arial", 8))
+        self.save_status_label.pack(anchor="w")
+        
         # Right panel - Image display
         right_panel = ttk.Frame(main_frame)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
         
+        # Selected cell preview (right-hand strip)
+        preview_frame = ttk.LabelFrame(right_panel, text="Cell Preview", padding=5)
+        preview_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0))
+        
+        self.preview_info = ttk.Label(preview_frame, text="No cell selected", foreground="gray")
+        self.preview_info.pack(anchor="w")
+        
+        ttk.Label(preview_frame, text="Texture:").pack(anchor="w", pady=(5, 0))
+        self.preview_texture_canvas = tk.Canvas(preview_frame, width=self.PREVIEW_SIZE, height=self.PREVIEW_SIZE, bg="gray20")
+        self.preview_texture_canvas.pack()
+        
+        ttk.Label(preview_frame, text="Mask:").pack(anchor="w", pady=(5, 0))
+        self.preview_mask_canvas = tk.Canvas(preview_frame, width=self.PREVIEW_SIZE, height=self.PREVIEW_SIZE, bg="gray20")
+        self.preview_mask_canvas.pack()
+        
+        # Frames above and below the selected cell for animation context
+        ttk.Label(preview_frame, text="Neighbouring frames:").pack(anchor="w", pady=(5, 0))
+        self.preview_neighbours_canvas = tk.Canvas(
+            preview_frame, width=self.PREVIEW_SIZE, height=self.THUMB_SIZE + 16, bg="gray20"
+        )
+        self.preview_neighbours_canvas.pack()
+        
+        # Nearest labeled cells from all sheets; double-click to apply
+        ttk.Label(preview_frame, text="Similar labeled sprites:").pack(anchor="w", pady=(5, 0))
+        self.suggestion_list = tk.Listbox(preview_frame, height=6, width=34, font=("Arial", 8))
+        self.suggestion_list.pack(fill=tk.X)
+        self.suggestion_list.bind("<Double-Button-1>", self.apply_suggestion)
+        self.suggestion_info = ttk.Label(preview_frame, text="", foreground="gray", font=("Arial", 8))
+        self.suggestion_info.pack(anchor="w")
+        
+        # Label search, e.g. "action:walk angle:angle315 category:creature important"
+        search_bar = ttk.Frame(right_panel)
+        search_bar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(search_bar, text="Search:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_bar, textvariable=self.search_var, width=40)
+        search_entry.pack(side=tk.LEFT, padx=(5, 5))
+        search_entry.bind("<KeyRelease>", self.on_search_changed)
+        search_entry.bind("<Return>", lambda event: self.show_search_result(1))
+        ttk.Button(search_bar, text="◀", command=lambda: self.show_search_result(-1), width=3).pack(side=tk.LEFT, padx=2)
+        ttk.Button(search_bar, text="▶", command=lambda: self.show_search_result(1), width=3).pack(side=tk.LEFT, padx=2)
+        ttk.Button(search_bar, text="Export Matches", command=self.export_search_matches).pack(side=tk.LEFT, padx=(5, 0))
+        self.search_info = ttk.Label(search_bar, text="", foreground="gray")
+        self.search_info.pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Zoom controls (mouse wheel zooms, middle/right drag pans)
+        zoom_bar = ttk.Frame(right_panel)
+        zoom_bar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(zoom_bar, text="Fit", command=self.zoom_fit, width=6).pack(side=tk.LEFT, padx=2)
+        ttk.Button(zoom_bar, text="1:1", command=self.zoom_actual_size, width=6).pack(side=tk.LEFT, padx=2)
+        ttk.Button(zoom_bar, text="+", command=lambda: self.zoom_view(1.25), width=3).pack(side=tk.LEFT, padx=2)
+        ttk.Button(zoom_bar, text="-", command=lambda: self.zoom_view(0.8), width=3).pack(side=tk.LEFT, padx=2)
+        self.zoom_label = ttk.Label(zoom_bar, text="Zoom: 100%", foreground="gray")
+        self.zoom_label.pack(side=tk.LEFT, padx=(10, 0))
+        
         # Image tabs
         self.notebook = ttk.Notebook(right_panel)
         self.notebook.pack(fill=tk.BOTH, expand=True)
@@ -211,6 +396,7 @@ class SpriteLabelingApp:
         self.texture_canvas = tk.Canvas(self.texture_frame, bg="gray")
         self.texture_canvas.pack(fill=tk.BOTH, expand=True)
         self.texture_canvas.bind("<Button-1>", self.on_canvas_click)
+        self.texture_canvas.bind("<Shift-Button-1>", self.on_canvas_shift_click)
         
         # Mask tab (only shown if mask exists)
         self.mask_frame = ttk.Frame(self.notebook)
@@ -218,6 +404,16 @@ class SpriteLabelingApp:
         self.mask_canvas = tk.Canvas(self.mask_frame, bg="gray")
         self.mask_canvas.pack(fill=tk.BOTH, expand=True)
         self.mask_canvas.bind("<Button-1>", self.on_canvas_click)
+        self.mask_canvas.bind("<Shift-Button-1>", self.on_canvas_shift_click)
+        
+        for canvas in (self.texture_canvas, self.mask_canvas):
+            canvas.bind("<MouseWheel>", self.on_mouse_wheel)   # Windows/macOS
+            canvas.bind("<Button-4>", self.on_mouse_wheel)     # Linux scroll up
+            canvas.bind("<Button-5>", self.on_mouse_wheel)     # Linux scroll down
+            for button in (2, 3):
+                canvas.bind(f"<ButtonPress-{button}>", self.on_pan_start)
+                canvas.bind(f"<B{button}-Motion>", self.on_pan_drag)
+            canvas.bind("<Configure>", self.on_canvas_resize)
     
     def load_sprite_sheet_list(self):
         """Load list of all available 6xGigaPixel sprite sheets"""
@@ -256,6 +452,35 @@ class SpriteLabelingApp:
         else:
             print("❌ No 6xGigaPixel texture files found!")
     
+    def count_sheet_progress(self, sheet_name, grid_cols, grid_rows):
+        """Count labeled and empty cells on a sheet (cached until the sheet changes)"""
+        cache_key = (self.label_store.revisions.get(sheet_name, 0), grid_cols, grid_rows)
+        cached = self.progress_cache.get(sheet_name)
+        if cached and cached[0] == cache_key:
+            return cached[1]
+        
+        sprites_data = self.sprites_data.get(sheet_name, {}).get('sprites', {})
+        
+        labeled_count = 0
+        empty_count = 0
+        
+        for row in range(grid_rows):
+            for col in range(grid_cols):
+                cell_key = f"{row},{col}"
+                if cell_key in sprites_data:
+                    sprite_data = sprites_data[cell_key]
+                    if sprite_data.get('empty', False):
+                        empty_count += 1
+                    else:
+                        # Check if sprite has meaningful data
+                        if (sprite_data.get('sprite_name') or 
+                            sprite_data.get('action') or 
+                            sprite_data.get('angle')):
+                            labeled_count += 1
+        
+        self.progress_cache[sheet_name] = (cache_key, (labeled_count, empty_count))
+        return labeled_count, empty_count
+
     def calculate_total_progress(self):
         """Calculate progress across all available sprite sheets"""
         total_sheets = len(self.sheet_combo['values'])
@@ -282,30 +507,16 @@ class SpriteLabelingApp:
             if not sheet_name:
                 continue
             
-            # Calculate grid size for this sheet (use current or default)
-            grid_cols = self.grid_cols if sheet_name == self.current_sprite_sheet else 8
-            grid_rows = self.grid_rows if sheet_name == self.current_sprite_sheet else 6
+            # Calculate grid size for this sheet (use current, stored or default)
+            if sheet_name == self.current_sprite_sheet:
+                grid_cols, grid_rows = self.grid_cols, self.grid_rows
+            else:
+                grid = self.sprites_data.get(sheet_name, {}).get('grid', {})
+                grid_cols, grid_rows = grid.get('cols', 8), grid.get('rows', 6)
             total_cells = grid_cols * grid_rows
             total_sprites_available += total_cells
             
-            sprites_data = self.sprites_data.get(sheet_name, {}).get('sprites', {})
-            
-            labeled_count = 0
-            empty_count = 0
-            
-            for row in range(grid_rows):
-                for col in range(grid_cols):
-                    cell_key = f"{row},{col}"
-                    if cell_key in sprites_data:
-                        sprite_data = sprites_data[cell_key]
-                        if sprite_data.get('empty', False):
-                            empty_count += 1
-                        else:
-                            # Check if sprite has meaningful data
-                            if (sprite_data.get('sprite_name') or 
-                                sprite_data.get('action') or 
-                                sprite_data.get('angle')):
-                                labeled_count += 1
+            labeled_count, empty_count = self.count_sheet_progress(sheet_name, grid_cols, grid_rows)
             
             processed_count = labeled_count + empty_count
             total_sprites_processed += processed_count
@@ -339,24 +550,7 @@ class SpriteLabelingApp:
             self.stats_label.config(text="No sheet selected")
         else:
             total_cells = self.grid_cols * self.grid_rows
-            sprites_data = self.sprites_data.get(self.current_sprite_sheet, {}).get('sprites', {})
-            
-            labeled_count = 0
-            empty_count = 0
-            
-            for row in range(self.grid_rows):
-                for col in range(self.grid_cols):
-                    cell_key = f"{row},{col}"
-                    if cell_key in sprites_data:
-                        sprite_data = sprites_data[cell_key]
-                        if sprite_data.get('empty', False):
-                            empty_count += 1
-                        else:
-                            # Check if sprite has meaningful data
-                            if (sprite_data.get('sprite_name') or 
-                                sprite_data.get('action') or 
-                                sprite_data.get('angle')):
-                                labeled_count += 1
+            labeled_count, empty_count = self.count_sheet_progress(self.current_sprite_sheet, self.grid_cols, self.grid_rows)
             
             processed_count = labeled_count + empty_count
             remaining_count = total_cells - processed_count
@@ -427,12 +621,16 @@ class SpriteLabelingApp:
             texture_path = Path("sprites") / f"{sheet_name}_6xGigaPixel.png"
             mask_path = Path("sprites") / f"{sheet_name}A_6xGigaPixel.png"
             
-            self.texture_image = Image.open(texture_path)
+            # Decoded once into .sheet_cache/ in the most compact lossless layout (L masks,
+            # palette-indexed textures where the colours fit), then memory-mapped on later opens
+            self.release_sheet()
+            self.texture_image = open_compact_sheet(texture_path)
             self.current_sprite_sheet = sheet_name
+            self.viewport.fit_mode = True
             
             # Load mask if exists
             if mask_path.exists():
-                self.mask_image = Image.open(mask_path)
+                self.mask_image = open_compact_sheet(mask_path, mask=True)
                 # Show mask tab
                 if not any(self.notebook.tab(i, "text") == "Mask" for i in range(self.notebook.index("end"))):
                     self.notebook.add(self.mask_frame, text="Mask")
@@ -445,7 +643,7 @@ class SpriteLabelingApp:
                         break
             
             # Update info display
-            img_info = f"Size: {self.texture_image.size[0]}x{self.texture_image.size[1]}"
+            img_info = f"Size: {self.texture_image.size[0]}x{self.texture_image.size[1]} ({self.texture_image.storage_mode})"
             if self.mask_image:
                 img_info += f" | Mask: ✅"
             else:
@@ -469,8 +667,12 @@ class SpriteLabelingApp:
             self.sheet_type_var.set(sheet_info.get('category', 'other'))
             self.description_var.set(sheet_info.get('description', ''))
             
-            # Auto-detect reasonable grid size
-            self.auto_detect_grid()
+            # Restore the sheet's grid, or auto-detect a reasonable one
+            grid = self.sprites_data[sheet_name].get('grid')
+            if grid:
+                self.set_grid(grid['cols'], grid['rows'])
+            else:
+                self.auto_detect_grid()
             
             # Display images
             self.display_images()
@@ -492,15 +694,26 @@ class SpriteLabelingApp:
         if not self.current_sprite_sheet:
             return
         
-        if self.current_sprite_sheet not in self.sprites_data:
-            self.sprites_data[self.current_sprite_sheet] = {'sheet_info': {}, 'sprites': {}}
-        
-        self.sprites_data[self.current_sprite_sheet]['sheet_info'] = {
+        self.label_store.set_sheet_info(self.current_sprite_sheet, {
             'display_name': self.display_name_var.get(),
             'category': self.sheet_type_var.get(),
             'description': self.description_var.get()
-        }
+        })
     
+    def selection_rect(self):
+        """Get the selected rectangle as (top, left, bottom, right), inclusive"""
+        if not self.selected_cell:
+            return None
+        
+        anchor = self.selection_anchor or self.selected_cell
+        (row_a, col_a), (row_b, col_b) = anchor, self.selected_cell
+        return min(row_a, row_b), min(col_a, col_b), max(row_a, row_b), max(col_a, col_b)
+
+    def refresh_after_batch(self):
+        """Redraw once and update progress once after a batch of edits"""
+        self.display_images()
+        self.update_progress_display()
+
     def mark_row_empty(self):
         """Mark entire row as empty"""
         if not self.selected_cell:
@@ -508,23 +721,11 @@ class SpriteLabelingApp:
             return
         
         row, _ = self.selected_cell
-        for col in range(self.grid_cols):
-            cell_key = f"{row},{col}"
-            if self.current_sprite_sheet not in self.sprites_data:
-                self.sprites_data[self.current_sprite_sheet] = {'sheet_info': {}, 'sprites': {}}
-            self.sprites_data[self.current_sprite_sheet]['sprites'][cell_key] = {
-                'sprite_name': '',
-                'action': '',
-                'angle': '',
-                'frame': 1,
-                'empty': True,
-                'important': False,
-                'row': row,
-                'col': col
-            }
+        with self.label_store.transaction(self.current_sprite_sheet) as tx:
+            for col in range(self.grid_cols):
+                tx.set_cell(row, col, blank_cell(row, col, empty=True))
         
-        self.display_images()
-        self.update_progress_display()  # Add progress update
+        self.refresh_after_batch()
         messagebox.showinfo("Info", f"Marked row {row} as empty")
     
     def mark_col_empty(self):
@@ -534,23 +735,11 @@ class SpriteLabelingApp:
             return
         
         _, col = self.selected_cell
-        for row in range(self.grid_rows):
-            cell_key = f"{row},{col}"
-            if self.current_sprite_sheet not in self.sprites_data:
-                self.sprites_data[self.current_sprite_sheet] = {'sheet_info': {}, 'sprites': {}}
-            self.sprites_data[self.current_sprite_sheet]['sprites'][cell_key] = {
-                'sprite_name': '',
-                'action': '',
-                'angle': '',
-                'frame': 1,
-                'empty': True,
-                'important': False,
-                'row': row,
-                'col': col
-            }
+        with self.label_store.transaction(self.current_sprite_sheet) as tx:
+            for row in range(self.grid_rows):
+                tx.set_cell(row, col, blank_cell(row, col, empty=True))
         
-        self.display_images()
-        self.update_progress_display()  # Add progress update
+        self.refresh_after_batch()
         messagebox.showinfo("Info", f"Marked column {col} as empty")
     
     def auto_number_frames(self):
@@ -562,38 +751,117 @@ class SpriteLabelingApp:
         start_row, start_col = self.selected_cell
         frame_num = 1
         
-        if self.current_sprite_sheet not in self.sprites_data:
-            self.sprites_data[self.current_sprite_sheet] = {'sheet_info': {}, 'sprites': {}}
-        
         # Number across the row first, then down
-        for row in range(start_row, self.grid_rows):
-            for col in range(start_col if row == start_row else 0, self.grid_cols):
-                cell_key = f"{row},{col}"
-                if cell_key in self.sprites_data[self.current_sprite_sheet]['sprites']:
-                    sprite_data = self.sprites_data[self.current_sprite_sheet]['sprites'][cell_key]
-                    if not sprite_data.get('empty', False):
-                        sprite_data['frame'] = frame_num
+        with self.label_store.transaction(self.current_sprite_sheet) as tx:
+            for row in range(start_row, self.grid_rows):
+                for col in range(start_col if row == start_row else 0, self.grid_cols):
+                    sprite_data = tx.get_cell(row, col)
+                    if sprite_data and not sprite_data.get('empty', False):
+                        tx.update_cell(row, col, frame=frame_num)
                         frame_num += 1
         
-        self.display_images()
-        self.update_progress_display()  # Add progress update
+        self.refresh_after_batch()
         messagebox.showinfo("Info", f"Auto-numbered frames starting from ({start_row},{start_col})")
 
+    def fill_selection(self):
+        """Apply the current name/action/angle/flags to every cell in the selection"""
+        rect = self.selection_rect()
+        if not rect:
+            messagebox.showwarning("Warning", "Select a cell first (Shift+click to extend)")
+            return
+        
+        top, left, bottom, right = rect
+        with self.label_store.transaction(self.current_sprite_sheet) as tx:
+            tx.fill_rect(
+                top, left, bottom, right,
+                sprite_name=self.sprite_name_var.get(),
+                action=self.action_var.get(),
+                angle=self.angle_var.get(),
+                empty=self.empty_var.get(),
+                important=self.important_var.get()
+            )
+        
+        self.refresh_after_batch()
+
+    def copy_row_to(self):
+        """Copy the selected row's labels to another row"""
+        if not self.selected_cell:
+            messagebox.showwarning("Warning", "Select a cell first")
+            return
+        
+        src_row, _ = self.selected_cell
+        dst_row = simpledialog.askinteger(
+            "Copy Row", f"Copy row {src_row} to row:",
+            minvalue=0, maxvalue=self.grid_rows - 1, parent=self.root
+        )
+        if dst_row is None or dst_row == src_row:
+            return
+        
+        with self.label_store.transaction(self.current_sprite_sheet) as tx:
+            tx.copy_row(src_row, dst_row, self.grid_cols)
+        
+        self.refresh_after_batch()
+
+    def set_column_angle(self):
+        """Set the current angle on every non-empty cell of the selected column"""
+        if not self.selected_cell:
+            messagebox.showwarning("Warning", "Select a cell first")
+            return
+        
+        angle = self.angle_var.get()
+        if not angle:
+            messagebox.showwarning("Warning", "Choose an angle first")
+            return
+        
+        _, col = self.selected_cell
+        with self.label_store.transaction(self.current_sprite_sheet) as tx:
+            tx.set_column(col, self.grid_rows, angle=angle)
+        
+        self.refresh_after_batch()
+
+    def find_mirrors(self):
+        """Detect horizontally mirrored cells and label the unlabeled half of each pair"""
+        if not self.texture_image or not self.current_sprite_sheet:
+            messagebox.showwarning("Warning", "Load a sprite sheet first")
+            return
+        
+        pairs = find_mirror_pairs(self.texture_image, self.mask_image, self.grid_cols, self.grid_rows)
+        sprites = self.sprites_data.get(self.current_sprite_sheet, {}).get('sprites', {})
+        proposals = propose_mirror_labels(pairs, sprites)
+        
+        if not proposals:
+            messagebox.showinfo("Mirrors", f"Found {len(pairs)} mirrored pairs - nothing new to label.\n"
+                                           "Label one angle of a pair (e.g. angle45) and run this again.")
+            return
+        
+        new_labels = sum(1 for key in proposals if not sprites.get(key, {}).get('angle'))
+        if not messagebox.askyesno(
+            "Mirrors",
+            f"Found {len(pairs)} mirrored pairs.\n\n"
+            f"Label {new_labels} cells from their mirror and record {len(proposals) - new_labels} mirror references?"
+        ):
+            return
+        
+        with self.label_store.transaction(self.current_sprite_sheet) as tx:
+            for cell_key, labels in proposals.items():
+                tx.set_cell(labels['row'], labels['col'], labels)
+        
+        self.refresh_after_batch()
+        if self.selected_cell:
+            self.select_cell(*self.selected_cell)
+
     def on_label_changed(self, event=None):
         """Save label changes"""
         if not self.selected_cell or not self.current_sprite_sheet:
             return
         
-        row, col = self.selected_cell
-        cell_key = f"{row},{col}"
-        
-        if self.current_sprite_sheet not in self.sprites_data:
-            self.sprites_data[self.current_sprite_sheet] = {'sheet_info': {}, 'sprites': {}}
+        # Key releases from navigation shortcuts aren't edits (the selection may already have moved)
+        if event is not None and getattr(event, 'keysym', None) in self.NAVIGATION_KEYS:
+            return
         
-        if 'sprites' not in self.sprites_data[self.current_sprite_sheet]:
-            self.sprites_data[self.current_sprite_sheet]['sprites'] = {}
+        row, col = self.selected_cell
         
-        self.sprites_data[self.current_sprite_sheet]['sprites'][cell_key] = {
+        sprite_data = {
             'sprite_name': self.sprite_name_var.get(),
             'action': self.action_var.get(),
             'angle': self.angle_var.get(),
@@ -604,6 +872,13 @@ class SpriteLabelingApp:
             'col': col
         }
         
+        # Keep a detected mirror reference while the cell still has a mirrored angle
+        previous = self.label_store.get_cell(self.current_sprite_sheet, row, col) or {}
+        if previous.get('mirror_of') and not sprite_data['empty'] and sprite_data['angle'] in MIRROR_ANGLES:
+            sprite_data['mirror_of'] = previous['mirror_of']
+        
+        self.label_store.set_cell(self.current_sprite_sheet, row, col, sprite_data)
+        
         # Redraw to show updated labels
         self.display_images()
         
@@ -632,19 +907,15 @@ class SpriteLabelingApp:
             if not result:
                 return
         
-        try:
-            from src.sprite_exporter import export_sprite_sheet
-            count = export_sprite_sheet(
-                self.current_sprite_sheet,
-                self.texture_image,
-                self.mask_image,
-                self.sprites_data[self.current_sprite_sheet],
-                self.grid_cols,
-                self.grid_rows
-            )
-            messagebox.showinfo("Success", f"Exported {count} sprites from {self.current_sprite_sheet}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Export failed: {str(e)}")
+        # Snapshot the labels so edits during the export don't affect it. The worker opens
+        # the sheet itself, so switching sheets (which releases the displayed one) is safe
+        self.start_export([(
+            self.current_sprite_sheet,
+            copy.deepcopy(self.sprites_data[self.current_sprite_sheet]),
+            None,
+            None,
+            (self.grid_cols, self.grid_rows)
+        )])
     
     def export_all_sheets(self):
         """Export all labeled sprite sheets with progress summary"""
@@ -669,62 +940,316 @@ class SpriteLabelingApp:
         if not result:
             return
         
+        # Images are opened by the worker; grid comes from the stored sheet geometry
+        jobs = [
+            (sheet_name, copy.deepcopy(sheet_data), None, None, None)
+            for sheet_name, sheet_data in self.sprites_data.items()
+            if sheet_data.get('sprites')
+        ]
+        self.start_export(jobs, summary=f"Overall Progress: {total_stats['total_percentage']:.1f}%")
+
+    def on_search_changed(self, event=None):
+        """Re-run the label search as the query is typed"""
+        if event is not None and getattr(event, 'keysym', None) in self.NAVIGATION_KEYS:
+            return
+        
+        self.search_position = -1
+        self.refresh_search()
+
+    def refresh_search(self):
+        """Re-run the current query against the label index; False if it doesn't parse"""
+        self.search_refresh_pending = False
+        query = self.search_var.get().strip()
+        if not query:
+            self.search_results = []
+            self.search_matches = set()
+            self.search_info.config(text="")
+        else:
+            try:
+                matches = self.label_index.query(**parse_query(query))
+            except ValueError as e:
+                self.search_info.config(text=str(e), foreground="red")
+                return False
+            groups = group_by_sheet(matches)
+            self.search_results = [(sheet_name, cell_key) for sheet_name, keys in groups.items() for cell_key in keys]
+            self.search_matches = matches
+            if self.search_position >= len(self.search_results):
+                self.search_position = -1
+            self.search_info.config(
+                text=f"{len(self.search_results)} cells on {len(groups)} sheets", foreground="blue"
+            )
+        
+        if self.texture_image:
+            self.display_images()
+        return True
+
+    def on_labels_edited(self, sheet_name=None, cell_keys=None):
+        """Store listener: refresh the search results once the current edits are done"""
+        if self.search_var.get().strip() and not self.search_refresh_pending:
+            self.search_refresh_pending = True
+            self.root.after_idle(self.refresh_search)
+
+    def show_search_result(self, step):
+        """Jump to the next or previous search match, switching sheets if needed"""
+        if not self.search_results:
+            return "break"
+        
+        self.search_position = (self.search_position + step) % len(self.search_results)
+        sheet_name, cell_key = self.search_results[self.search_position]
+        
+        row, col = (int(part) for part in cell_key.split(','))
+        if not self.jump_to_cell(sheet_name, row, col):
+            self.search_info.config(text=f"{sheet_name} isn't in sprites/", foreground="red")
+            return "break"
+        self.search_info.config(
+            text=f"Match {self.search_position + 1} of {len(self.search_results)}: {sheet_name} {cell_key}", foreground="blue"
+        )
+        return "break"
+
+    def jump_to_cell(self, sheet_name, row, col):
+        """Select a cell, switching sheets if needed; False if the sheet isn't in sprites/"""
+        if sheet_name != self.current_sprite_sheet:
+            display_name = next((display for display, name in self.sheet_mapping.items() if name == sheet_name), None)
+            if display_name is None:
+                return False
+            self.sheet_var.set(display_name)
+            self.on_sheet_selected()
+        
+        self.selection_anchor = None
+        self.select_cell(row, col)
+        return True
+
+    def check_labels(self):
+        """Check all labels for gaps, duplicates and invalid values; click an issue to jump to it"""
+        if self.issues_window is None or not self.issues_window.winfo_exists():
+            self.issues_window = tk.Toplevel(self.root)
+            self.issues_window.title("Label Check")
+            self.issues_window.geometry("720x400")
+            
+            top_bar = ttk.Frame(self.issues_window, padding=5)
+            top_bar.pack(fill=tk.X)
+            ttk.Button(top_bar, text="Check Again", command=self.check_labels).pack(side=tk.LEFT)
+            self.issues_summary = ttk.Label(top_bar, text="", foreground="gray")
+            self.issues_summary.pack(side=tk.LEFT, padx=(10, 0))
+            
+            list_frame = ttk.Frame(self.issues_window, padding=(5, 0, 5, 5))
+            list_frame.pack(fill=tk.BOTH, expand=True)
+            scrollbar = ttk.Scrollbar(list_frame)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            self.issues_list = tk.Listbox(list_frame, font=("Arial", 9), yscrollcommand=scrollbar.set)
+            self.issues_list.pack(fill=tk.BOTH, expand=True)
+            scrollbar.config(command=self.issues_list.yview)
+            self.issues_list.bind("<<ListboxSelect>>", self.on_issue_selected)
+        
+        issues = validate_labels(self.sprites_data, self.actions, self.angles)
+        by_sheet = issues_by_sheet(issues)
+        
+        # One row per sheet header and per issue on that sheet
+        self.issues_list.delete(0, tk.END)
+        self.issue_rows = []
+        for sheet_name, sheet_issues in by_sheet.items():
+            self.issues_list.insert(tk.END, f"{sheet_name} ({len(sheet_issues)})")
+            self.issues_list.itemconfig(tk.END, foreground="gray")
+            self.issue_rows.append(None)
+            for issue in sheet_issues:
+                self.issues_list.insert(tk.END, f"    {format_issue(issue, sheet_name)}")
+                self.issue_rows.append(next(cell for cell in issue['cells'] if cell[0] == sheet_name))
+        
+        if issues:
+            self.issues_summary.config(text=f"{len(issues)} issues on {len(by_sheet)} sheets - click one to jump to it", foreground="red")
+        else:
+            self.issues_summary.config(text="✅ No issues found", foreground="green")
+        self.issues_window.lift()
+
+    def on_issue_selected(self, event=None):
+        selection = self.issues_list.curselection()
+        if not selection or self.issue_rows[selection[0]] is None:
+            return
+        
+        sheet_name, row, col = self.issue_rows[selection[0]]
+        if not self.jump_to_cell(sheet_name, row, col):
+            self.issues_summary.config(text=f"{sheet_name} isn't in sprites/", foreground="red")
+
+    def export_search_matches(self):
+        """Export only the cells matching the current search"""
+        # Labels may have changed since the search was typed; the index is always current
+        if not self.refresh_search():
+            return
+        if not self.search_results:
+            messagebox.showwarning("Warning", "Search for some labels first")
+            return
+        
+        groups = group_by_sheet(self.search_matches)
+        if not messagebox.askyesno(
+            "Export Matches", f"Export {len(self.search_results)} matching cells from {len(groups)} sheets?"
+        ):
+            return
+        
+        # Snapshot only the matching cells; the sheet's grid and info come along
+        jobs = []
+        for sheet_name, cell_keys in groups.items():
+            sheet_data = self.sprites_data[sheet_name]
+            snapshot = {key: copy.deepcopy(value) for key, value in sheet_data.items() if key != 'sprites'}
+            snapshot['sprites'] = {key: copy.deepcopy(sheet_data['sprites'][key]) for key in cell_keys}
+            jobs.append((sheet_name, snapshot, None, None, None))
+        
+        self.start_export(jobs, summary=f"Search: {self.search_var.get().strip()}", partial=True)
+
+    def start_export(self, jobs, summary="", partial=False):
+        """Run export jobs in a worker thread, reporting progress through a queue.
+        
+        partial jobs only carry some of a sheet's cells, so the sheet's other manifest entries are kept.
+        """
+        if self.export_thread and self.export_thread.is_alive():
+            messagebox.showwarning("Warning", "An export is already running")
+            return
+        
+        self.export_cancel.clear()
+        self.export_queue = queue.Queue()
+        self.export_summary = summary
+        
+        self.export_current_button.config(state="disabled")
+        self.export_all_button.config(state="disabled")
+        self.cancel_export_button.config(state="normal")
+        self.export_progress_bar['value'] = 0
+        self.export_status_label.config(text="Starting export...", foreground="blue")
+        
+        self.export_thread = threading.Thread(
+            target=self.export_worker,
+            args=(jobs, self.export_queue, self.export_cancel, partial),
+            daemon=True
+        )
+        self.export_thread.start()
+        self.root.after(100, self.poll_export_queue)
+
+    def export_worker(self, jobs, progress_queue, cancel_event, partial=False):
+        """Export sheets off the UI thread (never touches Tk widgets)"""
+        from src.sprite_exporter import export_sprite_sheet, sheet_grid
+        from src.export_manifest import report_collisions, update_manifest
+        from src.sprite_encoder import SpriteEncoder
+        
+        # PNG encoding runs on a couple of threads while the next sprite is cut out
+        encoder = SpriteEncoder(threads=2)
+        
         total_exported = 0
         sheets_exported = 0
+        manifest = []
+        finished_sheets = []
         
-        for sheet_name, sheet_data in self.sprites_data.items():
-            if sheet_data.get('sprites'):
-                try:
-                    # Load images for this sheet
+        for index, (sheet_name, sheet_data, texture_img, mask_img, grid) in enumerate(jobs, start=1):
+            if cancel_event.is_set():
+                break
+            
+            try:
+                # Load images for this sheet
+                if texture_img is None:
                     texture_path = Path("sprites") / f"{sheet_name}_6xGigaPixel.png"
                     mask_path = Path("sprites") / f"{sheet_name}A_6xGigaPixel.png"
                     
-                    texture_img = Image.open(texture_path)
-                    mask_img = Image.open(mask_path) if mask_path.exists() else None
-                    
-                    from src.sprite_exporter import export_sprite_sheet
-                    count = export_sprite_sheet(
-                        sheet_name,
-                        texture_img,
-                        mask_img,
-                        sheet_data,
-                        self.grid_cols,  # You might want to store grid size per sheet
-                        self.grid_rows
-                    )
-                    total_exported += count
+                    texture_img = open_cached_sheet(texture_path)
+                    mask_img = open_cached_sheet(mask_path) if mask_path.exists() else None
+                
+                grid_cols, grid_rows = grid or sheet_grid(sheet_data, texture_img.size)
+                
+                def on_progress(done, total, filename_base, sheet_name=sheet_name, index=index):
+                    progress_queue.put(('progress', sheet_name, index, len(jobs), done, total))
+                
+                count = export_sprite_sheet(
+                    sheet_name,
+                    texture_img,
+                    mask_img,
+                    sheet_data,
+                    grid_cols,
+                    grid_rows,
+                    progress_callback=on_progress,
+                    cancel_event=cancel_event,
+                    manifest=manifest,
+                    encoder=encoder
+                )
+                total_exported += count
+                if not cancel_event.is_set():
                     sheets_exported += 1
-                    
-                except Exception as e:
-                    print(f"Failed to export {sheet_name}: {e}")
+                    finished_sheets.append(sheet_name)
+                
+            except Exception as e:
+                progress_queue.put(('error', sheet_name, str(e)))
+        
+        encoder.close()
+        
+        # One manifest for the whole export tree, so loaders don't have to walk it
+        collisions = 0
+        if manifest:
+            try:
+                merged = update_manifest("data/individual_sprites", manifest, replace_sheets=() if partial else finished_sheets)
+                collisions = report_collisions(merged)
+            except Exception as e:
+                progress_queue.put(('error', "manifest", str(e)))
         
+        progress_queue.put(('finished', total_exported, sheets_exported, cancel_event.is_set(), collisions))
+
+    def poll_export_queue(self):
+        """Apply progress messages from the export worker on the Tk thread"""
+        finished = None
+        
+        try:
+            while True:
+                message = self.export_queue.get_nowait()
+                kind = message[0]
+                
+                if kind == 'progress':
+                    _, sheet_name, index, sheet_count, done, total = message
+                    self.export_progress_bar['maximum'] = max(total, 1)
+                    self.export_progress_bar['value'] = done
+                    self.export_status_label.config(
+                        text=f"Sheet {index}/{sheet_count}: {sheet_name} - {done}/{total} sprites",
+                        foreground="blue"
+                    )
+                elif kind == 'error':
+                    _, sheet_name, error = message
+                    print(f"Failed to export {sheet_name}: {error}")
+                elif kind == 'finished':
+                    finished = message
+        except queue.Empty:
+            pass
+        
+        if finished is None:
+            self.root.after(100, self.poll_export_queue)
+            return
+        
+        _, total_exported, sheets_exported, cancelled, collisions = finished
+        
+        self.export_current_button.config(state="normal")
+        self.export_all_button.config(state="normal")
+        self.cancel_export_button.config(state="disabled")
+        
+        if cancelled:
+            self.export_status_label.config(text=f"Export cancelled after {total_exported} sprites", foreground="orange")
+            messagebox.showinfo("Export Cancelled", f"Export cancelled after {total_exported} sprites")
+            return
+        
+        self.export_status_label.config(text=f"Exported {total_exported} sprites", foreground="green")
         messagebox.showinfo(
             "Export Complete", 
             f"Successfully exported:\n"
             f"• {total_exported} total sprites\n"
             f"• from {sheets_exported} sprite sheets\n\n"
-            f"Overall Progress: {total_stats['total_percentage']:.1f}%"
+            f"{self.export_summary}"
+            + (f"\n\n⚠️ {collisions} filename collisions - see the console" if collisions else "")
         )
 
+    def cancel_export(self):
+        """Ask the export worker to stop after the sprite it is writing"""
+        if self.export_thread and self.export_thread.is_alive():
+            self.export_cancel.set()
+            self.export_status_label.config(text="Cancelling...", foreground="orange")
+
     def auto_detect_grid(self):
         """Try to auto-detect reasonable grid dimensions"""
         if not self.texture_image:
             return
             
-        width, height = self.texture_image.size
-        
-        # Common DOOM layouts
-        common_grids = [(8, 6), (8, 5), (4, 11), (8, 8), (10, 6)]
-        
-        best_grid = (8, 6)  # Default
-        
-        for cols, rows in common_grids:
-            sprite_w = width // cols
-            sprite_h = height // rows
-            
-            # Prefer grids that give reasonable sprite sizes
-            if 60 <= sprite_w <= 400 and 60 <= sprite_h <= 400:
-                best_grid = (cols, rows)
-                break
+        from src.sprite_exporter import detect_grid
+        best_grid = detect_grid(*self.texture_image.size)
         
         self.cols_var.set(best_grid[0])
         self.rows_var.set(best_grid[1])
@@ -734,11 +1259,17 @@ class SpriteLabelingApp:
         """Update grid overlay on images"""
         self.grid_cols = self.cols_var.get()
         self.grid_rows = self.rows_var.get()
+        
+        # Store grid size per sheet so exports use the right geometry
+        if self.current_sprite_sheet in self.sprites_data:
+            self.label_store.set_grid(self.current_sprite_sheet, self.grid_cols, self.grid_rows)
+        
         self.display_images()
+        self.update_preview()
         self.update_progress_display()  # Add progress update
 
     def display_images(self):
-        """Display images with grid overlay"""
+        """Display the visible part of the images with grid overlay"""
         if not self.texture_image:
             return
         
@@ -747,7 +1278,6 @@ class SpriteLabelingApp:
         if self.mask_image:
             self.mask_canvas.delete("all")
         
-        # Scale images to fit canvas
         canvas_width = self.texture_canvas.winfo_width()
         canvas_height = self.texture_canvas.winfo_height()
         
@@ -756,65 +1286,107 @@ class SpriteLabelingApp:
             self.root.after(100, self.display_images)
             return
         
-        # Calculate scale factor
-        img_width, img_height = self.texture_image.size
-        scale_w = (canvas_width - 20) / img_width
-        scale_h = (canvas_height - 20) / img_height
-        scale = min(scale_w, scale_h, 1.0)  # Don't upscale
-        
-        display_width = int(img_width * scale)
-        display_height = int(img_height * scale)
-        
-        # Resize images for display
-        texture_display = self.texture_image.resize((display_width, display_height), Image.NEAREST)
-        self.texture_photo = ImageTk.PhotoImage(texture_display)
+        if self.viewport.fit_mode:
+            self.viewport.fit(self.texture_image.size, (canvas_width, canvas_height))
         
-        # Display texture image
-        self.texture_canvas.create_image(10, 10, anchor="nw", image=self.texture_photo)
+        # Only the on-screen region is sampled, so cost is bounded by the canvas size
+        rendered = self.viewport.render(self.texture_image, (canvas_width, canvas_height))
+        if rendered:
+            texture_display, x, y = rendered
+            self.texture_photo = ImageTk.PhotoImage(texture_display)
+            self.texture_canvas.create_image(x, y, anchor="nw", image=self.texture_photo)
         
         # Display mask image if exists
         if self.mask_image:
-            mask_display = self.mask_image.resize((display_width, display_height), Image.NEAREST)
-            self.mask_photo = ImageTk.PhotoImage(mask_display)
-            self.mask_canvas.create_image(10, 10, anchor="nw", image=self.mask_photo)
+            rendered = self.viewport.render(self.mask_image, (canvas_width, canvas_height))
+            if rendered:
+                mask_display, x, y = rendered
+                self.mask_photo = ImageTk.PhotoImage(mask_display)
+                self.mask_canvas.create_image(x, y, anchor="nw", image=self.mask_photo)
         
         # Draw grid
-        self.draw_grid(self.texture_canvas, display_width, display_height)
+        self.draw_grid(self.texture_canvas, canvas_width, canvas_height)
         if self.mask_image:
-            self.draw_grid(self.mask_canvas, display_width, display_height)
+            self.draw_grid(self.mask_canvas, canvas_width, canvas_height)
         
-        # Store scale and offset for click handling
-        self.display_scale = scale
-        self.display_offset = (10, 10)
+        self.zoom_label.config(text=f"Zoom: {self.viewport.scale * 100:.0f}%")
+        self.update_memory_status()
+
+    def release_sheet(self):
+        """Drop the decoded data, views and per-sheet caches of the sheet being left"""
+        for canvas in (self.texture_canvas, self.mask_canvas, self.preview_texture_canvas, self.preview_mask_canvas,
+                       self.preview_neighbours_canvas):
+            canvas.delete("all")
+        for image in (self.texture_image, self.mask_image):
+            if image is not None:
+                image.close()
+        self.texture_image = self.mask_image = None
+        self.texture_photo = self.mask_photo = None
+        self.preview_texture_photo = self.preview_mask_photo = None
+        self.preview_thumb_photos = []
+        self.crop_cache.clear()
+        self.signatures = self.signature_key = None
+
+    def update_memory_status(self):
+        """Show process memory next to what the open sheet holds"""
+        parts = []
+        rss = process_memory()
+        if rss is not None:
+            parts.append(f"Memory: {rss / MB:.0f} MB")
+        
+        sheets = [image for image in (self.texture_image, self.mask_image) if image is not None]
+        if sheets:
+            modes = "+".join(image.storage_mode for image in sheets)
+            parts.append(f"sheet {sum(image.nbytes for image in sheets) / MB:.0f} MB mapped ({modes})")
+        
+        # Tk keeps 4 bytes per displayed pixel
+        photos = [getattr(self, name, None) for name in ("texture_photo", "mask_photo", "preview_texture_photo", "preview_mask_photo")]
+        photos += getattr(self, "preview_thumb_photos", [])
+        view_bytes = sum(photo.width() * photo.height() * 4 for photo in photos if photo is not None)
+        parts.append(f"views {view_bytes / MB:.1f} MB")
+        parts.append(f"crops {self.crop_cache.nbytes() / MB:.1f} MB")
+        self.memory_label.config(text=" | ".join(parts))
 
-    def draw_grid(self, canvas, width, height):
-        """Draw grid lines on canvas"""
-        cell_width = width / self.grid_cols
-        cell_height = height / self.grid_rows
+    def draw_grid(self, canvas, canvas_width, canvas_height):
+        """Draw grid lines and labels for the visible cells"""
+        img_width, img_height = self.texture_image.size
+        cell_width = img_width / self.grid_cols
+        cell_height = img_height / self.grid_rows
+        to_canvas = self.viewport.image_to_canvas
+        
+        left, top = to_canvas(0, 0)
+        right, bottom = to_canvas(img_width, img_height)
+        
+        # Range of cells that are at least partly on screen
+        first_col = max(0, int(self.viewport.canvas_to_image(0, 0)[0] // cell_width))
+        last_col = min(self.grid_cols - 1, int(self.viewport.canvas_to_image(canvas_width, 0)[0] // cell_width))
+        first_row = max(0, int(self.viewport.canvas_to_image(0, 0)[1] // cell_height))
+        last_row = min(self.grid_rows - 1, int(self.viewport.canvas_to_image(0, canvas_height)[1] // cell_height))
         
         # Draw vertical lines
-        for i in range(self.grid_cols + 1):
-            x = 10 + i * cell_width
-            canvas.create_line(x, 10, x, 10 + height, fill="red", width=2)
+        for i in range(first_col, last_col + 2):
+            x, _ = to_canvas(i * cell_width, 0)
+            canvas.create_line(x, top, x, bottom, fill="red", width=2)
         
         # Draw horizontal lines
-        for i in range(self.grid_rows + 1):
-            y = 10 + i * cell_height
-            canvas.create_line(10, y, 10 + width, y, fill="red", width=2)
+        for i in range(first_row, last_row + 2):
+            _, y = to_canvas(0, i * cell_height)
+            canvas.create_line(left, y, right, y, fill="red", width=2)
+        
+        sprites = self.sprites_data.get(self.current_sprite_sheet, {}).get('sprites', {})
         
         # Draw cell labels and highlights
-        for row in range(self.grid_rows):
-            for col in range(self.grid_cols):
-                x = 10 + col * cell_width + cell_width/2
-                y = 10 + row * cell_height + cell_height/2
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                x, y = to_canvas((col + 0.5) * cell_width, (row + 0.5) * cell_height)
                 
                 # Cell coordinates text
                 canvas.create_text(x, y - 20, text=f"{row},{col}", fill="yellow", font=("Arial", 8))
                 
                 # Show current labels if any
                 cell_key = f"{row},{col}"
-                if self.current_sprite_sheet and cell_key in self.sprites_data.get(self.current_sprite_sheet, {}).get('sprites', {}):
-                    sprite_data = self.sprites_data[self.current_sprite_sheet]['sprites'][cell_key]
+                if cell_key in sprites:
+                    sprite_data = sprites[cell_key]
                     if not sprite_data.get('empty', False):
                         sprite_name = sprite_data.get('sprite_name', '')
                         action = sprite_data.get('action', '')
@@ -824,25 +1396,42 @@ class SpriteLabelingApp:
                         if frame:
                             canvas.create_text(x, y + 15, text=f"F{frame}", fill="cyan", font=("Arial", 7))
                 
+                # Outline search matches
+                if (self.current_sprite_sheet, cell_key) in self.search_matches:
+                    canvas.create_rectangle(
+                        *to_canvas(col * cell_width, row * cell_height),
+                        *to_canvas((col + 1) * cell_width, (row + 1) * cell_height),
+                        outline="orange", width=2, fill=""
+                    )
+                
                 # Highlight selected cell
                 if self.selected_cell == (row, col):
                     canvas.create_rectangle(
-                        10 + col * cell_width, 10 + row * cell_height,
-                        10 + (col + 1) * cell_width, 10 + (row + 1) * cell_height,
+                        *to_canvas(col * cell_width, row * cell_height),
+                        *to_canvas((col + 1) * cell_width, (row + 1) * cell_height),
                         outline="cyan", width=3, fill=""
                     )
+        
+        # Outline a multi-cell selection
+        rect = self.selection_rect()
+        if rect and rect[:2] != rect[2:]:
+            top, left, bottom, right = rect
+            canvas.create_rectangle(
+                *to_canvas(left * cell_width, top * cell_height),
+                *to_canvas((right + 1) * cell_width, (bottom + 1) * cell_height),
+                outline="magenta", width=2, dash=(4, 2), fill=""
+            )
 
-    def on_canvas_click(self, event):
-        """Handle clicks on the canvas"""
-        if not hasattr(self, 'display_scale') or not self.texture_image:
-            return
+    def event_to_cell(self, event):
+        """Convert a canvas click to (row, col), or None outside the grid"""
+        if not self.texture_image:
+            return None
         
-        # Convert click position to grid coordinates
-        x = (event.x - self.display_offset[0]) / self.display_scale
-        y = (event.y - self.display_offset[1]) / self.display_scale
+        # Convert click position to sheet coordinates (works at any zoom/pan)
+        x, y = self.viewport.canvas_to_image(event.x, event.y)
         
         if x < 0 or y < 0:
-            return
+            return None
         
         img_width, img_height = self.texture_image.size
         cell_width = img_width / self.grid_cols
@@ -852,7 +1441,82 @@ class SpriteLabelingApp:
         row = int(y // cell_height)
         
         if 0 <= row < self.grid_rows and 0 <= col < self.grid_cols:
-            self.select_cell(row, col)
+            return row, col
+        return None
+
+    def request_redraw(self):
+        """Coalesce redraws from rapid zoom/pan events into one per idle cycle"""
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.root.after_idle(self.redraw_now)
+
+    def redraw_now(self):
+        self.redraw_pending = False
+        self.display_images()
+
+    def on_mouse_wheel(self, event):
+        """Zoom around the mouse pointer"""
+        if not self.texture_image:
+            return
+        zoom_in = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.viewport.zoom_at(1.25 if zoom_in else 0.8, event.x, event.y)
+        self.request_redraw()
+
+    def on_pan_start(self, event):
+        self.pan_last = (event.x, event.y)
+
+    def on_pan_drag(self, event):
+        """Pan by dragging with the middle or right mouse button"""
+        if not self.texture_image or self.pan_last is None:
+            return
+        self.viewport.pan(event.x - self.pan_last[0], event.y - self.pan_last[1])
+        self.pan_last = (event.x, event.y)
+        self.request_redraw()
+
+    def zoom_view(self, factor):
+        """Zoom around the canvas centre"""
+        if not self.texture_image:
+            return
+        self.viewport.zoom_at(factor, self.texture_canvas.winfo_width() / 2, self.texture_canvas.winfo_height() / 2)
+        self.request_redraw()
+
+    def zoom_actual_size(self):
+        """Show sheet pixels 1:1, centred on the selected cell if any"""
+        if not self.texture_image:
+            return
+        canvas_x, canvas_y = self.texture_canvas.winfo_width() / 2, self.texture_canvas.winfo_height() / 2
+        if self.selected_cell:
+            row, col = self.selected_cell
+            img_width, img_height = self.texture_image.size
+            canvas_x, canvas_y = self.viewport.image_to_canvas(
+                (col + 0.5) * img_width / self.grid_cols, (row + 0.5) * img_height / self.grid_rows
+            )
+        self.viewport.set_zoom(1.0, canvas_x, canvas_y)
+        self.request_redraw()
+
+    def zoom_fit(self):
+        """Fit the whole sheet in the canvas"""
+        self.viewport.fit_mode = True
+        self.request_redraw()
+
+    def on_canvas_resize(self, event):
+        if self.viewport.fit_mode:
+            self.request_redraw()
+
+    def on_canvas_click(self, event):
+        """Handle clicks on the canvas"""
+        cell = self.event_to_cell(event)
+        if cell:
+            self.selection_anchor = None
+            self.select_cell(*cell)
+
+    def on_canvas_shift_click(self, event):
+        """Extend a rectangular selection from the previously selected cell"""
+        cell = self.event_to_cell(event)
+        if cell:
+            if self.selection_anchor is None:
+                self.selection_anchor = self.selected_cell
+            self.select_cell(*cell)
 
     def select_cell(self, row, col):
         """Select a grid cell and load its data"""
@@ -870,35 +1534,264 @@ class SpriteLabelingApp:
             self.frame_var.set(sprite_data.get('frame', 1))
             self.empty_var.set(sprite_data.get('empty', False))
             self.important_var.set(sprite_data.get('important', False))
+            self.prediction_label.config(text="")
         else:
-            # Clear fields for new sprite
-            self.sprite_name_var.set('')
-            self.action_var.set('')
-            self.angle_var.set('')
-            self.frame_var.set(1)
+            # Pre-fill new sprites from the sheet's pattern (saved on Enter or on any edit)
+            prediction = self.get_predictor().predict(row, col) if self.current_sprite_sheet else None
+            prediction = prediction or {'sprite_name': '', 'action': '', 'angle': '', 'frame': 1}
+            self.sprite_name_var.set(prediction['sprite_name'])
+            self.action_var.set(prediction['action'])
+            self.angle_var.set(prediction['angle'])
+            self.frame_var.set(prediction['frame'])
             self.empty_var.set(False)
             self.important_var.set(False)
+            
+            if prediction['sprite_name'] or prediction['action'] or prediction['angle']:
+                self.prediction_label.config(text="Predicted - Enter to accept, E for empty", foreground="blue")
+            else:
+                self.prediction_label.config(text="")
         
         # Redraw to show selection
         self.display_images()
+        self.update_preview()
+
+    def get_predictor(self):
+        """Get the label predictor for the current sheet, refitting after edits"""
+        key = (self.current_sprite_sheet, self.label_store.revisions.get(self.current_sprite_sheet, 0))
+        if key != self.predictor_key:
+            sprites = self.sprites_data.get(self.current_sprite_sheet, {}).get('sprites', {})
+            self.predictor = LabelPredictor(sprites, self.angles)
+            self.predictor_key = key
+        return self.predictor
+
+    def bind_shortcuts(self):
+        """Keyboard labeling: arrows move, Enter accepts, N jumps to the next unlabeled cell"""
+        for keysym, delta in (("Up", (-1, 0)), ("Down", (1, 0)), ("Left", (0, -1)), ("Right", (0, 1))):
+            self.root.bind(f"<{keysym}>", lambda event, delta=delta: self.on_arrow_key(event, *delta))
+        self.root.bind("<Return>", self.on_accept_key)
+        self.root.bind("<KP_Enter>", self.on_accept_key)
+        self.root.bind("<Escape>", lambda event: self.texture_canvas.focus_set())
+        self.root.bind("<Key-n>", lambda event: None if self.is_typing() else self.select_next_unlabeled())
+        self.root.bind("<Control-n>", lambda event: self.select_next_unlabeled())
+        self.root.bind("<Key-e>", self.on_empty_key)
+        self.root.bind("<Control-s>", lambda event: self.save_progress())
+
+    def is_typing(self):
+        """True when a text field has focus, so single-key shortcuts stay out of the way"""
+        return isinstance(self.root.focus_get(), (tk.Entry, ttk.Entry, tk.Spinbox))
+
+    def on_arrow_key(self, event, d_row, d_col):
+        """Move the selection with the arrow keys"""
+        if self.is_typing() or not self.texture_image:
+            return
+        
+        row, col = self.selected_cell or (0, 0)
+        if self.selected_cell:
+            row = min(max(row + d_row, 0), self.grid_rows - 1)
+            col = min(max(col + d_col, 0), self.grid_cols - 1)
+        self.selection_anchor = None
+        self.select_cell(row, col)
+        return "break"
+
+    def on_accept_key(self, event=None):
+        """Save the fields shown (prediction or override) and go to the next unlabeled cell"""
+        if not self.selected_cell or not self.current_sprite_sheet:
+            return
+        self.on_label_changed()
+        self.select_next_unlabeled()
+        return "break"
+
+    def on_empty_key(self, event=None):
+        """Mark the selected cell empty and move on"""
+        if self.is_typing() or not self.selected_cell or not self.current_sprite_sheet:
+            return
+        row, col = self.selected_cell
+        self.label_store.set_cell(self.current_sprite_sheet, row, col, blank_cell(row, col, empty=True))
+        self.update_progress_display()
+        self.select_next_unlabeled()
+
+    def select_next_unlabeled(self):
+        """Select the next cell (row by row, wrapping) that has no labels yet"""
+        if not self.texture_image or not self.current_sprite_sheet:
+            return
+        
+        sprites = self.sprites_data.get(self.current_sprite_sheet, {}).get('sprites', {})
+        total_cells = self.grid_cols * self.grid_rows
+        start = self.selected_cell[0] * self.grid_cols + self.selected_cell[1] if self.selected_cell else -1
+        
+        for step in range(1, total_cells + 1):
+            index = (start + step) % total_cells
+            row, col = divmod(index, self.grid_cols)
+            if f"{row},{col}" not in sprites:
+                self.selection_anchor = None
+                self.select_cell(row, col)
+                return
+        
+        self.prediction_label.config(text="All cells on this sheet are labeled", foreground="green")
+
+    def cell_box(self, row, col):
+        """Get a cell's pixel box in the sheet (same geometry as the exporter)"""
+        sprite_width = self.texture_image.width // self.grid_cols
+        sprite_height = self.texture_image.height // self.grid_rows
+        left, top = col * sprite_width, row * sprite_height
+        return left, top, left + sprite_width, top + sprite_height
+
+    def update_preview(self):
+        """Show the selected cell's texture, mask and neighbouring frames"""
+        for canvas in (self.preview_texture_canvas, self.preview_mask_canvas, self.preview_neighbours_canvas):
+            canvas.delete("all")
+        
+        if not self.texture_image or not self.selected_cell:
+            self.preview_info.config(text="No cell selected")
+            self.suggestion_list.delete(0, tk.END)
+            return
+        
+        row, col = self.selected_cell
+        box = self.cell_box(row, col)
+        size = (self.PREVIEW_SIZE, self.PREVIEW_SIZE)
+        
+        texture_crop = self.crop_cache.get(self.texture_image, box, size)
+        self.preview_texture_photo = ImageTk.PhotoImage(texture_crop)
+        self.preview_texture_canvas.create_image(self.PREVIEW_SIZE // 2, self.PREVIEW_SIZE // 2, image=self.preview_texture_photo)
+        
+        if self.mask_image:
+            mask_crop = self.crop_cache.get(self.mask_image, box, size)
+            self.preview_mask_photo = ImageTk.PhotoImage(mask_crop)
+            self.preview_mask_canvas.create_image(self.PREVIEW_SIZE // 2, self.PREVIEW_SIZE // 2, image=self.preview_mask_photo)
+        
+        sheet_width = box[2] - box[0]
+        zoom = texture_crop.width / sheet_width if sheet_width else 0
+        self.preview_info.config(text=f"Cell {row},{col} | {sheet_width}x{box[3] - box[1]}px | zoom {zoom:.3g}x")
+        
+        # Two frames either side (frames run down the rows)
+        self.preview_thumb_photos = []
+        neighbour_rows = [r for r in range(row - 2, row + 3) if 0 <= r < self.grid_rows]
+        slot = self.PREVIEW_SIZE // 5
+        for index, neighbour_row in enumerate(range(row - 2, row + 3)):
+            if neighbour_row not in neighbour_rows:
+                continue
+            thumb = self.crop_cache.get(self.texture_image, self.cell_box(neighbour_row, col), (self.THUMB_SIZE, self.THUMB_SIZE))
+            photo = ImageTk.PhotoImage(thumb)
+            self.preview_thumb_photos.append(photo)
+            x = index * slot + slot // 2
+            self.preview_neighbours_canvas.create_image(x, self.THUMB_SIZE // 2 + 2, image=photo)
+            self.preview_neighbours_canvas.create_text(
+                x, self.THUMB_SIZE + 9, text=f"r{neighbour_row}",
+                fill="cyan" if neighbour_row == row else "yellow", font=("Arial", 7)
+            )
+        
+        self.update_suggestions()
+        
+        # Warm the cache for the cells the user is likely to move to next
+        self.root.after_idle(self.prefetch_preview, row, col)
+
+    def prefetch_preview(self, row, col):
+        """Extract crops for adjacent cells so moving between cells is instant"""
+        if not self.texture_image:
+            return
+        size = (self.PREVIEW_SIZE, self.PREVIEW_SIZE)
+        for neighbour_row, neighbour_col in ((row, col + 1), (row, col - 1), (row + 1, col), (row - 1, col)):
+            if 0 <= neighbour_row < self.grid_rows and 0 <= neighbour_col < self.grid_cols:
+                box = self.cell_box(neighbour_row, neighbour_col)
+                self.crop_cache.get(self.texture_image, box, size)
+                if self.mask_image:
+                    self.crop_cache.get(self.mask_image, box, size)
+
+    def get_signatures(self):
+        """Get signatures for every cell of the current sheet (recomputed when the grid changes)"""
+        key = (self.current_sprite_sheet, self.grid_cols, self.grid_rows)
+        if key != self.signature_key:
+            self.signatures = sheet_signatures(self.texture_image, self.mask_image, self.grid_cols, self.grid_rows)
+            self.signature_key = key
+        return self.signatures
+
+    def update_suggestions(self):
+        """List the labeled cells that look most like the selected one"""
+        self.suggestion_list.delete(0, tk.END)
+        self.suggestions = []
+        if not self.current_sprite_sheet or not self.selected_cell:
+            return
+        
+        signatures = self.get_signatures()
+        
+        # Keep this sheet's entries in step with its labels
+        key = self.signature_key + (self.label_store.revisions.get(self.current_sprite_sheet, 0),)
+        if key != self.index_key:
+            self.sprite_index.update_sheet(self.current_sprite_sheet, self.sprites_data.get(self.current_sprite_sheet, {}), signatures)
+            self.index_key = key
+            self.index_changed = True
+        
+        row, col = self.selected_cell
+        start = time.perf_counter()
+        self.suggestions = self.sprite_index.query(signatures[row, col], k=6, exclude=(self.current_sprite_sheet, row, col))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        for score, entry in self.suggestions:
+            self.suggestion_list.insert(
+                tk.END, f"{score:.2f}  {entry['sprite_name']} {entry['action']} {entry['angle']} F{entry['frame']}  ({entry['sheet']})"
+            )
+        self.suggestion_info.config(text=f"{len(self.sprite_index)} indexed cells | query {elapsed_ms:.1f} ms")
+
+    def apply_suggestion(self, event=None):
+        """Copy a suggested cell's labels to the selected cell"""
+        selection = self.suggestion_list.curselection()
+        if not selection or not self.selected_cell:
+            return
+        
+        _, entry = self.suggestions[selection[0]]
+        self.sprite_name_var.set(entry['sprite_name'])
+        self.action_var.set(entry['action'])
+        self.angle_var.set(entry['angle'])
+        self.frame_var.set(entry['frame'] or 1)
+        self.empty_var.set(False)
+        self.prediction_label.config(text="")
+        self.on_label_changed()
 
     def save_progress(self):
-        """Save current labeling progress"""
-        try:
-            with open("sprite_labels.json", "w") as f:
-                import json
-                json.dump(self.sprites_data, f, indent=2)
-            messagebox.showinfo("Success", "Progress saved!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Save failed: {str(e)}")
+        """Save pending edits now (written in the background)"""
+        if self.autosaver.flush():
+            self.save_status_label.config(text="Saving...", foreground="blue")
+        else:
+            self.save_status_label.config(text="No unsaved changes", foreground="gray")
+
+    def on_autosave_status(self, message, ok):
+        """Show the result of a background save"""
+        timestamp = time.strftime("%H:%M:%S")
+        self.save_status_label.config(text=f"{message} at {timestamp}", foreground="green" if ok else "red")
+        if not ok:
+            print(f"❌ {message}")
+
+    def load_labels(self):
+        """Load sprite_labels.json (or the label database) into the label store"""
+        if self.label_db:
+            # Also picks up edits other labelers have saved since
+            self.autosaver.flush()
+            self.label_store.replace(self.label_db.load())
+            self.label_index.rebuild(self.sprites_data)
+            self.on_labels_edited()
+            self.autosaver.reset(None)
+            return True
+        
+        label_path = Path("sprite_labels.json")
+        if not label_path.exists():
+            return False
+        
+        with open(label_path, "r") as f:
+            text = f.read()
+        
+        data = json.loads(text)
+        self.autosaver.path = label_path
+        self.label_store.replace(data)
+        self.label_index.rebuild(self.sprites_data)
+        self.on_labels_edited()
+        # The autosave writer gets its own copy so it never shares dicts with the UI
+        self.autosaver.reset(json.loads(text))
+        return True
 
     def load_progress(self):
         """Load saved labeling progress"""
         try:
-            if Path("sprite_labels.json").exists():
-                with open("sprite_labels.json", "r") as f:
-                    import json
-                    self.sprites_data = json.load(f)
+            if self.load_labels():
                 messagebox.showinfo("Success", "Progress loaded!")
                 if self.current_sprite_sheet:
                     self.display_images()  # Refresh display
@@ -908,6 +1801,14 @@ class SpriteLabelingApp:
         except Exception as e:
             messagebox.showerror("Error", f"Load failed: {str(e)}")
 
+    def on_close(self):
+        """Write any pending edits before closing"""
+        self.cancel_export()
+        self.autosaver.close()
+        if self.index_changed:
+            self.sprite_index.save()
+        self.root.destroy()
+
     def run(self):
         """Start the application"""
         self.root.mainloop()
@@ -0,0 +1,341 @@
+# CPU training harness for the sprite GAN
+# Trains a small DCGAN-style generator on exported sprites (RGB + mask, 64x64 by default)
+# without a GPU:
+#   - intra-op / inter-op thread counts are set per process (optionally tuned by timing a
+#     few steps), so several processes don't oversubscribe the cores
+#   - --processes N runs data-parallel training on one machine with the gloo backend
+#   - models use channels-last memory and bfloat16 autocast when the CPU supports it
+#   - checkpoints are copied to memory and written by a background thread
+#   - progress lines report samples/sec across all processes
+# Training data comes from the augmentation cache (src/augment.py), memory-mapped and
+# sliced per batch instead of going through a per-sample DataLoader.
+#
+# Usage (from the project root):
+#   python -m src.train_cpu --epochs 20
+#   python -m src.train_cpu --processes 2 --tune-threads
+#   python -m src.train_cpu --resume
+
+import argparse
+import contextlib
+import copy
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+CHECKPOINT_DIR = "checkpoints"
+LATENT_SIZE = 128
+CHANNELS = 4  # RGB + mask
+
+def logical_cpus():
+    """CPUs this process may run on (hyperthreads count separately)"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+def physical_cores():
+    """Physical cores among the CPUs this process may run on.
+
+    Hyperthreads of one core share its FPU, so torch gains nothing from a thread per
+    logical CPU. Sibling CPUs are matched by (physical id, core id) in /proc/cpuinfo;
+    where that isn't available the logical CPU count is used.
+    """
+    cpus = logical_cpus()
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            blocks = f.read().split("\n\n")
+    except OSError:
+        return len(cpus)
+
+    core_of = {}
+    for block in blocks:
+        fields = dict(line.split(":", 1) for line in block.splitlines() if ":" in line)
+        fields = {key.strip(): value.strip() for key, value in fields.items()}
+        if 'processor' in fields and 'physical id' in fields and 'core id' in fields:
+            core_of[int(fields['processor'])] = (fields['physical id'], fields['core id'])
+
+    if not core_of or any(cpu not in core_of for cpu in cpus):
+        return len(cpus)
+    return len({core_of[cpu] for cpu in cpus})
+
+def configure_threads(processes=1, intra=None, inter=None):
+    """Split the cores between processes and set torch's thread pools; returns (intra, inter)"""
+    import torch
+
+    intra = intra or max(1, physical_cores() // processes)
+    inter = inter or max(1, min(2, intra // 4))
+    torch.set_num_threads(intra)
+    try:
+        torch.set_num_interop_threads(inter)
+    except RuntimeError:
+        # Can only be set once, before any parallel work has run
+        inter = torch.get_num_interop_threads()
+    return intra, inter
+
+def tune_intra_threads(step, max_threads, steps=3):
+    """Time a few training steps at several intra-op thread counts and keep the fastest"""
+    import torch
+
+    candidates = sorted({max(1, max_threads // divisor) for divisor in (4, 2, 1)})
+    timings = {}
+    for threads in candidates:
+        torch.set_num_threads(threads)
+        step()  # Warm-up (allocations, kernel selection)
+        start = time.perf_counter()
+        for _ in range(steps):
+            step()
+        timings[threads] = (time.perf_counter() - start) / steps
+
+    best = min(timings, key=timings.get)
+    torch.set_num_threads(best)
+    return best, timings
+
+def bf16_supported():
+    """Whether this CPU has fast bfloat16 kernels (AVX-512 BF16 / AMX)"""
+    import torch
+
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+def build_models(size=64, latent_size=LATENT_SIZE, width=64):
+    """DCGAN generator and discriminator for size x size RGB+mask sprites (size a power of two >= 16)"""
+    import torch.nn as nn
+
+    levels = int(np.log2(size)) - 2  # 4x4 up to size x size
+    channels = [width * 2 ** min(i, 3) for i in range(levels)][::-1]
+
+    generator_layers = [
+        nn.ConvTranspose2d(latent_size, channels[0], 4, 1, 0, bias=False),
+        nn.BatchNorm2d(channels[0]), nn.ReLU(True),
+    ]
+    for in_channels, out_channels in zip(channels, channels[1:]):
+        generator_layers += [
+            nn.ConvTranspose2d(in_channels, out_channels, 4, 2, 1, bias=False),
+            nn.BatchNorm2d(out_channels), nn.ReLU(True),
+        ]
+    generator_layers += [nn.ConvTranspose2d(channels[-1], CHANNELS, 4, 2, 1, bias=False), nn.Tanh()]
+
+    discriminator_layers = [nn.Conv2d(CHANNELS, channels[-1], 4, 2, 1, bias=False), nn.LeakyReLU(0.2, True)]
+    for in_channels, out_channels in zip(channels[::-1], channels[::-1][1:]):
+        discriminator_layers += [
+            nn.Conv2d(in_channels, out_channels, 4, 2, 1, bias=False),
+            nn.BatchNorm2d(out_channels), nn.LeakyReLU(0.2, True),
+        ]
+    discriminator_layers += [nn.Conv2d(channels[0], 1, 4, 1, 0, bias=False), nn.Flatten()]
+
+    return nn.Sequential(*generator_layers), nn.Sequential(*discriminator_layers)
+
+def to_batch(textures, masks, channels_last):
+    """uint8 (B, H, W, 3) textures and (B, H, W) masks -> float (B, 4, H, W) in [-1, 1]"""
+    import torch
+
+    pixels = np.concatenate([textures, masks[..., None]], axis=-1)
+    batch = torch.from_numpy(pixels).permute(0, 3, 1, 2).float().div_(127.5).sub_(1.0)
+    return batch.contiguous(memory_format=torch.channels_last) if channels_last else batch.contiguous()
+
+class AsyncCheckpointer:
+    """Writes checkpoints on a background thread from in-memory copies of the state"""
+
+    def __init__(self, directory=CHECKPOINT_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+
+    def save(self, state, name="latest.pt"):
+        # Copy now (model and optimizer tensors) so training can keep updating the live ones
+        snapshot = copy.deepcopy(state)
+        self.wait()  # At most one write in flight
+        self.pending = self.executor.submit(self.write, snapshot, self.directory / name)
+
+    def write(self, snapshot, path):
+        import torch
+
+        tmp_path = path.with_name(path.name + ".part")
+        torch.save(snapshot, tmp_path)
+        os.replace(tmp_path, path)
+
+    def wait(self):
+        if self.pending is not None:
+            self.pending.result()
+            self.pending = None
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self.executor.shutdown()
+
+def train_worker(rank, world_size, data_dir, options):
+    """Training loop for one process (rank 0 also logs and checkpoints)"""
+    import torch
+    import torch.distributed as dist
+    import torch.nn.functional as F
+    from torch.nn.parallel import DistributedDataParallel
+
+    from src.augment import load_materialized
+
+    intra, inter = configure_threads(world_size, options['intra_threads'], options['inter_threads'])
+    torch.manual_seed(options['seed'] + rank)
+
+    if world_size > 1:
+        os.environ.setdefault("MASTER_ADDR", "127.0.0.1")
+        os.environ.setdefault("MASTER_PORT", str(options['port']))
+        dist.init_process_group("gloo", rank=rank, world_size=world_size)
+
+    textures, masks, meta = load_materialized(data_dir)
+    size = meta['size']
+
+    use_bf16 = options['precision'] == 'bf16' or (options['precision'] == 'auto' and bf16_supported())
+    channels_last = options['channels_last']
+
+    generator, discriminator = build_models(size, width=options['width'])
+    if channels_last:
+        generator = generator.to(memory_format=torch.channels_last)
+        discriminator = discriminator.to(memory_format=torch.channels_last)
+
+    g_optimizer = torch.optim.Adam(generator.parameters(), lr=options['lr'], betas=(0.5, 0.999))
+    d_optimizer = torch.optim.Adam(discriminator.parameters(), lr=options['lr'], betas=(0.5, 0.999))
+
+    start_epoch = 0
+    checkpoint_path = Path(options['checkpoint_dir']) / "latest.pt"
+    if options['resume'] and checkpoint_path.exists():
+        state = torch.load(checkpoint_path, map_location="cpu")
+        generator.load_state_dict(state['generator_model'])
+        discriminator.load_state_dict(state['discriminator_model'])
+        g_optimizer.load_state_dict(state['generator_optimizer'])
+        d_optimizer.load_state_dict(state['discriminator_optimizer'])
+        start_epoch = state['epoch'] + 1
+
+    if world_size > 1:
+        # Batch norm buffers stay per process; gradients are averaged over gloo
+        generator = DistributedDataParallel(generator, broadcast_buffers=False)
+        discriminator = DistributedDataParallel(discriminator, broadcast_buffers=False)
+
+    batch_size = options['batch_size']
+    rng = np.random.default_rng(options['seed'])
+    steps_per_epoch = len(textures) // (batch_size * world_size)
+    if steps_per_epoch == 0:
+        raise ValueError(f"{len(textures)} samples is less than one batch per process")
+
+    def train_step(indices):
+        real = to_batch(textures[indices], masks[indices], channels_last)
+        noise = torch.randn(len(indices), LATENT_SIZE, 1, 1)
+        ones, zeros = torch.ones(len(indices), 1), torch.zeros(len(indices), 1)
+
+        # Real and fake go through the discriminator together: one forward per backward under DDP
+        with torch.autocast("cpu", dtype=torch.bfloat16, enabled=use_bf16):
+            fake = generator(noise)
+            logits = discriminator(torch.cat([real, fake.detach()])).float()
+            d_loss = F.binary_cross_entropy_with_logits(logits, torch.cat([ones, zeros]))
+        d_optimizer.zero_grad(set_to_none=True)
+        d_loss.backward()
+        d_optimizer.step()
+
+        # The generator step leaves discriminator gradients behind; skip averaging them
+        with discriminator.no_sync() if world_size > 1 else contextlib.nullcontext():
+            with torch.autocast("cpu", dtype=torch.bfloat16, enabled=use_bf16):
+                g_loss = F.binary_cross_entropy_with_logits(discriminator(fake).float(), ones)
+            g_optimizer.zero_grad(set_to_none=True)
+            g_loss.backward()
+        g_optimizer.step()
+        return d_loss.item(), g_loss.item()
+
+    if options['tune_threads']:
+        sample = np.sort(rng.choice(len(textures), batch_size, replace=False))
+        intra, timings = tune_intra_threads(lambda: train_step(sample), intra)
+        if rank == 0:
+            print("🔎 Step time by intra-op threads: " + ", ".join(f"{t}: {s * 1000:.0f}ms" for t, s in timings.items()))
+
+    checkpointer = AsyncCheckpointer(options['checkpoint_dir']) if rank == 0 else None
+    if rank == 0:
+        print(f"🔄 Training on {len(textures)} samples ({size}x{size}), {world_size} processes x "
+              f"{intra} intra-op / {inter} inter-op threads, {'bfloat16' if use_bf16 else 'float32'}"
+              f"{', channels-last' if channels_last else ''}")
+
+    try:
+        for epoch in range(start_epoch, options['epochs']):
+            # Every process shuffles the same way (same seed per epoch) and takes its own slice
+            order = np.random.default_rng(options['seed'] + epoch).permutation(len(textures))
+            shard = order[rank::world_size][:steps_per_epoch * batch_size]
+
+            window_start, window_samples = time.perf_counter(), 0
+            for step in range(steps_per_epoch):
+                # Sorted indices read the memory map in order
+                d_loss, g_loss = train_step(np.sort(shard[step * batch_size:(step + 1) * batch_size]))
+                window_samples += batch_size * world_size
+
+                if rank == 0 and ((step + 1) % options['log_every'] == 0 or step + 1 == steps_per_epoch):
+                    elapsed = time.perf_counter() - window_start
+                    print(f"[{epoch + 1}/{options['epochs']}] step {step + 1}/{steps_per_epoch} "
+                          f"D {d_loss:.3f} G {g_loss:.3f} - {window_samples / elapsed:.0f} samples/s")
+                    window_start, window_samples = time.perf_counter(), 0
+
+            if rank == 0:
+                unwrap = lambda model: model.module if world_size > 1 else model
+                checkpointer.save({
+                    'epoch': epoch,
+                    'size': size,
+                    'width': options['width'],
+                    'generator_model': unwrap(generator).state_dict(),
+                    'discriminator_model': unwrap(discriminator).state_dict(),
+                    'generator_optimizer': g_optimizer.state_dict(),
+                    'discriminator_optimizer': d_optimizer.state_dict(),
+                })
+    finally:
+        if checkpointer is not None:
+            checkpointer.close()
+        if world_size > 1:
+            dist.destroy_process_group()
+
+    if rank == 0:
+        print(f"✅ Checkpoint saved to {checkpoint_path}")
+
+def run_training(export_dir="data/individual_sprites", processes=1, size=64, variants=8, **options):
+    """Prepare the augmented data once, then train in one or more processes"""
+    from src.augment import materialize
+    from src.export_manifest import read_manifest
+
+    records = read_manifest(export_dir)
+    if not records:
+        print(f"❌ No manifest in {export_dir} - run the exporter first")
+        return
+
+    print(f"🔄 Preparing {variants} augmented variants of {len(records)} sprites...")
+    data_dir = str(materialize(records, export_dir, variants=variants, seed=options['seed'], size=size))
+
+    if processes > 1:
+        import torch.multiprocessing as mp
+        mp.spawn(train_worker, args=(processes, data_dir, options), nprocs=processes, join=True)
+    else:
+        train_worker(0, 1, data_dir, options)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the sprite GAN on CPU")
+    parser.add_argument("--export-dir", default="data/individual_sprites", help="exporter output with manifest.jsonl")
+    parser.add_argument("--processes", type=int, default=1, help="data-parallel processes (gloo) on this machine")
+    parser.add_argument("--epochs", type=int, default=20, help="passes over the augmented data")
+    parser.add_argument("--batch-size", type=int, default=64, help="batch size per process")
+    parser.add_argument("--size", type=int, default=64, help="sprite size (power of two)")
+    parser.add_argument("--variants", type=int, default=8, help="augmented copies per sprite")
+    parser.add_argument("--width", type=int, default=64, help="base channel width of both networks")
+    parser.add_argument("--lr", type=float, default=2e-4, help="Adam learning rate")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--intra-threads", type=int, default=None, help="intra-op threads per process (default: physical cores / processes)")
+    parser.add_argument("--inter-threads", type=int, default=None, help="inter-op threads per process")
+    parser.add_argument("--tune-threads", action="store_true", help="time a few steps to pick the intra-op thread count")
+    parser.add_argument("--precision", choices=["auto", "fp32", "bf16"], default="auto", help="bf16 autocast (auto: if the CPU supports it)")
+    parser.add_argument("--no-channels-last", dest="channels_last", action="store_false", help="keep the default NCHW layout")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR, help="where checkpoints are written")
+    parser.add_argument("--resume", action="store_true", help="continue from the latest checkpoint")
+    parser.add_argument("--log-every", type=int, default=20, help="steps between progress lines")
+    parser.add_argument("--port", type=int, default=29500, help="rendezvous port for --processes > 1")
+    args = parser.parse_args()
+
+    options = vars(args)
+    run_training(options.pop('export_dir'), options.pop('processes'), options.pop('size'), options.pop('variants'), **options)
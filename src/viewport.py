@@ -0,0 +1,99 @@
+# Zoom/pan viewport for the labeler canvases
+# Only the part of the sheet that is on screen is sampled, so redraw cost
+# depends on the canvas size rather than the sheet size.
+
+import math
+
+import numpy as np
+from PIL import Image
+
+MIN_ZOOM = 0.02
+MAX_ZOOM = 16.0
+
+def sample_image(image, xs, ys):
+    """Nearest-neighbour sample an image at the given column/row indices"""
+    if hasattr(image, 'array'):
+        # Memory-mapped sheet: only the sampled pixels are read
+        return Image.fromarray(np.ascontiguousarray(image.pixels(np.ix_(ys, xs))), image.mode)
+
+    left, top = int(xs[0]), int(ys[0])
+    region = np.asarray(image.crop((left, top, int(xs[-1]) + 1, int(ys[-1]) + 1)))
+    return Image.fromarray(np.ascontiguousarray(region[np.ix_(ys - top, xs - left)]), image.mode)
+
+class Viewport:
+    """Maps between sheet pixels and canvas pixels for a zoomed and panned view"""
+
+    def __init__(self, margin=10):
+        self.margin = margin
+        self.scale = 1.0        # Canvas pixels per sheet pixel
+        self.origin_x = 0.0     # Sheet coordinate shown at the canvas margin
+        self.origin_y = 0.0
+        self.fit_mode = True    # Refit whenever the sheet or canvas changes
+
+    def fit(self, image_size, canvas_size):
+        """Show the whole sheet (never upscaled)"""
+        img_width, img_height = image_size
+        canvas_width, canvas_height = canvas_size
+        scale_w = (canvas_width - 2 * self.margin) / img_width
+        scale_h = (canvas_height - 2 * self.margin) / img_height
+        self.scale = max(min(scale_w, scale_h, 1.0), MIN_ZOOM)
+        self.origin_x = self.origin_y = 0.0
+        self.fit_mode = True
+
+    def set_zoom(self, scale, canvas_x, canvas_y):
+        """Zoom to an absolute scale, keeping the sheet point under (canvas_x, canvas_y) fixed"""
+        image_x, image_y = self.canvas_to_image(canvas_x, canvas_y)
+        self.scale = min(max(scale, MIN_ZOOM), MAX_ZOOM)
+        self.origin_x = image_x - (canvas_x - self.margin) / self.scale
+        self.origin_y = image_y - (canvas_y - self.margin) / self.scale
+        self.fit_mode = False
+
+    def zoom_at(self, factor, canvas_x, canvas_y):
+        """Zoom in or out by a factor around a canvas point"""
+        self.set_zoom(self.scale * factor, canvas_x, canvas_y)
+
+    def pan(self, dx, dy):
+        """Move the view by a canvas-pixel offset"""
+        self.origin_x -= dx / self.scale
+        self.origin_y -= dy / self.scale
+        self.fit_mode = False
+
+    def canvas_to_image(self, canvas_x, canvas_y):
+        """Convert canvas coordinates to sheet coordinates"""
+        return (self.origin_x + (canvas_x - self.margin) / self.scale,
+                self.origin_y + (canvas_y - self.margin) / self.scale)
+
+    def image_to_canvas(self, image_x, image_y):
+        """Convert sheet coordinates to canvas coordinates"""
+        return (self.margin + (image_x - self.origin_x) * self.scale,
+                self.margin + (image_y - self.origin_y) * self.scale)
+
+    def visible_range(self, origin, image_extent, canvas_extent):
+        """Get the on-screen span of one axis as (first canvas pixel, sheet indices)"""
+        start = max(0.0, origin)
+        end = min(float(image_extent), origin + (canvas_extent - 2 * self.margin) / self.scale)
+        if end <= start:
+            return None, None
+
+        first = math.floor(self.margin + (start - origin) * self.scale)
+        last = math.ceil(self.margin + (end - origin) * self.scale)
+        canvas_pixels = np.arange(first, last)
+
+        # Sheet pixel under the centre of each canvas pixel
+        indices = np.floor(origin + (canvas_pixels + 0.5 - self.margin) / self.scale).astype(np.intp)
+        return first, np.clip(indices, 0, image_extent - 1)
+
+    def render(self, image, canvas_size):
+        """Sample the visible part of a sheet at the current zoom.
+
+        Returns (PIL image, canvas x, canvas y), or None when nothing is visible.
+        """
+        img_width, img_height = image.size
+        canvas_width, canvas_height = canvas_size
+
+        x, xs = self.visible_range(self.origin_x, img_width, canvas_width)
+        y, ys = self.visible_range(self.origin_y, img_height, canvas_height)
+        if xs is None or ys is None or len(xs) == 0 or len(ys) == 0:
+            return None
+
+        return sample_image(image, xs, ys), x, y
@@ -0,0 +1,300 @@
+# WAD sprite ingestion
+# Reads sprites straight from a DOOM WAD instead of the 6x upscaled sheets: the file is
+# memory-mapped, patch lumps between S_START/S_END are decoded into palette-index arrays
+# with their offsets, and labels come from the lump names (TROOA1 = imp, frame A,
+# rotation 1; SPIDA2A8 = frame A rotation 2, also used mirrored as rotation 8).
+# Output goes through the same encoder, mirrors.json and manifest as the sheet exporter,
+# so DoomDataProcessor and the training tools read it unchanged.
+#
+# Usage (from the project root):
+#   python -m src.wad_reader DOOM2.WAD --list
+#   python -m src.wad_reader DOOM2.WAD                       # export every sprite
+#   python -m src.wad_reader DOOM2.WAD --sprites TROO SPID   # only these prefixes
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+SPRITE_MARKERS = (("S_START", "S_END"), ("SS_START", "SS_END"))
+
+# DOOM rotations 1-8 in the labeler's angle order; 0 means one image for all angles
+ROTATION_ANGLES = ["omnidirectional", "front", "angle315", "right", "angle225", "back", "angle135", "left", "angle45"]
+
+# Well-known sprite prefixes -> (sprite name, category); anything else keeps its prefix
+SPRITE_NAMES = {
+    'PLAY': ("Player", "creature"), 'POSS': ("Zombieman", "creature"), 'SPOS': ("Shotgun Guy", "creature"),
+    'CPOS': ("Chaingunner", "creature"), 'TROO': ("Imp", "creature"), 'SARG': ("Demon", "creature"),
+    'HEAD': ("Cacodemon", "creature"), 'SKUL': ("Lost Soul", "creature"), 'BOSS': ("Baron of Hell", "creature"),
+    'BOS2': ("Hell Knight", "creature"), 'SKEL': ("Revenant", "creature"), 'FATT': ("Mancubus", "creature"),
+    'BSPI': ("Arachnotron", "creature"), 'PAIN': ("Pain Elemental", "creature"), 'VILE': ("Arch-vile", "creature"),
+    'CYBR': ("Cyberdemon", "creature"), 'SPID': ("Spider Mastermind", "creature"), 'SSWV': ("Wolfenstein SS", "creature"),
+    'KEEN': ("Commander Keen", "creature"), 'BBRN': ("Boss Brain", "creature"),
+    'PUNG': ("Fist", "weapon"), 'PISG': ("Pistol", "weapon"), 'SHTG': ("Shotgun", "weapon"),
+    'SHT2': ("Super Shotgun", "weapon"), 'CHGG': ("Chaingun", "weapon"), 'MISG': ("Rocket Launcher", "weapon"),
+    'PLSG': ("Plasma Rifle", "weapon"), 'BFGG': ("BFG 9000", "weapon"), 'SAWG': ("Chainsaw", "weapon"),
+    'BAL1': ("Imp Fireball", "projectile"), 'BAL2': ("Cacodemon Ball", "projectile"), 'BAL7': ("Baron Ball", "projectile"),
+    'MISL': ("Rocket", "projectile"), 'PLSS': ("Plasma", "projectile"), 'BFS1': ("BFG Ball", "projectile"),
+    'FATB': ("Mancubus Fireball", "projectile"), 'MANF': ("Mancubus Shot", "projectile"), 'APLS': ("Arachnotron Plasma", "projectile"),
+    'PUFF': ("Bullet Puff", "effect"), 'BLUD': ("Blood", "effect"), 'TFOG': ("Teleport Fog", "effect"),
+    'IFOG': ("Item Fog", "effect"), 'BEXP': ("Barrel Explosion", "effect"), 'FIRE': ("Arch-vile Fire", "effect"),
+    'BAR1': ("Barrel", "environment"), 'MEDI': ("Medikit", "item"), 'STIM': ("Stimpack", "item"),
+    'ARM1': ("Green Armor", "item"), 'ARM2': ("Blue Armor", "item"), 'SOUL': ("Soulsphere", "item"),
+    'MEGA': ("Megasphere", "item"), 'CLIP': ("Clip", "item"), 'SHEL': ("Shells", "item"), 'ROCK': ("Rocket", "item"),
+    'CELL': ("Cell", "item"), 'BKEY': ("Blue Keycard", "item"), 'RKEY': ("Red Keycard", "item"), 'YKEY': ("Yellow Keycard", "item"),
+}
+
+class WadFile:
+    """A memory-mapped WAD: lump directory plus zero-copy access to lump data"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = open(self.path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, directory = struct.unpack_from("<4sii", self.data, 0)
+        if magic not in (b"IWAD", b"PWAD"):
+            self.close()
+            raise ValueError(f"{self.path} is not a WAD file")
+
+        entries = np.frombuffer(self.data, dtype=[('offset', '<i4'), ('size', '<i4'), ('name', 'S8')], count=count, offset=directory)
+        self.lumps = [(name.rstrip(b"\0").decode("ascii", "replace").upper(), int(offset), int(size)) for offset, size, name in entries]
+
+    def lump(self, index):
+        """Data of the lump at a directory index, as a memoryview into the mapped file"""
+        _, offset, size = self.lumps[index]
+        return memoryview(self.data)[offset:offset + size]
+
+    def find(self, name):
+        """Index of the last lump with this name (later lumps override earlier ones), or None"""
+        for index in range(len(self.lumps) - 1, -1, -1):
+            if self.lumps[index][0] == name:
+                return index
+        return None
+
+    def palette(self):
+        """First PLAYPAL palette as a (256, 3) uint8 array"""
+        index = self.find("PLAYPAL")
+        if index is None:
+            raise ValueError(f"{self.path} has no PLAYPAL lump")
+        return np.frombuffer(self.lump(index), dtype=np.uint8, count=768).reshape(256, 3).copy()
+
+    def sprite_lumps(self):
+        """{lump name: directory index} for every lump inside the sprite markers"""
+        sprites = {}
+        inside = False
+        for index, (name, _, size) in enumerate(self.lumps):
+            if any(name == start for start, _ in SPRITE_MARKERS):
+                inside = True
+            elif any(name == end for _, end in SPRITE_MARKERS):
+                inside = False
+            elif inside and size > 0:
+                sprites[name] = index
+        return sprites
+
+    def close(self):
+        # Views handed out by lump() must be released before the map can close
+        try:
+            self.data.close()
+        except BufferError:
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+def decode_patch(data):
+    """Decode a column-based patch lump.
+
+    Returns (pixels, opaque, (left_offset, top_offset)): pixels is an (H, W) uint8 array
+    of palette indices and opaque an (H, W) bool array of the pixels the patch covers.
+    """
+    width, height, left_offset, top_offset = struct.unpack_from("<HHhh", data, 0)
+    column_offsets = np.frombuffer(data, dtype="<u4", count=width, offset=8)
+    raw = np.frombuffer(data, dtype=np.uint8)
+
+    pixels = np.zeros((height, width), dtype=np.uint8)
+    opaque = np.zeros((height, width), dtype=bool)
+
+    for x, position in enumerate(column_offsets):
+        top = -1
+        while raw[position] != 0xFF:
+            delta, length = int(raw[position]), int(raw[position + 1])
+            # Tall patches: a delta not past the previous post is relative to it
+            top = top + delta if delta <= top else delta
+            end = min(top + length, height)
+            if end > top:
+                pixels[top:end, x] = raw[position + 3:position + 3 + end - top]
+                opaque[top:end, x] = True
+            position += length + 4
+
+    return pixels, opaque, (left_offset, top_offset)
+
+def parse_sprite_name(name):
+    """Split a sprite lump name into [(prefix, frame letter, rotation, flipped), ...].
+
+    TROOA1 -> [('TROO', 'A', 1, False)]; SPIDA2A8 -> frame A rotation 2, plus frame A
+    rotation 8 drawn mirrored. Returns [] for names that don't follow the convention.
+    """
+    if len(name) not in (6, 8) or not name[5].isdigit():
+        return []
+    views = [(name[:4], name[4], int(name[5]), False)]
+    if len(name) == 8 and name[7].isdigit():
+        views.append((name[:4], name[6], int(name[7]), True))
+    return views
+
+def sprite_labels(prefix, frame_letter, rotation):
+    """Labels in the exporter's sprite_data format; row is the frame, col the rotation"""
+    sprite_name, _ = SPRITE_NAMES.get(prefix, (prefix, "other"))
+    return {
+        'row': ord(frame_letter) - ord('A'),
+        'col': max(rotation - 1, 0),
+        'sprite_name': sprite_name,
+        'action': '',
+        'angle': ROTATION_ANGLES[rotation] if rotation < len(ROTATION_ANGLES) else 'static',
+        'frame': ord(frame_letter) - ord('A') + 1,
+        'important': False,
+        'empty': False,
+    }
+
+def export_wad(wad_path, output_dir="data/individual_sprites", prefixes=None, encoder=None, progress_callback=None):
+    """Export WAD sprites in the sheet exporter's layout (one directory per sprite prefix).
+
+    Textures are palette-applied RGB, masks mark the pixels each patch covers, and
+    rotations stored mirrored in the WAD become mirror references. Returns the manifest entries.
+    """
+    from src.export_manifest import manifest_record, update_manifest
+    from src.sprite_encoder import SpriteEncoder
+    from src.sprite_exporter import pixel_hash, sprite_filename_base, write_mirrors
+
+    # Group lumps by prefix first so each sprite directory is written in one pass
+    with WadFile(wad_path) as wad:
+        palette = wad.palette()
+        by_prefix = defaultdict(list)
+        for name, index in wad.sprite_lumps().items():
+            views = parse_sprite_name(name)
+            if views and (prefixes is None or views[0][0] in prefixes):
+                by_prefix[views[0][0]].append((name, index, views))
+
+        records = []
+        own_encoder = encoder is None
+        encoder = encoder or SpriteEncoder()
+        total = sum(len(lumps) for lumps in by_prefix.values())
+        done = 0
+
+        try:
+            for prefix, lumps in sorted(by_prefix.items()):
+                sprite_name, category = SPRITE_NAMES.get(prefix, (prefix, "other"))
+                output_path = Path(output_dir) / category / prefix.lower()
+                output_path.mkdir(parents=True, exist_ok=True)
+                relative_dir = f"{category}/{prefix.lower()}"
+                mirrors = {}
+                offsets = {}
+
+                for name, index, views in sorted(lumps):
+                    pixels, opaque, offset = decode_patch(wad.lump(index))
+                    texture = Image.fromarray(np.where(opaque[..., None], palette[pixels], 0).astype(np.uint8), 'RGB')
+                    mask = Image.fromarray(opaque.astype(np.uint8) * 255, 'L')
+                    checksum = pixel_hash(texture, mask)
+
+                    _, frame_letter, rotation, _ = views[0]
+                    labels = sprite_labels(prefix, frame_letter, rotation)
+                    filename_base = sprite_filename_base(labels)
+                    offsets[filename_base] = list(offset)
+
+                    encoder.save(texture, output_path / f"{filename_base}_texture{encoder.suffix}")
+                    encoder.save_mask(mask, output_path / f"{filename_base}_mask{encoder.suffix}")
+                    records.append(manifest_record(
+                        prefix, category, labels, filename_base,
+                        f"{relative_dir}/{filename_base}_texture{encoder.suffix}",
+                        f"{relative_dir}/{filename_base}_mask{encoder.suffix}",
+                        texture.size, checksum
+                    ))
+
+                    # The second half of an 8-character name is the same patch, mirrored
+                    for _, mirror_letter, mirror_rotation, _ in views[1:]:
+                        mirror_labels = sprite_labels(prefix, mirror_letter, mirror_rotation)
+                        mirror_base = sprite_filename_base(mirror_labels)
+                        mirrors[mirror_base] = filename_base
+                        # Mirrored patches flip around the other side of their width
+                        offsets[mirror_base] = [texture.width - offset[0], offset[1]]
+                        records.append(manifest_record(
+                            prefix, category, mirror_labels, mirror_base,
+                            f"{relative_dir}/{filename_base}_texture{encoder.suffix}",
+                            f"{relative_dir}/{filename_base}_mask{encoder.suffix}",
+                            texture.size, pixel_hash(texture.transpose(Image.FLIP_LEFT_RIGHT), mask.transpose(Image.FLIP_LEFT_RIGHT)),
+                            mirror_of=filename_base
+                        ))
+
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total, name)
+
+                encoder.wait()
+                write_mirrors(output_path, mirrors)
+
+                metadata = {
+                    'sheet_name': prefix,
+                    'display_name': sprite_name,
+                    'category': category,
+                    'description': f"Sprites from {Path(wad_path).name}",
+                    'source': 'wad',
+                    'has_mask': True,
+                    'offsets': offsets,  # {filename_base: [left, top]} patch offsets
+                }
+                metadata_path = output_path / "sheet_info.json"
+                tmp_path = metadata_path.with_name(metadata_path.name + ".part")
+                with open(tmp_path, "w") as f:
+                    json.dump(metadata, f, indent=2)
+                os.replace(tmp_path, metadata_path)
+        finally:
+            if own_encoder:
+                encoder.close()
+            else:
+                encoder.wait()
+
+    update_manifest(output_dir, records, replace_sheets=by_prefix.keys())
+    return records
+
+if __name__ == "__main__":
+    from src.sprite_encoder import FORMATS, SpriteEncoder
+
+    parser = argparse.ArgumentParser(description="Export sprites directly from a DOOM WAD")
+    parser.add_argument("wad", help="IWAD or PWAD file")
+    parser.add_argument("--output-dir", default="data/individual_sprites", help="export destination")
+    parser.add_argument("--sprites", nargs="+", help="only export these sprite prefixes (e.g. TROO SPID)")
+    parser.add_argument("--list", action="store_true", help="list sprite prefixes and lump counts, then exit")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="png", help="file format for exported sprites")
+    parser.add_argument("--encode-threads", type=int, default=2, help="threads encoding images")
+    args = parser.parse_args()
+
+    if args.list:
+        with WadFile(args.wad) as wad:
+            counts = defaultdict(int)
+            for name in wad.sprite_lumps():
+                if parse_sprite_name(name):
+                    counts[name[:4]] += 1
+        for prefix, count in sorted(counts.items()):
+            sprite_name, category = SPRITE_NAMES.get(prefix, (prefix, "other"))
+            print(f"{prefix}  {count:>4} lumps  {sprite_name} ({category})")
+        print(f"📋 {len(counts)} sprites, {sum(counts.values())} lumps")
+    else:
+        prefixes = {prefix.upper() for prefix in args.sprites} if args.sprites else None
+
+        def show_progress(done, total, name):
+            print(f"[{done}/{total}] {name}")
+
+        print(f"🔄 Reading sprites from {args.wad}")
+        with SpriteEncoder(format=args.format, threads=args.encode_threads) as encoder:
+            records = export_wad(args.wad, args.output_dir, prefixes, encoder, show_progress)
+        print(f"✅ Exported {len(records)} sprites to {args.output_dir}")
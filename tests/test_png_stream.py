@@ -0,0 +1,30 @@
+import numpy as np
+from PIL import Image
+
+from src import png_stream
+from src.png_stream import BandedSheet, PngBandReader
+
+def make_sheet(path, height, width=1000):
+    pixels = np.random.default_rng(0).integers(0, 256, (height, width), dtype=np.uint8)
+    Image.fromarray(pixels, "L").save(path)  # PIL picks per-row filters, so unfiltering is exercised
+    return pixels
+
+def test_crop_near_bottom_of_tall_sheet(tmp_path, monkeypatch):
+    pixels = make_sheet(tmp_path / "tall.png", 3000)
+    # Any carrier over 2M pixels raises, like a real gigapixel sheet against the default limit
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1_000_000)
+
+    sheet = BandedSheet(tmp_path / "tall.png")
+    try:
+        assert np.array_equal(np.asarray(sheet.crop((0, 0, 10, 10))), pixels[:10, :10])
+        assert np.array_equal(np.asarray(sheet.crop((0, 2990, 10, 3000))), pixels[2990:, :10])
+    finally:
+        sheet.close()
+
+def test_read_rows_splits_carriers(tmp_path, monkeypatch):
+    pixels = make_sheet(tmp_path / "sheet.png", 500, 300)
+    monkeypatch.setattr(png_stream, "CARRIER_BYTES", 301 * 7)
+
+    with PngBandReader(tmp_path / "sheet.png") as reader:
+        assert np.array_equal(reader.read_rows(400), pixels[:400])
+        assert np.array_equal(reader.read_rows(400), pixels[400:])